@@ -0,0 +1,13 @@
+"""
+Performance benchmarks. Every module can be run as a script from the project root, e.g.:
+
+    python -m benchmarks.serialization
+"""
+import os
+
+import django
+
+
+def setup():
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'movies_db.settings')
+    django.setup()
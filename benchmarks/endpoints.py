@@ -0,0 +1,218 @@
+"""
+Measure latency of `/movies/`, `/comments/` and `/top/` endpoints over a seeded dataset.
+
+Requests go through the whole Django stack (middleware, views, database) with `django.test.Client`.
+Dataset is generated with a fixed seed in a separate test database, so results of different runs are comparable.
+Results are saved to a JSON file which can be compared with results of a later run:
+
+    python -m benchmarks.endpoints [--movies 100000] [--comments 10000000] [--keepdb] [--output results.json]
+    python -m benchmarks.endpoints --keepdb --compare results.json
+
+`--keepdb` keeps the test database (and the seeded dataset) for the next run.
+"""
+import sys
+import json
+import time
+import random
+import argparse
+import datetime as dt
+from typing import Callable, Dict, List
+
+from benchmarks import setup
+
+setup()
+
+import django  # noqa: E402
+from django.core.cache import cache  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.conf import settings  # noqa: E402
+from django.test import Client, override_settings  # noqa: E402
+from django.test.utils import setup_test_environment  # noqa: E402
+
+from business_logic import datagen  # noqa: E402
+from business_logic.datagen import WORDS  # noqa: E402
+from comments.models import Comment, CommentDailyCount  # noqa: E402
+from movies_api.models import Movie, MovieAlias, MovieImportJob, RankingSnapshot  # noqa: E402
+
+
+FIRST_DAY = dt.date(2000, 1, 1)
+NUM_OF_DAYS = 365 * 20
+
+
+def clear() -> None:
+    if connection.vendor == 'postgresql':
+        models = (CommentDailyCount, Comment, MovieAlias, Movie, MovieImportJob, RankingSnapshot)
+        tables = [model._meta.db_table for model in models]
+        with connection.cursor() as cursor:
+            # CASCADE also empties tables referencing the movies (e.g. added later), so the TRUNCATE does not fail
+            cursor.execute(f'TRUNCATE {", ".join(tables)} CASCADE')
+    else:
+        Movie.objects.all().delete()
+
+
+def seed(num_of_movies: int, num_of_comments: int, seed_value: int) -> None:
+    if Movie.objects.count() == num_of_movies and Comment.objects.count() == num_of_comments:
+        print('Dataset already present, seeding skipped.')
+        return
+
+    print(f'Seeding {num_of_movies} movies and {num_of_comments} comments...')
+    start = time.perf_counter()
+    clear()
+    datagen.generate(
+        num_of_movies, num_of_comments, FIRST_DAY, FIRST_DAY + dt.timedelta(days=NUM_OF_DAYS - 1),
+        seed=seed_value, drop_indexes=True, log=print,
+    )
+    print(f'Dataset seeded in {time.perf_counter() - start:.1f} s.')
+
+
+def date_window(rng: random.Random, num_of_days: int) -> dict:
+    date_from = FIRST_DAY + dt.timedelta(days=rng.randrange(NUM_OF_DAYS - num_of_days))
+    return {'date_from': date_from.isoformat(), 'date_until': (date_from + dt.timedelta(days=num_of_days)).isoformat()}
+
+
+def scenarios(movie_ids: List[int]) -> Dict[str, Callable[[random.Random], dict]]:
+    """
+    :return: names of the scenarios mapped to functions returning (path, query params) of the next request
+    """
+    return {
+        'movies': lambda rng: ('/movies/', {}),
+        'movies_release_year_gt': lambda rng: ('/movies/', {'release_year__gt': rng.randint(1950, 2000)}),
+        'movies_duration_lt': lambda rng: ('/movies/', {'duration__lt': rng.randint(70, 200)}),
+        'movies_title': lambda rng: ('/movies/', {'title': rng.choice(WORDS)}),
+        'movies_mixed': lambda rng: ('/movies/', {
+            'release_year__gt': rng.randint(1950, 2000),
+            'duration__lt': rng.randint(70, 200),
+            'title': rng.choice(WORDS),
+        }),
+        'comments': lambda rng: ('/comments/', {}),
+        'comments_movie_id': lambda rng: ('/comments/', {'movie_id': rng.choice(movie_ids)}),
+        'top_week': lambda rng: ('/top/', date_window(rng, 7)),
+        'top_month': lambda rng: ('/top/', date_window(rng, 30)),
+        'top_year': lambda rng: ('/top/', date_window(rng, 365)),
+    }
+
+
+def percentile(values: List[float], p: float) -> float:
+    values = sorted(values)
+    position = (len(values) - 1) * p / 100
+    lower = int(position)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+
+def run_scenario(client: Client, next_request: Callable[[random.Random], tuple], num_of_requests: int,
+                 warmup: int, rng: random.Random, cold_cache: bool) -> dict:
+    latencies, queries = [], []
+    for i in range(warmup + num_of_requests):
+        path, params = next_request(rng)
+        if cold_cache:
+            cache.clear()
+        start = time.perf_counter()
+        response = client.get(path, params)
+        latency = time.perf_counter() - start
+        if response.status_code != 200:
+            raise RuntimeError(f'GET {path} {params} returned {response.status_code}: {response.content[:200]}')
+        if i >= warmup:
+            latencies.append(latency)
+            queries.append(int(response.get('X-Query-Count', 0)))
+
+    return {
+        'requests': num_of_requests,
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p95_ms': percentile(latencies, 95) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+        'mean_ms': sum(latencies) / len(latencies) * 1000,
+        'throughput_rps': len(latencies) / sum(latencies),
+        'queries_per_request': sum(queries) / len(queries),
+    }
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> bool:
+    """
+    Print differences between the results and the baseline.
+
+    :param threshold: allowed relative increase of p95 latency (e.g. 0.2 for 20%)
+    :return: True if any scenario regressed
+    """
+    regressed = False
+    print(f'\n{"scenario":<24}{"p50 ms":>18}{"p95 ms":>18}{"p99 ms":>18}{"queries":>14}')
+    for name, result in results['scenarios'].items():
+        base = baseline['scenarios'].get(name)
+        if base is None:
+            continue
+        change = result['p95_ms'] / base['p95_ms'] - 1 if base['p95_ms'] else 0
+        is_regression = change > threshold or result['queries_per_request'] > base['queries_per_request']
+        regressed = regressed or is_regression
+        columns = ''.join(
+            f'{base[key]:>8.2f} -> {result[key]:<6.2f}' for key in ('p50_ms', 'p95_ms', 'p99_ms')
+        )
+        queries = f'{base["queries_per_request"]:>5.1f} -> {result["queries_per_request"]:<4.1f}'
+        print(f'{name:<24}{columns}{queries}{"  REGRESSION" if is_regression else ""}')
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--movies', type=int, default=10000)
+    parser.add_argument('--comments', type=int, default=200000)
+    parser.add_argument('--requests', type=int, default=200, help='number of measured requests per scenario')
+    parser.add_argument('--warmup', type=int, default=10, help='number of not measured requests per scenario')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--scenario', action='append', help='run only the given scenarios')
+    parser.add_argument('--cold-cache', action='store_true', help='clear the cache before every request')
+    parser.add_argument('--keepdb', action='store_true', help='keep (and reuse) the test database')
+    parser.add_argument('--output', default='benchmark-results.json')
+    parser.add_argument('--compare', help='results of the previous run (JSON file)')
+    parser.add_argument('--threshold', type=float, default=0.2, help='allowed relative increase of p95 latency')
+    args = parser.parse_args()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+    setup_test_environment()
+    # number of queries per request is read from the responses
+    override_settings(QUERY_INSTRUMENTATION=dict(settings.QUERY_INSTRUMENTATION, REPORT_QUERY_COUNT=True)).enable()
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=args.keepdb)
+    try:
+        seed(args.movies, args.comments, args.seed)
+        movie_ids = list(Movie.objects.values_list('id', flat=True))
+        selected = {
+            name: next_request for name, next_request in scenarios(movie_ids).items()
+            if not args.scenario or name in args.scenario
+        }
+
+        client = Client()
+        results = {
+            'dataset': {'movies': args.movies, 'comments': args.comments, 'seed': args.seed},
+            'environment': {'django': django.get_version(), 'database': connection.vendor,
+                            'python': sys.version.split()[0]},
+            'created_at': dt.datetime.now().isoformat(timespec='seconds'),
+            'cold_cache': args.cold_cache,
+            'scenarios': {},
+        }
+        for name, next_request in selected.items():
+            rng = random.Random(f'{args.seed}:{name}')
+            result = run_scenario(client, next_request, args.requests, args.warmup, rng, args.cold_cache)
+            results['scenarios'][name] = result
+            print(f'{name:<24} p50 {result["p50_ms"]:8.2f} ms  p95 {result["p95_ms"]:8.2f} ms  '
+                  f'p99 {result["p99_ms"]:8.2f} ms  {result["throughput_rps"]:8.1f} req/s  '
+                  f'{result["queries_per_request"]:.1f} queries/req')
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=args.keepdb)
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f'Results saved to {args.output}.')
+
+    if baseline is not None:
+        if baseline.get('dataset') != results['dataset']:
+            print('Warning: results were measured on different datasets.')
+        if compare(results, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""
+Compare throughput of model serializers with read fast path (`business_logic.serialization.ValuesSerializer`).
+
+Rows are generated in memory, so database access is not measured - only building the output and rendering JSON.
+
+    python -m benchmarks.serialization [--rows 10000] [--repeat 5]
+"""
+import argparse
+import datetime as dt
+import time
+from typing import Callable
+
+from benchmarks import setup
+
+setup()
+
+from rest_framework.renderers import JSONRenderer  # noqa: E402
+
+from business_logic.serialization import get_values_serializer  # noqa: E402
+from movies_api.models import Movie  # noqa: E402
+from movies_api.serializers import MovieSerializer  # noqa: E402
+from comments.models import Comment  # noqa: E402
+from comments.serializers import CommentSerializer  # noqa: E402
+
+
+def movie_rows(num_of_rows: int) -> list:
+    return [
+        (i, f'Movie {i}', f'https://example.com/{i}.jpg', dt.date(2000, 1, 1) + dt.timedelta(days=i % 7000),
+         90 + i % 60, f'Director {i % 500}', f'https://example.com/{i}')
+        for i in range(num_of_rows)
+    ]
+
+
+def comment_rows(num_of_rows: int) -> list:
+    return [(i, f'Comment body {i}', dt.date(2010, 1, 1) + dt.timedelta(days=i % 3000), i % 1000) for i in range(num_of_rows)]
+
+
+def measure(fn: Callable[[], bytes], repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run(name: str, model, serializer_class, rows: list, repeat: int):
+    values_serializer = get_values_serializer(serializer_class)
+    if len(rows[0]) != len(values_serializer.columns):
+        raise ValueError(f'{name} rows must have values of {", ".join(values_serializer.columns)}.')
+    attnames = [model._meta.get_field(column).attname for column in values_serializer.columns]
+    instances = [model(**dict(zip(attnames, row))) for row in rows]
+    renderer = JSONRenderer()
+
+    model_time = measure(lambda: renderer.render(serializer_class(instances, many=True).data), repeat)
+    values_time = measure(lambda: renderer.render(values_serializer.serialize(rows)), repeat)
+
+    print(f'{name}: {len(rows)} rows')
+    print(f'  ModelSerializer:  {len(rows) / model_time:12,.0f} rows/s')
+    print(f'  ValuesSerializer: {len(rows) / values_time:12,.0f} rows/s ({model_time / values_time:.1f}x)')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    run('Movie', Movie, MovieSerializer, movie_rows(args.rows), args.repeat)
+    run('Comment', Comment, CommentSerializer, comment_rows(args.rows), args.repeat)
+
+
+if __name__ == '__main__':
+    main()
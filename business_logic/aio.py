@@ -0,0 +1,46 @@
+import asyncio
+import functools
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from business_logic.instrumentation import record_thread_queries
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """
+    Return thread pool running blocking code (database queries, WSGI application) of asynchronous requests.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(settings.ASYNC_THREAD_WORKERS, thread_name_prefix='async-worker')
+    return _executor
+
+
+def _call(fn: Callable, *args: Any, **kwargs: Any) -> Any:
+    # threads of the pool are reused, so their database connections are handled like between requests
+    close_old_connections()
+    try:
+        with record_thread_queries():
+            return fn(*args, **kwargs)
+    finally:
+        close_old_connections()
+
+
+async def run_in_thread(fn: Callable, *args: Any, **kwargs: Any) -> Any:
+    """
+    Run blocking function in the thread pool without blocking the event loop.
+    """
+    loop = asyncio.get_event_loop()
+    # context of the caller (e.g. query log of the asynchronous request) is passed to the thread
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(get_executor(), context.run, functools.partial(_call, fn, *args, **kwargs))
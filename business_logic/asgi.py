@@ -0,0 +1,209 @@
+import io
+import sys
+import asyncio
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.exceptions import DisallowedHost
+from django.core.handlers.wsgi import WSGIRequest
+from django.http import HttpResponse
+from django.urls import Resolver404, resolve
+from django.utils.module_loading import import_string
+from rest_framework import status as s
+from rest_framework.renderers import JSONRenderer
+
+from business_logic import aio, exceptions, instrumentation, metrics, omdb
+
+# handler of asynchronous route: receives ASGI scope and request body, returns status and data of the response
+# or None if the request should be handled by the WSGI application
+AsyncView = Callable[[dict, bytes], Awaitable[Optional[Tuple[int, object]]]]
+
+# middleware (if enabled in `MIDDLEWARE` setting) applied to the asynchronous routes, the rest of the Django stack
+# (sessions, authentication, CSRF of the browsable API) is not used by them
+ASYNC_ROUTE_MIDDLEWARE = (
+    'django.middleware.security.SecurityMiddleware',
+    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+)
+
+
+class AsgiHandler:
+    """
+    ASGI application (ASGI 3, single callable).
+
+    Requests matching `async_routes` (method, path) are handled by coroutines on the event loop, so they do not
+    occupy a thread while waiting for the external API. All the other requests are passed to the WSGI application
+    (the whole Django stack) which runs in the thread pool.
+
+    Django middleware is synchronous, so the asynchronous routes reapply the parts of the stack they need:
+    host validation, security middleware (`ASYNC_ROUTE_MIDDLEWARE`), query instrumentation and metrics.
+    """
+    def __init__(self, wsgi_application: Callable, async_routes: Dict[Tuple[str, str], AsyncView] = None):
+        self.wsgi_application = wsgi_application
+        self.async_routes = async_routes or {}
+        self.renderer = JSONRenderer()
+        self.middleware = [import_string(path)() for path in settings.MIDDLEWARE if path in ASYNC_ROUTE_MIDDLEWARE]
+
+    async def __call__(self, scope: dict, receive: Callable, send: Callable) -> None:
+        if scope['type'] == 'lifespan':
+            return await self.lifespan(receive, send)
+        if scope['type'] != 'http':
+            raise ValueError(f'Unsupported ASGI scope type: {scope["type"]}.')
+
+        try:
+            body = await self.read_body(scope, receive)
+        except exceptions.BusinessLogicException as e:
+            data = exceptions.BusinessLogicExceptionSerializer(e).data
+            response = HttpResponse(self.renderer.render(data), status=e.code, content_type='application/json')
+            return await self.send_response(send, response)
+        view = self.async_routes.get((scope['method'], scope['path']))
+        if view is not None and await self.run_async_view(view, scope, body, send):
+            return
+        await self.run_wsgi(scope, body, send)
+
+    async def run_async_view(self, view: AsyncView, scope: dict, body: bytes, send: Callable) -> bool:
+        """
+        Handle the request with the asynchronous view. Requests rejected or redirected by the middleware
+        (e.g. with a host not in `ALLOWED_HOSTS`) are left to the WSGI application, which responds the same way.
+
+        :return: False if the request should be handled by the WSGI application
+        """
+        start = time.monotonic()
+        request = WSGIRequest(self.get_environ(scope, body))
+        try:
+            request.get_host()
+            request.resolver_match = resolve(request.path_info)
+        except (DisallowedHost, Resolver404):
+            return False
+        for middleware in self.middleware:
+            if hasattr(middleware, 'process_request') and middleware.process_request(request) is not None:
+                return False
+
+        config = settings.QUERY_INSTRUMENTATION
+        with instrumentation.record_async_queries(config.get('SLOW_QUERY_MS')) as log:
+            try:
+                result = await view(scope, body)
+            except exceptions.BusinessLogicException as e:
+                result = e.code, exceptions.BusinessLogicExceptionSerializer(e).data
+        if result is None:
+            return False
+
+        status, data = result
+        response = HttpResponse(self.renderer.render(data), status=status, content_type='application/json')
+        for middleware in reversed(self.middleware):
+            response = middleware.process_response(request, response)
+        instrumentation.report_queries(
+            request, response, log, config.get('N_PLUS_ONE_THRESHOLD'), config.get('REPORT_QUERY_COUNT', False)
+        )
+        request.query_log = log
+        metrics.observe_request(request, response, time.monotonic() - start)
+        await self.send_response(send, response)
+        return True
+
+    async def lifespan(self, receive: Callable, send: Callable) -> None:
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await omdb.close_async_client()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def read_body(self, scope: dict, receive: Callable) -> bytes:
+        """
+        Read the whole request body, it is kept in memory - also for the WSGI application.
+
+        :raises BusinessLogicException: if the body is larger than `DATA_UPLOAD_MAX_MEMORY_SIZE`
+        """
+        max_size = settings.DATA_UPLOAD_MAX_MEMORY_SIZE
+        error = exceptions.BusinessLogicException('Request body is too large.', code=s.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        content_length = dict(scope.get('headers', [])).get(b'content-length', b'')
+        if max_size is not None and content_length.isdigit() and int(content_length) > max_size:
+            raise error
+
+        chunks, size = [], 0
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                break
+            chunk = message.get('body', b'')
+            size += len(chunk)
+            if max_size is not None and size > max_size:
+                raise error
+            chunks.append(chunk)
+            if not message.get('more_body', False):
+                break
+        return b''.join(chunks)
+
+    async def send_response(self, send: Callable, response: HttpResponse) -> None:
+        headers = [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in response.items()]
+        headers.append((b'content-length', str(len(response.content)).encode()))
+        await send({'type': 'http.response.start', 'status': response.status_code, 'headers': headers})
+        await send({'type': 'http.response.body', 'body': response.content})
+
+    def get_environ(self, scope: dict, body: bytes) -> dict:
+        server_name, server_port = scope.get('server') or ('localhost', 80)
+        environ = {
+            'REQUEST_METHOD': scope['method'],
+            'SCRIPT_NAME': scope.get('root_path', ''),
+            # WSGI expects "bytes as latin-1 strings" (PEP 3333)
+            'PATH_INFO': scope['path'].encode().decode('latin-1'),
+            'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+            'SERVER_NAME': server_name,
+            'SERVER_PORT': str(server_port),
+            'SERVER_PROTOCOL': f'HTTP/{scope.get("http_version", "1.1")}',
+            'REMOTE_ADDR': (scope.get('client') or ('', 0))[0],
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': scope.get('scheme', 'http'),
+            'wsgi.input': io.BytesIO(body),
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': True,
+            'wsgi.run_once': False,
+        }
+        for name, value in scope.get('headers', []):
+            name = name.decode('latin-1').upper().replace('-', '_')
+            value = value.decode('latin-1')
+            if name in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+                environ[name] = value
+                continue
+            key = f'HTTP_{name}'
+            environ[key] = f'{environ[key]},{value}' if key in environ else value
+        return environ
+
+    async def run_wsgi(self, scope: dict, body: bytes, send: Callable) -> None:
+        loop = asyncio.get_event_loop()
+        environ = self.get_environ(scope, body)
+        response_start = {'type': 'http.response.start'}
+
+        def send_from_thread(message: dict) -> None:
+            # waiting for the message to be sent also slows down producing the response to the client's pace
+            asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+        def start_response(status: str, headers: List[Tuple[str, str]], exc_info=None):
+            response_start['status'] = int(status.split(' ', 1)[0])
+            response_start['headers'] = [
+                (name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers
+            ]
+
+        def respond():
+            # the whole response is produced in one thread - e.g. streaming responses read the database lazily
+            result = self.wsgi_application(environ, start_response)
+            try:
+                started = False
+                for chunk in result:
+                    if not chunk:
+                        continue
+                    if not started:
+                        send_from_thread(response_start)
+                        started = True
+                    send_from_thread({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+                if not started:
+                    send_from_thread(response_start)
+                send_from_thread({'type': 'http.response.body', 'body': b''})
+            finally:
+                if hasattr(result, 'close'):
+                    result.close()
+
+        await aio.run_in_thread(respond)
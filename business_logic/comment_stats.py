@@ -0,0 +1,164 @@
+import logging
+from collections import Counter, defaultdict
+from datetime import date
+from typing import Iterable, Tuple
+
+from django.db import connection, transaction, IntegrityError
+from django.db.models import F
+
+from comments.models import Comment, CommentDailyCount
+from movies_api.models import Movie
+from business_logic import generations
+
+
+logger = logging.getLogger(__name__)
+
+
+def record_comments(keys: Iterable[Tuple[int, date]], delta: int = 1) -> None:
+    """
+    Update daily comment counts and total comment counts of the movies after comments were added (or removed).
+
+    :param keys: pairs of (movie_id, publish_date) - one for every added/removed comment
+    :param delta: 1 if comments were added, -1 if comments were removed
+    """
+    record_counts(Counter(keys), delta)
+
+
+def record_counts(counts: Counter, delta: int = 1) -> None:
+    """
+    Variant of `record_comments` taking numbers of comments grouped by (movie_id, publish_date)
+    (e.g. counted by the database before the comments were deleted).
+    """
+    counts = +counts
+    if not counts:
+        return
+
+    with transaction.atomic():
+        if delta > 0 and connection.vendor == 'postgresql':
+            _upsert_daily_counts(counts)
+        elif connection.vendor == 'postgresql':
+            _decrement_daily_counts(counts)
+        else:
+            for (movie_id, day), num_of_comments in counts.items():
+                _update_daily_count(movie_id, day, num_of_comments * delta)
+        _update_comment_counts(counts, delta)
+
+        # comment counts of the movies are not a part of their representation - lists filtered or ordered by them
+        # depend on the generation of the comments table (cached rankings on the generation of the daily counts)
+        generations.bump(CommentDailyCount)
+
+
+def _update_daily_count(movie_id: int, day: date, change: int) -> None:
+    updated = CommentDailyCount.objects.filter(movie_id=movie_id, day=day).update(count=F('count') + change)
+    # rows are never created for removed comments - the movie itself might be being deleted
+    if updated or change < 0:
+        return
+    try:
+        with transaction.atomic():
+            CommentDailyCount.objects.create(movie_id=movie_id, day=day, count=change)
+    except IntegrityError:
+        CommentDailyCount.objects.filter(movie_id=movie_id, day=day).update(count=F('count') + change)
+
+
+def _update_comment_counts(counts: Counter, delta: int) -> None:
+    changes = Counter()
+    for (movie_id, _), num_of_comments in counts.items():
+        changes[movie_id] += num_of_comments * delta
+    # one query for all the movies with the same change (e.g. every movie got one comment)
+    movies_by_change = defaultdict(list)
+    for movie_id, change in changes.items():
+        movies_by_change[change].append(movie_id)
+    for change, movie_ids in movies_by_change.items():
+        Movie.objects.filter(id__in=movie_ids).update(comment_count=F('comment_count') + change)
+
+
+def _upsert_daily_counts(counts: Counter) -> None:
+    table = CommentDailyCount._meta.db_table
+    values = ', '.join(['(%s, %s, %s)'] * len(counts))
+    params = [value for (movie_id, day), count in counts.items() for value in (movie_id, day, count)]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {table} (movie_id, day, count) VALUES {values} '
+            f'ON CONFLICT (movie_id, day) DO UPDATE SET count = {table}.count + EXCLUDED.count',
+            params,
+        )
+
+
+def _decrement_daily_counts(counts: Counter) -> None:
+    table = CommentDailyCount._meta.db_table
+    values = ', '.join(['(%s, %s::date, %s)'] * len(counts))
+    params = [value for (movie_id, day), count in counts.items() for value in (movie_id, day, count)]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'UPDATE {table} SET count = {table}.count - removed.count '
+            f'FROM (VALUES {values}) AS removed (movie_id, day, count) '
+            f'WHERE {table}.movie_id = removed.movie_id AND {table}.day = removed.day',
+            params,
+        )
+
+
+def rebuild_daily_counts(date_from: date = None, date_until: date = None) -> int:
+    """
+    Recalculate daily comment counts from the comments table.
+
+    :param date_from: first day to recalculate (all days if omitted)
+    :param date_until: last day to recalculate (all days if omitted)
+    :return: number of rows in the rebuilt range
+    """
+    table = CommentDailyCount._meta.db_table
+    comments_table = Comment._meta.db_table
+
+    conditions, params = [], []
+    if date_from:
+        conditions.append('publish_date >= %s')
+        params.append(date_from)
+    if date_until:
+        conditions.append('publish_date <= %s')
+        params.append(date_until)
+    where = f'WHERE {" AND ".join(conditions)}' if conditions else ''
+
+    counts = CommentDailyCount.objects.all()
+    if date_from:
+        counts = counts.filter(day__gte=date_from)
+    if date_until:
+        counts = counts.filter(day__lte=date_until)
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            # block writes of comments until the rebuild is finished
+            cursor.execute(f'LOCK TABLE {comments_table} IN SHARE MODE')
+        counts.delete()
+        cursor.execute(
+            f'INSERT INTO {table} (movie_id, day, count) '
+            f'SELECT movie_id, publish_date, COUNT(*) FROM {comments_table} {where} GROUP BY movie_id, publish_date',
+            params,
+        )
+        rows = cursor.rowcount
+        generations.bump(CommentDailyCount)
+
+    logger.info(f'Daily comment counts rebuilt ({rows} rows, range: {date_from} - {date_until}).')
+    return rows
+
+
+def reconcile_comment_counts() -> int:
+    """
+    Recalculate total comment counts of the movies from the comments table
+    (e.g. after comments were modified directly in the database).
+
+    :return: number of movies which counts were wrong
+    """
+    table = Movie._meta.db_table
+    comments_table = Comment._meta.db_table
+    actual = f'(SELECT COUNT(*) FROM {comments_table} WHERE {comments_table}.movie_id = {table}.id)'
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            # block writes of comments until the counts are fixed
+            cursor.execute(f'LOCK TABLE {comments_table} IN SHARE MODE')
+        cursor.execute(f'UPDATE {table} SET comment_count = {actual} WHERE comment_count <> {actual}')
+        rows = cursor.rowcount
+        if rows:
+            generations.bump(Movie)
+
+    logger.info(f'Comment counts reconciled ({rows} movies fixed).')
+    return rows
@@ -0,0 +1,199 @@
+import io
+import time
+import random
+import secrets
+import logging
+import datetime as dt
+from contextlib import contextmanager
+from itertools import accumulate, islice
+from typing import Callable, Iterable, Iterator, List, Sequence, Tuple
+
+from django.db import connection, transaction
+
+from comments.models import Comment, CommentDailyCount
+from movies_api.models import Movie
+from business_logic import comment_stats, generations
+
+
+logger = logging.getLogger(__name__)
+
+WORDS = (
+    'night', 'star', 'love', 'dark', 'war', 'city', 'king', 'last', 'lost', 'blood', 'river', 'house', 'dream',
+    'ghost', 'secret', 'summer', 'winter', 'road', 'heart', 'fire', 'shadow', 'island', 'storm', 'empire',
+)
+MOVIE_COLUMNS = ('title', 'cover', 'release_date', 'duration', 'director', 'website', 'comment_count')
+COMMENT_COLUMNS = ('movie_id', 'body', 'publish_date')
+
+
+def zipf_cum_weights(n: int, exponent: float) -> List[float]:
+    """
+    :return: cumulative weights of ranks 1..n in Zipf distribution (weight of rank k is 1 / k^exponent)
+    """
+    return list(accumulate(1 / rank ** exponent for rank in range(1, n + 1)))
+
+
+def movie_rows(count: int, rng: random.Random, run: str) -> Iterator[tuple]:
+    """
+    Generate rows of `MOVIE_COLUMNS`. Titles are made unique with the identifier of the run and consecutive numbers,
+    so they do not collide with the titles generated by other runs.
+    """
+    num_of_directors = count // 20 + 1
+    for number in range(1, count + 1):
+        yield (
+            f'{" ".join(rng.sample(WORDS, 3)).title()} {run}-{number}',
+            f'https://example.com/covers/{run}-{number}.jpg',
+            dt.date(1950, 1, 1) + dt.timedelta(days=rng.randrange(365 * 70)),
+            rng.randint(60, 200),
+            f'Director {rng.randrange(num_of_directors)}',
+            f'https://example.com/movies/{run}-{number}',
+            0,  # updated after comments are written
+        )
+
+
+def comment_rows(count: int, movie_ids: Sequence[int], rng: random.Random, date_from: dt.date, date_until: dt.date,
+                 zipf_exponent: float = 1.0, chunk_size: int = 100000) -> Iterator[tuple]:
+    """
+    Generate rows of `COMMENT_COLUMNS`. Movies are chosen with Zipf distribution (a few movies get most
+    of the comments), publish dates are spread uniformly over the given range.
+    """
+    # popularity should not depend on the order in which movies were added
+    movie_ids = list(movie_ids)
+    rng.shuffle(movie_ids)
+    cum_weights = zipf_cum_weights(len(movie_ids), zipf_exponent)
+    num_of_days = (date_until - date_from).days + 1
+    days = [date_from + dt.timedelta(days=i) for i in range(num_of_days)]
+
+    generated = 0
+    while generated < count:
+        size = min(chunk_size, count - generated)
+        movies = rng.choices(movie_ids, cum_weights=cum_weights, k=size)
+        publish_dates = rng.choices(days, k=size)
+        for i in range(size):
+            yield movies[i], f'Comment {generated + i}', publish_dates[i]
+        generated += size
+
+
+def _copy_value(value) -> str:
+    if value is None:
+        return '\\N'
+    return str(value).replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n').replace('\r', '\\r')
+
+
+def write_rows(model, columns: Sequence[str], rows: Iterable[tuple], batch_size: int = 100000) -> int:
+    """
+    Write rows to the table of the model: with `COPY` on PostgreSQL, with `bulk_create` on other databases.
+
+    :return: number of written rows
+    """
+    rows = iter(rows)
+    written = 0
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            return written
+
+        if connection.vendor == 'postgresql':
+            data = io.StringIO()
+            for row in batch:
+                data.write('\t'.join(_copy_value(value) for value in row))
+                data.write('\n')
+            data.seek(0)
+            with connection.cursor() as cursor:
+                # `copy_expert` is available on the underlying psycopg2 cursor only
+                cursor.cursor.copy_expert(f'COPY {model._meta.db_table} ({", ".join(columns)}) FROM STDIN', data)
+        else:
+            model.objects.bulk_create(model(**dict(zip(columns, row))) for row in batch)
+        written += len(batch)
+
+
+def get_droppable_indexes(model) -> List[Tuple[str, str]]:
+    """
+    :return: names and definitions of indexes of the model's table which are not backing
+    a constraint (primary key, unique), PostgreSQL only
+    """
+    if connection.vendor != 'postgresql':
+        return []
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT indexname, indexdef FROM pg_indexes WHERE schemaname = current_schema() AND tablename = %s '
+            'AND indexname NOT IN (SELECT conname FROM pg_constraint WHERE conrelid = %s::regclass)',
+            [table, table],
+        )
+        return cursor.fetchall()
+
+
+@contextmanager
+def indexes_dropped(models: Iterable):
+    """
+    Drop secondary indexes of the models' tables for the time of the block and recreate them afterwards
+    (also when the block fails). Loading data without indexes and building them once is much faster.
+    """
+    indexes = [index for model in models for index in get_droppable_indexes(model)]
+    with connection.cursor() as cursor:
+        for name, definition in indexes:
+            logger.info(f'Dropping index {name} ({definition}).')
+            cursor.execute(f'DROP INDEX {name}')
+    try:
+        yield indexes
+    finally:
+        with connection.cursor() as cursor:
+            for name, definition in indexes:
+                logger.info(f'Creating index {name}.')
+                cursor.execute(definition)
+
+
+def generate(num_of_movies: int, num_of_comments: int, date_from: dt.date, date_until: dt.date,
+             zipf_exponent: float = 1.0, seed: int = None, drop_indexes: bool = False, batch_size: int = 100000,
+             log: Callable[[str], None] = logger.info) -> None:
+    """
+    Generate movies and comments, then rebuild daily comment counts.
+    Comments are assigned both to the new and to the already existing movies.
+
+    :param num_of_movies: number of movies to generate
+    :param num_of_comments: number of comments to generate
+    :param date_from: first possible publish date of the comments
+    :param date_until: last possible publish date of the comments
+    :param zipf_exponent: exponent of Zipf distribution of comments between the movies (0 - uniform)
+    :param seed: seed of the random generator, the same seed gives the same data
+    :param drop_indexes: drop secondary indexes for the time of loading (PostgreSQL only)
+    :param batch_size: number of rows written at once
+    :param log: function printing the progress
+    """
+    rng = random.Random(seed)
+    start = time.perf_counter()
+
+    with transaction.atomic():
+        if connection.vendor == 'postgresql':
+            # check foreign keys while copying instead of queueing millions of checks until the commit
+            # (pending checks also prevent creating indexes in the same transaction)
+            with connection.cursor() as cursor:
+                cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+
+        models = (Movie, Comment) if drop_indexes else ()
+        with indexes_dropped(models):
+            # not taken from `rng`, the same seed used again must not generate the same titles
+            run = secrets.token_hex(4)
+            written = write_rows(Movie, MOVIE_COLUMNS, movie_rows(num_of_movies, rng, run), batch_size)
+            log(f'{written} movies written ({time.perf_counter() - start:.1f} s).')
+
+            movie_ids = list(Movie.objects.values_list('id', flat=True).order_by('id'))
+            if num_of_comments and movie_ids:
+                rows = comment_rows(num_of_comments, movie_ids, rng, date_from, date_until, zipf_exponent)
+                written = write_rows(Comment, COMMENT_COLUMNS, rows, batch_size)
+                log(f'{written} comments written ({time.perf_counter() - start:.1f} s).')
+        if drop_indexes:
+            log(f'Indexes rebuilt ({time.perf_counter() - start:.1f} s).')
+
+        # rows written with COPY do not send post_save signals (see movies_api.signals and comments.signals)
+        generations.bump(Movie, Comment)
+        comment_stats.rebuild_daily_counts()
+        log(f'Daily comment counts rebuilt ({time.perf_counter() - start:.1f} s).')
+        comment_stats.reconcile_comment_counts()
+        log(f'Comment counts of movies updated ({time.perf_counter() - start:.1f} s).')
+
+    if connection.vendor == 'postgresql':
+        # refresh planner statistics after the load
+        with connection.cursor() as cursor:
+            for model in (Movie, Comment, CommentDailyCount):
+                cursor.execute(f'ANALYZE {model._meta.db_table}')
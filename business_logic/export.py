@@ -0,0 +1,124 @@
+import io
+import csv
+from collections import OrderedDict
+from typing import Iterable, Iterator, List, Tuple
+
+from django.conf import settings
+from django.db.models import QuerySet
+from rest_framework.utils import encoders
+
+from comments.models import Comment
+from movies_api.serializers import MovieSerializer, ExportedCommentSerializer
+from business_logic.serialization import get_values_serializer
+
+
+CONTENT_TYPES = OrderedDict([
+    ('ndjson', 'application/x-ndjson'),
+    ('csv', 'text/csv'),
+])
+
+# the same output as `business_logic.streaming.to_json`
+_encoder = encoders.JSONEncoder(ensure_ascii=False, allow_nan=False, separators=(',', ':'))
+
+
+def movies_with_comments(queryset: QuerySet, chunk_size: int = None) -> Iterator[Tuple[tuple, List[tuple]]]:
+    """
+    Read movies and their comments with two server-side cursors, both ordered by id of the movie, and merge them
+    (`prefetch_related` is not applied to `.iterator()`). Only comments of a single movie are kept in memory,
+    so memory usage does not depend on the number of movies and comments.
+
+    :param queryset: movies to export
+    :param chunk_size: number of rows fetched at once from each cursor (default: `STREAMING_CHUNK_SIZE` setting)
+    :return: iterator of movies (ordered by id) with lists of their comments - raw rows with values of the fields
+        of `MovieSerializer` and `ExportedCommentSerializer`
+    """
+    chunk_size = chunk_size or settings.STREAMING_CHUNK_SIZE
+    movie_columns = get_values_serializer(MovieSerializer).columns
+    comment_columns = get_values_serializer(ExportedCommentSerializer).columns
+    id_index = movie_columns.index('id')
+
+    movies = queryset.order_by('id').values_list(*movie_columns).iterator(chunk_size=chunk_size)
+    # comments are read in the order of the (movie, publish_date, id) index
+    comments = Comment.objects.filter(movie_id__in=queryset.order_by().values('id'))\
+        .order_by('movie_id', 'publish_date', 'id')\
+        .values_list('movie_id', *comment_columns)\
+        .iterator(chunk_size=chunk_size)
+
+    comment = next(comments, None)
+    for movie in movies:
+        movie_id = movie[id_index]
+        # comments of movies which are not read by the other cursor (added after it was opened) are skipped
+        while comment is not None and comment[0] < movie_id:
+            comment = next(comments, None)
+        movie_comments = []
+        while comment is not None and comment[0] == movie_id:
+            movie_comments.append(comment[1:])
+            comment = next(comments, None)
+        yield movie, movie_comments
+
+
+def to_ndjson(movies: Iterable[Tuple[tuple, List[tuple]]]) -> Iterator[str]:
+    """
+    Encode every movie with its comments as a JSON object on a separate line
+    (with the same fields as in the responses of `/movies/` and `/comments/`).
+    """
+    movie_names = get_values_serializer(MovieSerializer).names
+    comment_names = get_values_serializer(ExportedCommentSerializer).names
+    for movie, comments in movies:
+        # dates are encoded by the encoder (ISO 8601, the same as in the API responses)
+        data = dict(zip(movie_names, movie))
+        data['comments'] = [dict(zip(comment_names, comment)) for comment in comments]
+        yield _encoder.encode(data)
+        yield '\n'
+
+
+def to_csv(movies: Iterable[Tuple[tuple, List[tuple]]], buffer_size: int = 64 * 1024) -> Iterator[str]:
+    """
+    Encode movies joined with their comments as CSV: one row per comment (movie columns are repeated),
+    one row with empty comment columns for a movie without comments.
+    """
+    comment_names = get_values_serializer(ExportedCommentSerializer).names
+    no_comment = (None,) * len(comment_names)
+
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(get_values_serializer(MovieSerializer).names + [f'comment_{name}' for name in comment_names])
+    for movie, comments in movies:
+        # `csv` writes dates in ISO 8601 format and None as an empty string
+        if comments:
+            writer.writerows(movie + comment for comment in comments)
+        else:
+            writer.writerow(movie + no_comment)
+
+        if output.tell() >= buffer_size:
+            yield output.getvalue()
+            output.seek(0)
+            output.truncate()
+    yield output.getvalue()
+
+
+def export_movies(queryset: QuerySet, output_format: str, chunk_size: int = None) -> Iterator[bytes]:
+    """
+    :param queryset: movies to export
+    :param output_format: `ndjson` or `csv` (see `CONTENT_TYPES`)
+    :param chunk_size: number of movies read from the database at once
+    :return: iterator of encoded chunks of the export
+    """
+    if output_format == 'csv':
+        return (chunk.encode() for chunk in to_csv(movies_with_comments(queryset, chunk_size)))
+    return buffered(to_ndjson(movies_with_comments(queryset, chunk_size)))
+
+
+def buffered(pieces: Iterable[str], buffer_size: int = 64 * 1024) -> Iterator[bytes]:
+    """
+    Join small pieces of text into encoded chunks of approximately `buffer_size` characters.
+    """
+    buffer, size = [], 0
+    for piece in pieces:
+        buffer.append(piece)
+        size += len(piece)
+        if size >= buffer_size:
+            yield ''.join(buffer).encode()
+            buffer, size = [], 0
+    if buffer:
+        yield ''.join(buffer).encode()
@@ -0,0 +1,107 @@
+import time
+import hashlib
+from typing import Callable, Iterable, Tuple, Type
+
+from django.db import IntegrityError, models, transaction
+from django.db.models import F
+from django.http import HttpRequest
+
+from movies_api.models import TableGeneration
+
+
+def make_key(model: Type[models.Model]) -> str:
+    return model._meta.label_lower
+
+
+def _seed() -> int:
+    # generations of the tables written for the first time start from the current time (in milliseconds),
+    # so after the database was recreated the numbers do not repeat values that clients might still hold in their ETags
+    return int(time.time() * 1000)
+
+
+def get(*model_classes: Type[models.Model], request: HttpRequest = None) -> Tuple[int, ...]:
+    """
+    :param model_classes: models which tables the generations are read of
+    :param request: request the generations are read for - they are read once (with one query) per request,
+        so the ETag and the cache key of the response are based on the same values
+    :return: current generations of the tables of the models
+    """
+    keys = tuple(make_key(model) for model in model_classes)
+    values = getattr(request, '_generations', {}) if request is not None else {}
+    missing = tuple(key for key in keys if key not in values)
+    if missing:
+        # tables which were never written have generation 0
+        values = dict(values, **dict.fromkeys(missing, 0))
+        values.update(TableGeneration.objects.filter(table__in=missing).values_list('table', 'value'))
+        if request is not None:
+            request._generations = values
+    return tuple(values[key] for key in keys)
+
+
+class _PendingBumps:
+    """
+    Tables which generations are changed when the current transaction is committed (`transaction.on_commit` callback).
+    """
+    def __init__(self):
+        self.keys = set()
+
+    def __call__(self):
+        _incr(self.keys)
+
+
+def bump(*model_classes: Type[models.Model]) -> None:
+    """
+    Change generations of the tables of the models after their rows were modified.
+    Generations are changed (atomically, in the database) when the current transaction is committed, so the rows
+    of the generations are not locked for the time of the transaction. A request which sees the new generation
+    also sees the new rows. Every generation is changed once per transaction, no matter how many rows were written.
+    """
+    keys = {make_key(model) for model in model_classes}
+    connection = transaction.get_connection()
+    if not connection.in_atomic_block:
+        _incr(keys)
+        return
+
+    pending = getattr(connection, 'pending_generation_bumps', None)
+    # callbacks are discarded when the transaction (or the savepoint they were added in) is rolled back
+    if pending is None or not any(func is pending for _, func in connection.run_on_commit):
+        pending = connection.pending_generation_bumps = _PendingBumps()
+        transaction.on_commit(pending)
+    pending.keys.update(keys)
+
+
+def _incr(keys: Iterable[str]) -> None:
+    # rows are locked in the same order by all the writers
+    keys = sorted(keys)
+    if TableGeneration.objects.filter(table__in=keys).update(value=F('value') + 1) == len(keys):
+        return
+    existing = set(TableGeneration.objects.filter(table__in=keys).values_list('table', flat=True))
+    for key in keys:
+        if key in existing:
+            continue
+        try:
+            with transaction.atomic():
+                TableGeneration.objects.create(table=key, value=_seed())
+        except IntegrityError:
+            # created by a concurrent write
+            TableGeneration.objects.filter(table=key).update(value=F('value') + 1)
+
+
+def etag_func(
+    *model_classes: Type[models.Model],
+    get_model_classes: Callable[[HttpRequest], Iterable[Type[models.Model]]] = None
+) -> Callable[..., str]:
+    """
+    Create `etag_func` for `django.views.decorators.http.condition` of a view which response depends only
+    on the URL (path and query params), `Accept` header and rows of the models' tables.
+    The ETag is computed with a single query of the generations.
+
+    :param get_model_classes: function returning models the response depends on if they depend on the request
+    """
+    def get_etag(request: HttpRequest, *args, **kwargs) -> str:
+        parts = [request.build_absolute_uri(), request.META.get('HTTP_ACCEPT', '')]
+        classes = get_model_classes(request) if get_model_classes else model_classes
+        parts.extend(str(generation) for generation in get(*classes, request=request))
+        return hashlib.md5('\n'.join(parts).encode()).hexdigest()
+
+    return get_etag
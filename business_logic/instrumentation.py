@@ -0,0 +1,202 @@
+import re
+import time
+import logging
+import contextvars
+from collections import Counter
+from contextlib import contextmanager, ExitStack
+from typing import Callable, Dict, List, NamedTuple
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpRequest, HttpResponse
+
+
+logger = logging.getLogger(__name__)
+
+# `IN (%s, %s, %s)` and `VALUES (%s, %s), (%s, %s)` lists of different length have the same shape
+_PLACEHOLDERS_LIST = re.compile(r'\(\s*%s(?:\s*,\s*%s)*\s*\)')
+_ROWS_LIST = re.compile(r'\(\.\.\.\)(?:\s*,\s*\(\.\.\.\))+')
+
+# log of the asynchronous request handled in the current context and its slow query threshold
+# (see `record_async_queries`)
+_async_query_log = contextvars.ContextVar('async_query_log', default=None)
+
+
+def query_shape(sql: str) -> str:
+    """
+    :return: SQL with collapsed lists of parameters, so queries differing only in parameters have the same shape
+    """
+    return _ROWS_LIST.sub('(...)', _PLACEHOLDERS_LIST.sub('(...)', sql))
+
+
+class Query(NamedTuple):
+    alias: str
+    sql: str
+    duration: float  # seconds
+    many: bool
+
+
+class QueryRecorder:
+    """
+    Database execute wrapper (see `django.db.backends.base.base.BaseDatabaseWrapper.execute_wrapper`)
+    that records executed queries and logs slow ones.
+    """
+    def __init__(self, alias: str = 'default', slow_query_ms: float = None):
+        self.alias = alias
+        self.slow_query_ms = slow_query_ms
+        self.queries: List[Query] = []
+
+    def __call__(self, execute: Callable, sql: str, params, many: bool, context: dict):
+        start = time.monotonic()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.monotonic() - start
+            self.queries.append(Query(self.alias, sql, duration, many))
+            if self.slow_query_ms is not None and duration * 1000 >= self.slow_query_ms:
+                logger.warning(f'Slow query ({duration * 1000:.1f} ms, {self.alias}): {sql}')
+
+
+class QueryLog:
+    """
+    Queries recorded on all the database connections.
+    """
+    def __init__(self, recorders: List[QueryRecorder]):
+        self.recorders = recorders
+
+    @property
+    def queries(self) -> List[Query]:
+        return [query for recorder in self.recorders for query in recorder.queries]
+
+    @property
+    def duration(self) -> float:
+        return sum(query.duration for query in self.queries)
+
+    def __len__(self) -> int:
+        return len(self.queries)
+
+    def repeated_shapes(self, threshold: int) -> Dict[str, int]:
+        """
+        :param threshold: minimal number of executions of the same query shape
+        :return: shapes of queries executed at least `threshold` times (N+1 suspects) with number of executions
+        """
+        shapes = Counter(query_shape(query.sql) for query in self.queries)
+        return {shape: count for shape, count in shapes.items() if count >= threshold}
+
+    def describe(self) -> str:
+        return '\n'.join(f'{i}. [{query.duration * 1000:.1f} ms] {query.sql}' for i, query in enumerate(self.queries, 1))
+
+
+@contextmanager
+def record_queries(slow_query_ms: float = None):
+    """
+    Record queries executed on all the database connections within the block.
+
+    :param slow_query_ms: queries taking at least that many milliseconds are logged
+    :return: `QueryLog` with the recorded queries
+    """
+    recorders = [QueryRecorder(connection.alias, slow_query_ms) for connection in connections.all()]
+    with ExitStack() as stack:
+        for connection, recorder in zip(connections.all(), recorders):
+            stack.enter_context(connection.execute_wrapper(recorder))
+        yield QueryLog(recorders)
+
+
+@contextmanager
+def record_async_queries(slow_query_ms: float = None):
+    """
+    Record queries of the asynchronous request handled within the block. Its queries are run by
+    `business_logic.aio.run_in_thread` in threads of the pool, which add them to the log (see `record_thread_queries`).
+
+    :param slow_query_ms: queries taking at least that many milliseconds are logged
+    :return: `QueryLog` with the recorded queries
+    """
+    log = QueryLog([])
+    token = _async_query_log.set((log, slow_query_ms))
+    try:
+        yield log
+    finally:
+        _async_query_log.reset(token)
+
+
+@contextmanager
+def record_thread_queries():
+    """
+    Add queries executed within the block to the log of the current asynchronous request (if any).
+    """
+    current = _async_query_log.get()
+    if current is None:
+        yield
+        return
+
+    log, slow_query_ms = current
+    with record_queries(slow_query_ms) as thread_log:
+        try:
+            yield
+        finally:
+            log.recorders.extend(thread_log.recorders)
+
+
+def report_queries(request: HttpRequest, response: HttpResponse, log: QueryLog,
+                   n_plus_one_threshold: int = None, report_query_count: bool = False) -> None:
+    """
+    Log N+1 suspects and number of queries of the request and, if `report_query_count` is True,
+    report it in `X-Query-Count` header.
+    """
+    if n_plus_one_threshold:
+        for shape, count in log.repeated_shapes(n_plus_one_threshold).items():
+            logger.warning(f'{request.method} {request.path}: query executed {count} times (N+1 suspect): {shape}')
+    logger.debug(f'{request.method} {request.path}: {len(log)} queries ({log.duration * 1000:.1f} ms)')
+    if report_query_count:
+        response['X-Query-Count'] = str(len(log))
+
+
+@contextmanager
+def query_budget(max_queries: int, n_plus_one_threshold: int = None):
+    """
+    Fail (`AssertionError`) if the block executes more than `max_queries` queries
+    or, if `n_plus_one_threshold` is given, repeats the same query shape that many times.
+
+    Example::
+
+        with query_budget(2):
+            self.client.get('/movies/')
+    """
+    with record_queries() as log:
+        yield log
+
+    problems = []
+    if len(log) > max_queries:
+        problems.append(f'{len(log)} queries executed, budget is {max_queries}.')
+    if n_plus_one_threshold is not None:
+        problems.extend(
+            f'Query executed {count} times (N+1 suspect): {shape}'
+            for shape, count in log.repeated_shapes(n_plus_one_threshold).items()
+        )
+    if problems:
+        raise AssertionError('\n'.join(problems + ['Queries:', log.describe()]))
+
+
+class QueryInstrumentationMiddleware:
+    """
+    Record queries executed while handling every request, log slow queries and N+1 suspects
+    and report number of queries in `X-Query-Count` header (if `REPORT_QUERY_COUNT` is set).
+
+    Configured with `QUERY_INSTRUMENTATION` setting. Queries executed while a streaming response is being sent
+    are not recorded.
+    """
+    def __init__(self, get_response: Callable[[HttpRequest], HttpResponse]):
+        self.get_response = get_response
+        config = settings.QUERY_INSTRUMENTATION
+        self.slow_query_ms = config.get('SLOW_QUERY_MS')
+        self.n_plus_one_threshold = config.get('N_PLUS_ONE_THRESHOLD')
+        self.report_query_count = config.get('REPORT_QUERY_COUNT', False)
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        with record_queries(self.slow_query_ms) as log:
+            # read by `business_logic.metrics.MetricsMiddleware`
+            request.query_log = log
+            response = self.get_response(request)
+
+        report_queries(request, response, log, self.n_plus_one_threshold, self.report_query_count)
+        return response
@@ -0,0 +1,196 @@
+import logging
+import threading
+from collections import defaultdict
+from datetime import timedelta
+from typing import List, Union
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
+from rest_framework import status as s
+
+from movies_api.models import MovieImportJob, MovieImportItem
+from business_logic import exceptions
+from business_logic.main import fetch_movies_info
+from business_logic.utils import normalize_title
+
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue_titles(titles: Union[str, List[str]]) -> MovieImportJob:
+    """
+    Queue titles to be fetched by background workers.
+
+    :param titles: title or list of titles of the movies
+    :return: created job
+    :raises BusinessLogicException: if no titles or too many titles were provided
+    """
+    if isinstance(titles, str):
+        titles = [titles]
+    queries = {}
+    for title in filter(None, titles or []):
+        queries.setdefault(normalize_title(str(title)), str(title))
+    if not queries:
+        raise exceptions.BusinessLogicException('Please provide title movie', code=s.HTTP_400_BAD_REQUEST)
+    if len(queries) > settings.MOVIE_IMPORT_MAX_TITLES:
+        raise exceptions.BusinessLogicException(
+            f'Too many titles (maximum is {settings.MOVIE_IMPORT_MAX_TITLES}).',
+            code=s.HTTP_400_BAD_REQUEST,
+        )
+
+    with transaction.atomic():
+        job = MovieImportJob.objects.create()
+        MovieImportItem.objects.bulk_create(
+            MovieImportItem(job=job, query=query, normalized_query=key) for key, query in queries.items()
+        )
+    logger.info(f'{len(queries)} titles queued (job id: {job.pk}).')
+    return job
+
+
+def get_job_status(job: MovieImportJob) -> dict:
+    """
+    :return: dictionary with `status` of the job (`pending`, `running` or `done`), number of items (`total`)
+        and numbers of items in every status (`counts`)
+    """
+    counts = dict.fromkeys((status for status, _ in MovieImportItem.STATUSES), 0)
+    counts.update(job.items.values_list('status').annotate(count=Count('id')).order_by())
+    total = sum(counts.values())
+
+    if counts[MovieImportItem.PENDING] == total:
+        status = 'pending'
+    elif counts[MovieImportItem.PENDING] or counts[MovieImportItem.RUNNING]:
+        status = 'running'
+    else:
+        status = 'done'
+    return {'status': status, 'total': total, 'counts': counts}
+
+
+def claim_items(batch_size: int) -> List[MovieImportItem]:
+    """
+    Mark the oldest pending items (and items abandoned by crashed workers) as running.
+    Pending items with the same titles are claimed together, so every title is fetched once.
+    Items locked by other workers are skipped, so many workers can drain the queue at once.
+    Abandoned items which reached `MOVIE_IMPORT_JOB_MAX_ATTEMPTS` are marked as failed instead
+    (e.g. a title which crashes the worker every time).
+
+    :param batch_size: maximal number of distinct titles
+    :return: claimed items
+    """
+    now = timezone.now()
+    timeout = timedelta(seconds=settings.MOVIE_IMPORT_JOB_TIMEOUT)
+    abandoned = Q(status=MovieImportItem.RUNNING, started_at__lt=now - timeout)
+    max_attempts = settings.MOVIE_IMPORT_JOB_MAX_ATTEMPTS
+    with transaction.atomic():
+        MovieImportItem.objects.filter(abandoned, attempts__gte=max_attempts).update(
+            status=MovieImportItem.FAILED, finished_at=now,
+            error=f'Processing was interrupted {max_attempts} times.',
+        )
+        items = list(
+            MovieImportItem.objects.select_for_update(skip_locked=True)
+            .filter(Q(status=MovieImportItem.PENDING) | abandoned & Q(attempts__lt=max_attempts))
+            .order_by('id')[:batch_size]
+        )
+        if not items:
+            return []
+
+        keys = {item.normalized_query for item in items}
+        items.extend(
+            MovieImportItem.objects.select_for_update(skip_locked=True)
+            .filter(normalized_query__in=keys, status=MovieImportItem.PENDING)
+            .exclude(id__in=[item.id for item in items])
+        )
+        MovieImportItem.objects.filter(id__in=[item.id for item in items]).update(
+            status=MovieImportItem.RUNNING, started_at=now, attempts=F('attempts') + 1,
+        )
+    return items
+
+
+def process_items(items: List[MovieImportItem]) -> None:
+    """
+    Fetch the movies of the claimed items (each title once) and save the outcome of every item.
+    Failed items (e.g. the external API was unavailable) are queued again until
+    `MOVIE_IMPORT_JOB_MAX_ATTEMPTS` is reached.
+    """
+    items_by_key = defaultdict(list)
+    for item in items:
+        items_by_key[item.normalized_query].append(item)
+
+    try:
+        result = fetch_movies_info([key_items[0].query for key_items in items_by_key.values()])
+    except Exception as e:
+        logger.exception(e)
+        result = {'failed': [{'query': key_items[0].query, 'error': str(e)} for key_items in items_by_key.values()]}
+
+    updates = []  # (items, fields)
+    for outcome in ('created', 'present'):
+        for entry in result.get(outcome, []):
+            updates.append((items_by_key[normalize_title(entry['query'])], {
+                'status': MovieImportItem.DONE, 'movie': entry['movie'], 'error': '',
+            }))
+    for entry in result.get('not_found', []):
+        updates.append((items_by_key[normalize_title(entry['query'])], {
+            'status': MovieImportItem.NOT_FOUND, 'error': entry['error'],
+        }))
+    for entry in result.get('failed', []):
+        key_items = items_by_key[normalize_title(entry['query'])]
+        for item in key_items:
+            # attempts were incremented when the item was claimed
+            retry = item.attempts + 1 < settings.MOVIE_IMPORT_JOB_MAX_ATTEMPTS
+            updates.append(([item], {
+                'status': MovieImportItem.PENDING if retry else MovieImportItem.FAILED, 'error': entry['error'],
+            }))
+
+    now = timezone.now()
+    with transaction.atomic():
+        for update_items, fields in updates:
+            finished_at = None if fields['status'] == MovieImportItem.PENDING else now
+            MovieImportItem.objects.filter(id__in=[item.id for item in update_items]).update(
+                finished_at=finished_at, **fields
+            )
+
+
+def process_batch(batch_size: int) -> int:
+    """
+    Claim and process one batch of queued titles.
+
+    :return: number of processed items
+    """
+    items = claim_items(batch_size)
+    if items:
+        process_items(items)
+        logger.info(f'{len(items)} queued titles processed.')
+    return len(items)
+
+
+def run_workers(num_of_workers: int, batch_size: int, poll_interval: float, drain: bool = False,
+                stop: threading.Event = None) -> None:
+    """
+    Process the queue with many threads until `stop` is set (or Ctrl+C is pressed) or, if `drain` is True,
+    until the queue is empty. Workers always finish the batches they have claimed.
+    """
+    stop = stop or threading.Event()
+
+    def work():
+        try:
+            while not stop.is_set():
+                close_old_connections()
+                if not process_batch(batch_size):
+                    if drain:
+                        return
+                    stop.wait(poll_interval)
+        finally:
+            close_old_connections()
+
+    threads = [threading.Thread(target=work, name=f'movie-import-worker-{i}') for i in range(num_of_workers)]
+    for thread in threads:
+        thread.start()
+    try:
+        for thread in threads:
+            thread.join()
+    except KeyboardInterrupt:
+        logger.info('Stopping workers...')
+        stop.set()
+        for thread in threads:
+            thread.join()
@@ -0,0 +1,95 @@
+import asyncio
+import hashlib
+import threading
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Hashable
+
+from django.db import connection
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Deduplicate concurrent calls within the process.
+
+    While the function is running for a given key, other threads calling `do` with the same key
+    do not call the function again - they wait for the running call and receive its result (or exception).
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+
+class AsyncSingleFlight:
+    """
+    Deduplicate concurrent calls of coroutine functions within the event loop (see `SingleFlight`).
+    """
+    def __init__(self):
+        self._calls = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        call = self._calls.get(key)
+        if call is None:
+            call = self._calls[key] = asyncio.ensure_future(fn())
+            call.add_done_callback(lambda _: self._calls.pop(key, None))
+        # cancellation of one of the callers must not cancel the call shared with the others
+        return await asyncio.shield(call)
+
+
+def lock_id(key: str) -> int:
+    """
+    Map the key to signed 64-bit integer used as the advisory lock identifier.
+    """
+    return int.from_bytes(hashlib.sha1(key.encode()).digest()[:8], 'big', signed=True)
+
+
+@contextmanager
+def advisory_lock(key: str):
+    """
+    Acquire database lock for the given key, so the block is executed by one process at a time.
+    No transaction is opened - the block can wait for an external API without keeping a transaction open.
+
+    PostgreSQL session-level advisory locks are used (released at the end of the block or when the connection
+    is closed). On other database backends the block is not guarded.
+    """
+    if connection.vendor != 'postgresql':
+        yield
+        return
+
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT pg_advisory_lock(%s)', [lock_id(key)])
+    try:
+        yield
+    finally:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_advisory_unlock(%s)', [lock_id(key)])
@@ -1,27 +1,35 @@
 import re
-import json
-import requests
 import logging
-from typing import Union, List
-from urllib import parse
-from dateutil.parser import parse as parse_date
+import operator
+from functools import reduce
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Union, List, Dict
 from datetime import date
 
+from django.conf import settings
 from django.core.exceptions import ValidationError
-from django.db.models import QuerySet, Count, F, Window, Q
+from django.db import transaction, IntegrityError
+from django.db.models import QuerySet, Sum, F, Window, Q
+from django.db.models.functions import Coalesce
 from django.db.models.functions.window import DenseRank
 from rest_framework import status as s
 
 from movies_api import models
 from comments.models import Comment
-from movies_db.settings import OMDB_API_KEY
-from business_logic import exceptions, utils
+from business_logic import exceptions, utils, locks, comment_stats, metrics, aio, generations
+from business_logic.omdb import API_HOST, get_client, get_async_client
+from business_logic.omdb_cache import get_response_cache
+from business_logic.utils import normalize_title
 
 
-API_HOST = 'http://www.omdbapi.com/'
+MOVIE_NOT_FOUND_ERROR = 'Movie not found.'
 
 logger = logging.getLogger(__name__)
 
+movie_fetches = locks.SingleFlight()
+async_movie_fetches = locks.AsyncSingleFlight()
+
 
 def fetch_movie_info(title: str, save_to_db: bool = True) -> models.Movie:
     """
@@ -35,43 +43,311 @@ def fetch_movie_info(title: str, save_to_db: bool = True) -> models.Movie:
     if not title:
         raise exceptions.BusinessLogicException('Please provide title movie', code=s.HTTP_400_BAD_REQUEST)
 
-    query = parse.urlencode({'t': title, 'apikey': OMDB_API_KEY})
-    request_addr = f'{API_HOST}?{query}'
-    logger.info(f'Fetching resources from: {request_addr}')
-    res = requests.get(request_addr)
-    movie_dict = json.loads(res.text)
+    if not save_to_db:
+        return build_movie(request_movie_details(title))
+
+    movie = find_movie(title)
+    if movie is not None:
+        logger.info(f'Movie {movie.title} (id: {movie.pk}) found in the database.')
+        return movie
+
+    # concurrent requests for the same title wait for the first one and share its result
+    return movie_fetches.do(normalize_title(title), lambda: save_movie(title))
+
+
+async def async_fetch_movie_info(title: str) -> models.Movie:
+    """
+    Asynchronous variant of `fetch_movie_info` (always saves the movie). The external API is called without
+    blocking a thread, database queries are run in the thread pool (see `business_logic.aio`).
+
+    :param title: title of the movie to save
+    :return: movie that was saved to database
+    :raises: BusinessLogicException if no movie was saved to database.
+    """
+    if not title:
+        raise exceptions.BusinessLogicException('Please provide title movie', code=s.HTTP_400_BAD_REQUEST)
+
+    movie = await aio.run_in_thread(find_movie, title)
+    if movie is not None:
+        logger.info(f'Movie {movie.title} (id: {movie.pk}) found in the database.')
+        return movie
+
+    async def fetch_and_save() -> models.Movie:
+        movie_dict = await async_request_movie_details(title)
+        return await aio.run_in_thread(save_movie, title, movie_dict)
+
+    return await async_movie_fetches.do(normalize_title(title), fetch_and_save)
+
+
+def save_movie(title: str, movie_dict: dict = None) -> models.Movie:
+    """
+    Fetch movie details and save the movie to database.
+    The check, the call of the external API and the insert are guarded by a database lock (held without
+    a transaction), so details of the same title are fetched by one worker at a time - the others wait and find
+    the saved movie. If the movie is already in the database, existing instance is returned.
+
+    :param title: title of the movie to save
+    :param movie_dict: movie details already fetched from the external API (fetched if omitted)
+    :return: saved movie
+    :raises: BusinessLogicException if no movie was saved to database.
+    """
+    with locks.advisory_lock(f'movie:{normalize_title(title)}'):
+        # the movie might have been saved by another process while the lock was being acquired
+        existing = find_movie(title)
+        if existing is not None:
+            logger.info(f'Movie {existing.title} (id: {existing.pk}) is already in the database.')
+            return existing
+
+        movie = build_movie(movie_dict if movie_dict is not None else request_movie_details(title))
+
+        try:
+            with transaction.atomic():
+                movie.save()
+            logger.info(f'Movie {movie.title} (id: {movie.pk}) saved to database.')
+        except IntegrityError:
+            # different title pointing to the same movie was saved in the meantime
+            movie = models.Movie.objects.get(title=movie.title)
+            logger.info(f'Movie {movie.title} (id: {movie.pk}) is already in the database.')
+        except ValidationError as e:
+            logger.exception(e)
+            raise exceptions.BusinessLogicException(e)
+
+        remember_aliases({normalize_title(title): movie})
+
+    return movie
+
+
+def find_movies(titles: List[str]) -> Dict[str, models.Movie]:
+    """
+    Look up movies that are already saved in the database, without calling the external API.
+    Titles are matched against aliases recorded by previous fetches and case-insensitively against movie titles.
+
+    :param titles: titles of the movies as provided by the user
+    :return: dictionary mapping normalized titles to the movies that were found
+    """
+    keys = {normalize_title(title) for title in titles}
+    aliases = models.MovieAlias.objects.filter(query__in=keys).select_related('movie')
+    found = {alias.query: alias.movie for alias in aliases}
+
+    missing = keys.difference(found)
+    if missing:
+        query = reduce(operator.or_, (Q(title__iexact=key) for key in missing))
+        for movie in models.Movie.objects.filter(query):
+            key = normalize_title(movie.title)
+            if key in missing:
+                found[key] = movie
+
+    return found
 
-    if 'Error' in movie_dict:
-        logger.error(f'Information about movie {title} could not be fetched (response: {movie_dict["Error"]})')
-        raise exceptions.BusinessLogicException(movie_dict['Error'])
 
+def find_movie(title: str) -> Union[models.Movie, None]:
+    """
+    Look up a movie that is already saved in the database.
+
+    :param title: title of the movie as provided by the user
+    :return: movie or None if it was not found
+    """
+    return find_movies([title]).get(normalize_title(title))
+
+
+def remember_aliases(movies: Dict[str, models.Movie]) -> None:
+    """
+    Save aliases of the fetched movies, so next lookups of the same titles are served from the database.
+
+    :param movies: dictionary mapping normalized titles to the movies they were resolved to
+    """
+    aliases = {key: movie for key, movie in movies.items() if key != normalize_title(movie.title)}
+    if not aliases:
+        return
+
+    existing = set(models.MovieAlias.objects.filter(query__in=aliases).values_list('query', flat=True))
+    try:
+        with transaction.atomic():
+            models.MovieAlias.objects.bulk_create(
+                models.MovieAlias(query=key, movie=movie) for key, movie in aliases.items() if key not in existing
+            )
+    except IntegrityError:
+        logger.warning(f'Aliases {list(aliases)} have been saved by a concurrent request.')
+
+
+def fetch_movies_info(titles: List[str]) -> Dict[str, List[dict]]:
+    """
+    Fetch details of many movies concurrently and save the new ones to database with a single query.
+
+    :param titles: titles of the movies to save
+    :return: dictionary with outcome of every title: `created` and `present` lists contain dictionaries
+        with `query` and `movie` keys, `not_found` and `failed` lists contain dictionaries with `query` and `error` keys.
+    :raises BusinessLogicException: if no titles or too many titles were provided
+    """
+    queries = OrderedDict()
+    for title in filter(None, titles):
+        queries.setdefault(normalize_title(title), title)
+    queries = list(queries.values())
+    if not queries:
+        raise exceptions.BusinessLogicException('Please provide title movie', code=s.HTTP_400_BAD_REQUEST)
+    if len(queries) > settings.MOVIE_IMPORT_MAX_TITLES:
+        raise exceptions.BusinessLogicException(
+            f'Too many titles (maximum is {settings.MOVIE_IMPORT_MAX_TITLES}).',
+            code=s.HTTP_400_BAD_REQUEST,
+        )
+
+    result = {'created': [], 'present': [], 'not_found': [], 'failed': []}
+
+    found = find_movies(queries)
+    result['present'].extend(
+        {'query': query, 'movie': found[normalize_title(query)]} for query in queries if normalize_title(query) in found
+    )
+    queries = [query for query in queries if normalize_title(query) not in found]
+
+    def fetch(title: str) -> Union[models.Movie, exceptions.BusinessLogicException]:
+        try:
+            return build_movie(request_movie_details(title))
+        except exceptions.BusinessLogicException as e:
+            return e
+        except (ValueError, OverflowError) as e:
+            # e.g. invalid release date or duration, only this title fails
+            logger.warning(f'Invalid details of movie {title}: {e}')
+            return exceptions.BusinessLogicException('Invalid response from external API.', code=s.HTTP_502_BAD_GATEWAY)
+
+    fetched = []
+    if queries:
+        workers = min(settings.MOVIE_IMPORT_WORKERS, len(queries))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            fetched = list(zip(queries, executor.map(fetch, queries)))
+
+    movies = OrderedDict()  # different queries may point to the same movie
+    for query, movie in fetched:
+        if isinstance(movie, exceptions.BusinessLogicException):
+            outcome = 'not_found' if movie.message == MOVIE_NOT_FOUND_ERROR else 'failed'
+            result[outcome].append({'query': query, 'error': movie.message})
+        else:
+            movies.setdefault(movie.title, (movie, []))[1].append(query)
+
+    for attempt in range(2):
+        existing = models.Movie.objects.in_bulk(list(movies), field_name='title')
+        new_movies = [movie for title, (movie, _) in movies.items() if title not in existing]
+        try:
+            with transaction.atomic():
+                models.Movie.objects.bulk_create(new_movies)
+            break
+        except IntegrityError:
+            # some of the movies were saved by a concurrent request, skip them in the next attempt
+            if attempt:
+                raise
+
+    if new_movies:
+        # bulk_create does not send post_save signals (see movies_api.signals)
+        generations.bump(models.Movie)
+
+    for title, (movie, movie_queries) in movies.items():
+        outcome, movie = ('present', existing[title]) if title in existing else ('created', movie)
+        result[outcome].extend({'query': query, 'movie': movie} for query in movie_queries)
+
+    remember_aliases({
+        normalize_title(query): existing.get(title, movie)
+        for title, (movie, movie_queries) in movies.items() for query in movie_queries
+    })
+
+    logger.info(
+        f'Movies import finished (created: {len(result["created"])}, present: {len(result["present"])}, '
+        f'not found: {len(result["not_found"])}, failed: {len(result["failed"])}).'
+    )
+    return result
+
+
+def request_movie_details(title: str) -> dict:
+    """
+    Get details of the movie from the response cache or from the external API.
+
+    :param title: title of the movie
+    :return: dictionary decoded from the external API response
+    :raises BusinessLogicException: if the movie could not be found
+    """
+    movie_dict = get_response_cache().get(title)
+    if movie_dict is not None:
+        logger.info(f'Response for title {title} found in cache.')
+        return check_movie_details(title, movie_dict, cached=True)
+
+    logger.info(f'Fetching information about movie {title} from external API.')
+    try:
+        with metrics.OMDB_REQUEST_DURATION.time():
+            movie_dict = get_client().get_movie(title)
+    except exceptions.BusinessLogicException:
+        metrics.OMDB_REQUESTS.inc(outcome='failed')
+        raise
+    return check_movie_details(title, movie_dict)
+
+
+async def async_request_movie_details(title: str) -> dict:
+    """
+    Asynchronous variant of `request_movie_details`.
+    """
+    movie_dict = get_response_cache().get(title)
+    if movie_dict is not None:
+        logger.info(f'Response for title {title} found in cache.')
+        return check_movie_details(title, movie_dict, cached=True)
+
+    logger.info(f'Fetching information about movie {title} from external API.')
+    try:
+        with metrics.OMDB_REQUEST_DURATION.time():
+            movie_dict = await get_async_client().get_movie(title)
+    except exceptions.BusinessLogicException:
+        metrics.OMDB_REQUESTS.inc(outcome='failed')
+        raise
+    return check_movie_details(title, movie_dict)
+
+
+def check_movie_details(title: str, movie_dict: dict, cached: bool = False) -> dict:
+    """
+    Cache the external API response and record its outcome.
+
+    :param title: title of the movie
+    :param movie_dict: dictionary decoded from the external API response
+    :param cached: True if the response comes from the cache
+    :return: movie_dict
+    :raises BusinessLogicException: if the response contains an error
+    """
+    error = movie_dict.get('Error')
+    if cached:
+        outcome = 'cached'
+    elif error is None:
+        outcome = 'found'
+    else:
+        outcome = 'not_found' if error == MOVIE_NOT_FOUND_ERROR else 'error'
+    metrics.OMDB_REQUESTS.inc(outcome=outcome)
+
+    # do not cache errors like exceeded request limit, only the information that movie does not exist
+    if not cached and outcome in ('found', 'not_found'):
+        get_response_cache().set(title, movie_dict)
+
+    if error is not None:
+        logger.error(f'Information about movie {title} could not be fetched (response: {error})')
+        raise exceptions.BusinessLogicException(error)
+
+    return movie_dict
+
+
+def build_movie(movie_dict: dict) -> models.Movie:
+    """
+    Create (unsaved) movie instance from the external API response.
+
+    :param movie_dict: dictionary decoded from the external API response
+    :return: movie instance
+    """
     f = utils.read_field
 
     release_date = f(movie_dict, 'Released')
     duration = f(movie_dict, 'Runtime')
 
-    movie = models.Movie(
+    return models.Movie(
         title=f(movie_dict, 'Title'),
         cover=f(movie_dict, 'Poster'),
-        release_date=parse_date(release_date) if release_date else None,
+        release_date=utils.parse_date(release_date),
         duration=int(re.sub(r'[^0-9]', '', duration)) if duration else None,
         director=f(movie_dict, 'Director'),
         website=f(movie_dict, 'Website'),
     )
 
-    if not save_to_db:
-        return movie
-
-    try:
-        movie.save()
-        movie.refresh_from_db()
-        logger.info(f'Movie {movie.title} (id: {movie.pk}) saved to database.')
-    except ValidationError as e:
-        logger.exception(e)
-        raise exceptions.BusinessLogicException(e)
-
-    return movie
-
 
 def add_comment(movie_id: int, comment_body: str, publish_date: date = None) -> Comment:
     """
@@ -95,19 +371,126 @@ def add_comment(movie_id: int, comment_body: str, publish_date: date = None) ->
     kwargs = {}
     if publish_date:
         kwargs['publish_date'] = publish_date
-    comment = Comment.objects.create(movie=movie, body=comment_body, **kwargs)
+    # daily comment counts are updated in the same transaction (see comments.signals)
+    with transaction.atomic():
+        comment = Comment.objects.create(movie=movie, body=comment_body, **kwargs)
     logger.info(f'Comment id:{comment.id} for movie ({movie.id}) has been saved.')
     return comment
 
 
-def get_ranking(date_from: date, date_until: date) -> Union[List[models.Movie], QuerySet]:
+def add_comments(items: List[dict]) -> List[dict]:
     """
-    Create Movies ranking based on amount of related Comments.
+    Add many comments at once.
+    Referenced movies are validated with a single query and valid comments are saved with `bulk_create`.
+    Invalid items do not prevent saving the valid ones.
 
-    :param date_from: date from (query: gte)
-    :param date_until: date until (query: lte)
-    :raises BusinessLogicException: if either date_from or date_until is not present
-    :return: QuerySet of Movies with annotated: `total_comments` and `rank`
+    :param items: dictionaries with `movie_id` (or `movie`), `body` and optional `publish_date` keys
+    :return: outcome of every item in the same order: dictionary with `index` key and either `comment`
+        (saved comment instance) or `errors` (list of error messages) key
+    :raises BusinessLogicException: if no items or too many items were provided
+    """
+    if not items:
+        raise exceptions.BusinessLogicException('Provide at least one comment.', code=s.HTTP_400_BAD_REQUEST)
+    if len(items) > settings.COMMENT_BULK_MAX_ITEMS:
+        raise exceptions.BusinessLogicException(
+            f'Too many comments (maximum is {settings.COMMENT_BULK_MAX_ITEMS}).',
+            code=s.HTTP_400_BAD_REQUEST,
+        )
+
+    results = []
+    comments = []  # (result, comment) pairs of valid items
+    for index, item in enumerate(items):
+        result = {'index': index}
+        results.append(result)
+        if not isinstance(item, dict):
+            result['errors'] = ['Comment should be an object.']
+            continue
+
+        errors = []
+        movie_id = item.get('movie_id', None) or item.get('movie', None)
+        try:
+            movie_id = utils.parse_int(movie_id, 'movie_id')
+            if not movie_id:
+                errors.append('Provide movie_id in request body.')
+        except exceptions.BusinessLogicException as e:
+            errors.append(e.message)
+        if not item.get('body', None):
+            errors.append('Comment cannot be empty.')
+        publish_date = item.get('publish_date', None)
+        if publish_date:
+            try:
+                publish_date = utils.parse_date(publish_date)
+            except (ValueError, OverflowError):
+                errors.append(f'Invalid publish_date: {publish_date}.')
+
+        if errors:
+            result['errors'] = errors
+            continue
+
+        kwargs = {'publish_date': publish_date} if publish_date else {}
+        comments.append((result, Comment(movie_id=movie_id, body=item['body'], **kwargs)))
+
+    movie_ids = {comment.movie_id for _, comment in comments}
+    existing_ids = set(models.Movie.objects.filter(id__in=movie_ids).values_list('id', flat=True))
+    valid = []
+    for result, comment in comments:
+        if comment.movie_id in existing_ids:
+            result['comment'] = comment
+            valid.append(comment)
+        else:
+            result['errors'] = [f'Movie with id {comment.movie_id} does not exist.']
+
+    with transaction.atomic():
+        Comment.objects.bulk_create(valid, batch_size=settings.COMMENT_BULK_BATCH_SIZE)
+        # bulk_create does not send post_save signals (see comments.signals)
+        comment_stats.record_comments((comment.movie_id, comment.publish_date) for comment in valid)
+        if valid:
+            generations.bump(Comment)
+
+    logger.info(f'{len(valid)} comments have been saved ({len(items) - len(valid)} invalid).')
+    return results
+
+
+def validate_titles(titles: Union[str, List[str]]) -> None:
+    """
+    Check title (or list of titles) provided by the user before anything is looked up or fetched.
+    Titles are stored (as aliases of the fetched movies and queued job items), so their length is limited.
+
+    :raises BusinessLogicException: if the title or any item of the list is not a non-empty string
+        or is too long
+    """
+    if not titles:
+        raise exceptions.BusinessLogicException('Please provide title movie', code=s.HTTP_400_BAD_REQUEST)
+
+    max_length = models.MovieAlias._meta.get_field('query').max_length
+
+    def check(title) -> Union[str, None]:
+        if not isinstance(title, str) or not title.strip():
+            return 'Title should be a non-empty string.'
+        if len(title) > max_length:
+            return f'Title cannot be longer than {max_length} characters.'
+        return None
+
+    if not isinstance(titles, list):
+        error = check(titles)
+        if error is not None:
+            raise exceptions.BusinessLogicException(error, code=s.HTTP_400_BAD_REQUEST)
+        return
+
+    errors = [{'index': index, 'error': error} for index, error in enumerate(map(check, titles)) if error is not None]
+    if errors:
+        raise exceptions.BusinessLogicException('Invalid titles.', code=s.HTTP_400_BAD_REQUEST, errors=errors)
+
+
+def validate_ranking_params(
+        date_from: date,
+        date_until: date,
+        min_comments: int = None,
+        limit: int = None,
+        offset: int = 0,
+) -> None:
+    """
+    :raises BusinessLogicException: if either date_from or date_until is not present or other parameter is invalid
     """
     errors = []
     if not date_from:
@@ -122,8 +505,52 @@ def get_ranking(date_from: date, date_until: date) -> Union[List[models.Movie],
             errors=errors,
         )
 
-    query = Q(comment__publish_date__gte=date_from, comment__publish_date__lte=date_until)
+    for name, value in (('min_comments', min_comments), ('limit', limit), ('offset', offset)):
+        if value is not None and value < 0:
+            errors.append(f'{name} cannot be negative')
+    if errors:
+        raise exceptions.BusinessLogicException('Invalid ranking parameters.', code=s.HTTP_400_BAD_REQUEST, errors=errors)
+
+
+def get_ranking(
+        date_from: date,
+        date_until: date,
+        min_comments: int = None,
+        limit: int = None,
+        offset: int = 0,
+) -> Union[List[models.Movie], QuerySet]:
+    """
+    Create Movies ranking based on amount of related Comments.
+    All the parameters are applied in the SQL query. Ranks are computed before the results are truncated,
+    so every movie keeps its rank regardless of `limit` and `offset`.
+
+    :param date_from: date from (query: gte)
+    :param date_until: date until (query: lte)
+    :param min_comments: skip movies with less comments than this number
+    :param limit: return at most this number of movies
+    :param offset: number of top movies to skip
+    :raises BusinessLogicException: if either date_from or date_until is not present or other parameter is invalid
+    :return: QuerySet of Movies with annotated: `total_comments` and `rank`, ordered by rank
+    """
+    validate_ranking_params(date_from, date_until, min_comments, limit, offset)
+
+    # sum precomputed daily counts, so the cost does not depend on the number of comments
+    query = Q(daily_comment_counts__day__gte=date_from, daily_comment_counts__day__lte=date_until)
+
+    ranking = models.Movie.objects\
+        .annotate(total_comments=Coalesce(Sum('daily_comment_counts__count', filter=query), 0))
+
+    # HAVING is evaluated before the window function, but it removes only the movies with the lowest
+    # number of comments, so dense ranks of the remaining movies do not change
+    if min_comments:
+        ranking = ranking.filter(total_comments__gte=min_comments)
+
+    ranking = ranking\
+        .annotate(rank=Window(expression=DenseRank(), order_by=F('total_comments').desc()))\
+        .order_by('rank', 'id')
 
-    return models.Movie.objects\
-        .annotate(total_comments=Count('comment', filter=query))\
-        .annotate(rank=Window(expression=DenseRank(), order_by=F('total_comments').desc()))
+    # LIMIT and OFFSET are evaluated after the window function
+    offset = offset or 0
+    if limit is not None:
+        return ranking[offset:offset + limit]
+    return ranking[offset:] if offset else ranking
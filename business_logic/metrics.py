@@ -0,0 +1,330 @@
+import os
+import json
+import time
+import fcntl
+import atexit
+import contextlib
+import logging
+import tempfile
+import threading
+from typing import Callable, Dict, Iterable, Sequence, Tuple
+
+from django.conf import settings
+from django.http import HttpRequest, HttpResponse
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (.005, .01, .025, .05, .075, .1, .25, .5, .75, 1.0, 2.5, 5.0, 7.5, 10.0, float('inf'))
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+# values of the finished processes merged together
+ARCHIVE_FILE = 'archive.json'
+LOCK_FILE = '.lock'
+
+# (sample name, ((label name, label value), ...))
+SampleKey = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+
+class Registry:
+    """
+    Values of the metrics of the current process.
+
+    All the metrics are additive (counters and histograms), so values of many processes (e.g. gunicorn workers)
+    are merged by summing them up. If `METRICS_DIR` setting is set, every process periodically writes its values
+    to `<METRICS_DIR>/<pid>.json` and `collect` merges the files of all the processes. Files of finished
+    processes are merged into `<METRICS_DIR>/archive.json`, so counters never go down and the number of files
+    does not grow with every restarted worker.
+    """
+    def __init__(self):
+        self.metrics: Dict[str, 'Metric'] = {}
+        self.values: Dict[SampleKey, float] = {}
+        self.lock = threading.Lock()
+        self.pid = os.getpid()
+        self.last_flush = time.monotonic()
+        # pid of the process which has written its file, a file found before belongs to a finished process
+        self.flushed_pid = None
+
+    def register(self, metric: 'Metric') -> None:
+        self.metrics[metric.name] = metric
+
+    def inc(self, samples: Iterable[Tuple[SampleKey, float]]) -> None:
+        with self.lock:
+            if self.pid != os.getpid():
+                # values inherited from the parent process are stored in the parent's file
+                self.values, self.pid = {}, os.getpid()
+            for key, amount in samples:
+                self.values[key] = self.values.get(key, 0.0) + amount
+        self.flush(force=False)
+
+    def flush(self, force: bool = True) -> None:
+        directory = settings.METRICS_DIR
+        if not directory or (not force and time.monotonic() - self.last_flush < settings.METRICS_FLUSH_INTERVAL):
+            return
+
+        with self.lock:
+            self.last_flush = time.monotonic()
+            data = [[name, labels, value] for (name, labels), value in self.values.items()]
+        pid = os.getpid()
+        with _locked(directory):
+            if self.flushed_pid != pid:
+                # pid of a finished process was reused, its values must not be overwritten
+                _archive(directory, [f'{pid}.json'])
+            _write(os.path.join(directory, f'{pid}.json'), data)
+        self.flushed_pid = pid
+
+    def collect(self) -> Dict[SampleKey, float]:
+        """
+        :return: values of the metrics merged from all the processes
+        """
+        with self.lock:
+            values = dict(self.values)
+
+        directory = settings.METRICS_DIR
+        if directory:
+            own_file = f'{os.getpid()}.json'
+            with _locked(directory):
+                _archive(directory, [
+                    name for name in os.listdir(directory)
+                    if _is_process_file(name) and not _is_running(int(name[:-len('.json')]))
+                ])
+                for name in os.listdir(directory):
+                    if not name.endswith('.json') or name == own_file:
+                        continue
+                    for key, value in _read(os.path.join(directory, name)).items():
+                        values[key] = values.get(key, 0.0) + value
+        return values
+
+    def clear(self) -> None:
+        with self.lock:
+            self.values = {}
+
+    def render(self) -> str:
+        """
+        :return: values of all the metrics in Prometheus text format
+        """
+        values = self.collect()
+        lines = []
+        for metric in sorted(self.metrics.values(), key=lambda metric: metric.name):
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.type}')
+            samples = sorted(
+                ((key, value) for key, value in values.items() if key[0] in metric.sample_names),
+                key=lambda sample: _sort_key(metric, sample[0]),
+            )
+            for (sample_name, labels), value in samples:
+                lines.append(f'{sample_name}{_format_labels(labels)} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+@contextlib.contextmanager
+def _locked(directory: str):
+    # files are archived and read under exclusive lock, so the values of a process are never counted twice
+    with open(os.path.join(directory, LOCK_FILE), 'a') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _is_process_file(name: str) -> bool:
+    return name.endswith('.json') and name[:-len('.json')].isdigit()
+
+
+def _is_running(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _read(path: str) -> Dict[SampleKey, float]:
+    try:
+        with open(path) as f:
+            samples = json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError):
+        logger.warning(f'Metrics file {os.path.basename(path)} could not be read.')
+        return {}
+    return {(sample_name, tuple(tuple(label) for label in labels)): value for sample_name, labels, value in samples}
+
+
+def _write(path: str, data: list) -> None:
+    # write and rename, so readers never see partially written file
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp')
+    with os.fdopen(fd, 'w') as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+def _archive(directory: str, names: Sequence[str]) -> None:
+    """
+    Merges the files of finished processes into the archive file and removes them. Must be called under the lock.
+    """
+    paths = [os.path.join(directory, name) for name in names if os.path.exists(os.path.join(directory, name))]
+    if not paths:
+        return
+    archive_path = os.path.join(directory, ARCHIVE_FILE)
+    values = _read(archive_path)
+    for path in paths:
+        for key, value in _read(path).items():
+            values[key] = values.get(key, 0.0) + value
+    _write(archive_path, [[name, labels, value] for (name, labels), value in values.items()])
+    for path in paths:
+        os.remove(path)
+
+
+def _sort_key(metric: 'Metric', key: SampleKey) -> tuple:
+    # samples of the same series together, buckets ordered by their upper bounds
+    sample_name, labels = key
+    bound = dict(labels).get('le')
+    return (
+        tuple(label for label in labels if label[0] != 'le'),
+        metric.sample_names.index(sample_name),
+        float(bound) if bound is not None else 0.0,
+    )
+
+
+def _format_labels(labels: Sequence[Tuple[str, str]]) -> str:
+    if not labels:
+        return ''
+    escaped = (
+        (name, value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')) for name, value in labels
+    )
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value))
+
+
+REGISTRY = Registry()
+atexit.register(lambda: REGISTRY.flush())
+
+
+class Metric:
+    type = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), registry: Registry = REGISTRY):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.registry = registry
+        registry.register(self)
+
+    @property
+    def sample_names(self) -> Tuple[str, ...]:
+        return (self.name,)
+
+    def label_values(self, labels: Dict[str, str]) -> Tuple[Tuple[str, str], ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f'Metric {self.name} expects labels: {", ".join(self.labelnames)}.')
+        return tuple((name, str(labels[name])) for name in self.labelnames)
+
+
+class Counter(Metric):
+    type = 'counter'
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        self.registry.inc([((self.name, self.label_values(labels)), amount)])
+
+
+class Histogram(Metric):
+    type = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS, registry: Registry = REGISTRY):
+        super().__init__(name, documentation, labelnames, registry)
+        self.buckets = tuple(buckets)
+
+    @property
+    def sample_names(self) -> Tuple[str, ...]:
+        return f'{self.name}_bucket', f'{self.name}_sum', f'{self.name}_count'
+
+    def observe(self, value: float, **labels: str) -> None:
+        label_values = self.label_values(labels)
+        # buckets are cumulative - the value is counted in every bucket with upper bound greater or equal to it
+        samples = [
+            ((f'{self.name}_bucket', label_values + (('le', _format_value(bound)),)), 1 if value <= bound else 0)
+            for bound in self.buckets
+        ]
+        samples.append(((f'{self.name}_sum', label_values), value))
+        samples.append(((f'{self.name}_count', label_values), 1))
+        self.registry.inc(samples)
+
+    def time(self, **labels: str) -> '_Timer':
+        """
+        Measure duration of the block::
+
+            with histogram.time(label='value'):
+                ...
+        """
+        return _Timer(lambda duration: self.observe(duration, **labels))
+
+
+class _Timer:
+    def __init__(self, callback: Callable[[float], None]):
+        self.callback = callback
+
+    def __enter__(self):
+        self.start = time.monotonic()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.callback(time.monotonic() - self.start)
+
+
+REQUESTS = Counter('http_requests_total', 'Number of handled requests.', ('method', 'view', 'status'))
+REQUEST_DURATION = Histogram('http_request_duration_seconds', 'Duration of handling requests.', ('method', 'view'))
+REQUEST_DB_DURATION = Histogram(
+    'http_request_db_duration_seconds', 'Time spent on database queries while handling requests.', ('method', 'view')
+)
+DB_QUERIES = Counter('db_queries_total', 'Number of database queries executed while handling requests.', ('view',))
+OMDB_REQUESTS = Counter('omdb_requests_total', 'Number of lookups of movie details by outcome.', ('outcome',))
+OMDB_REQUEST_DURATION = Histogram('omdb_request_duration_seconds', 'Duration of requests to the OMDb API.')
+
+
+def get_view_name(request: HttpRequest) -> str:
+    # names of the views (not paths) are used as labels, so the number of time series is limited
+    resolver_match = getattr(request, 'resolver_match', None)
+    return resolver_match.view_name if resolver_match is not None else '<unmatched>'
+
+
+class MetricsMiddleware:
+    """
+    Record latency, status and database usage of every request.
+
+    Database time and number of queries come from `business_logic.instrumentation.QueryInstrumentationMiddleware`,
+    which must be placed after this middleware.
+    """
+    def __init__(self, get_response: Callable[[HttpRequest], HttpResponse]):
+        self.get_response = get_response
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        start = time.monotonic()
+        response = self.get_response(request)
+        observe_request(request, response, time.monotonic() - start)
+        return response
+
+
+def observe_request(request: HttpRequest, response: HttpResponse, duration: float) -> None:
+    """
+    Record metrics of the handled request (also used by the asynchronous routes, see `business_logic.asgi`).
+    """
+    view = get_view_name(request)
+    REQUESTS.inc(method=request.method, view=view, status=response.status_code)
+    REQUEST_DURATION.observe(duration, method=request.method, view=view)
+    query_log = getattr(request, 'query_log', None)
+    if query_log is not None:
+        REQUEST_DB_DURATION.observe(query_log.duration, method=request.method, view=view)
+        DB_QUERIES.inc(len(query_log), view=view)
+
+
+def metrics_view(request: HttpRequest) -> HttpResponse:
+    return HttpResponse(REGISTRY.render(), content_type=CONTENT_TYPE)
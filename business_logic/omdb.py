@@ -0,0 +1,299 @@
+import os
+import json
+import asyncio
+import inspect
+import weakref
+import time
+import random
+import logging
+import threading
+from typing import Mapping
+from urllib import parse
+
+import aiohttp
+import requests
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+from rest_framework import status as s
+
+from business_logic import exceptions
+
+
+API_HOST = 'http://www.omdbapi.com/'
+
+DEFAULT_CLIENT_SETTINGS = {
+    'CONNECT_TIMEOUT': 3.05,
+    'READ_TIMEOUT': 10,
+    'MAX_RETRIES': 2,
+    'BACKOFF_FACTOR': 0.3,
+    'BACKOFF_MAX': 5,
+    'POOL_MAXSIZE': 10,
+    'MAX_CONNECTIONS': 500,
+    'MAX_RESPONSE_SIZE': 1024 * 1024,
+}
+
+# response statuses after which the request can be safely repeated
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+logger = logging.getLogger(__name__)
+
+
+class BaseOmdbClient:
+    """
+    Configuration and response handling shared by the synchronous and the asynchronous client.
+    """
+    def __init__(
+            self,
+            api_key: str,
+            host: str = API_HOST,
+            connect_timeout: float = 3.05,
+            read_timeout: float = 10,
+            max_retries: int = 2,
+            backoff_factor: float = 0.3,
+            backoff_max: float = 5,
+    ):
+        self.api_key = api_key
+        self.host = host
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.backoff_max = backoff_max
+
+    def get_movie_url(self, title: str) -> str:
+        query = parse.urlencode({'t': title, 'apikey': self.api_key})
+        return f'{self.host}?{query}'
+
+    def parse_movie(self, res) -> dict:
+        """
+        :param res: response with `status_code` and `text` attributes
+        :return: dictionary decoded from the response body
+        :raises BusinessLogicException: if the response body is not valid JSON
+        """
+        try:
+            return json.loads(res.text)
+        except ValueError:
+            logger.error(f'Invalid response received from OMDb API (status: {res.status_code}).')
+            raise exceptions.BusinessLogicException('Invalid response from external API.', code=s.HTTP_502_BAD_GATEWAY)
+
+    def get_backoff(self, attempt: int) -> float:
+        """
+        :param attempt: number of the retry (starting from 1)
+        :return: number of seconds to wait before the retry
+        """
+        return random.uniform(0, min(self.backoff_max, self.backoff_factor * 2 ** (attempt - 1)))
+
+    def get_status_error(self, status_code: int) -> exceptions.BusinessLogicException:
+        return exceptions.BusinessLogicException(
+            f'External API responded with status {status_code}.',
+            code=s.HTTP_502_BAD_GATEWAY,
+        )
+
+
+class OmdbClient(BaseOmdbClient):
+    """
+    HTTP client of the OMDb API.
+
+    Keeps a pool of keep-alive connections and retries failed GET requests
+    with exponential backoff (with full jitter).
+    """
+    def __init__(self, api_key: str, pool_maxsize: int = 10, **kwargs):
+        super().__init__(api_key, **kwargs)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize, max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def get_movie(self, title: str) -> dict:
+        """
+        Fetch movie details.
+
+        :param title: title of the movie
+        :return: dictionary decoded from the response body
+        :raises BusinessLogicException: if the API could not be reached or returned invalid response
+        """
+        return self.parse_movie(self.get(self.get_movie_url(title)))
+
+    def get(self, url: str) -> requests.Response:
+        """
+        Send GET request, retrying it if connection failed, timed out or server responded with temporary error.
+
+        :param url: requested address
+        :return: response
+        :raises BusinessLogicException: when the retries are exhausted
+        """
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                time.sleep(self.get_backoff(attempt))
+
+            start = time.monotonic()
+            try:
+                res = self.session.get(url, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                elapsed = (time.monotonic() - start) * 1000
+                logger.warning(f'GET {self.host} failed after {elapsed:.1f} ms (attempt {attempt + 1}): {e!r}')
+                error = exceptions.BusinessLogicException(
+                    'External API is unavailable.',
+                    code=s.HTTP_504_GATEWAY_TIMEOUT if isinstance(e, requests.Timeout) else s.HTTP_503_SERVICE_UNAVAILABLE,
+                )
+                continue
+
+            elapsed = (time.monotonic() - start) * 1000
+            logger.info(f'GET {self.host} -> {res.status_code} in {elapsed:.1f} ms (attempt {attempt + 1})')
+            if res.status_code not in RETRY_STATUSES:
+                return res
+            error = self.get_status_error(res.status_code)
+
+        raise error
+
+
+class AsyncResponse:
+    def __init__(self, status_code: int, headers: Mapping[str, str], content: bytes):
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+
+    @property
+    def text(self) -> str:
+        return self.content.decode('utf-8', errors='replace')
+
+
+class AsyncOmdbClient(BaseOmdbClient):
+    """
+    Asynchronous HTTP client of the OMDb API built on aiohttp.
+
+    Keeps a pool of at most `max_connections` keep-alive connections (the session is bound to the event loop it was
+    created in). Failed requests are retried the same way as by `OmdbClient`. Redirects are not followed
+    and responses larger than `max_response_size` bytes are rejected.
+    """
+    def __init__(self, api_key: str, max_connections: int = 500, max_response_size: int = 1024 * 1024, **kwargs):
+        super().__init__(api_key, **kwargs)
+        self.max_connections = max_connections
+        self.max_response_size = max_response_size
+        self.session = None
+
+    def get_session(self) -> aiohttp.ClientSession:
+        if self.session is None or self.session.closed:
+            connect_timeout, read_timeout = self.timeout
+            self.session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.max_connections),
+                timeout=aiohttp.ClientTimeout(sock_connect=connect_timeout, sock_read=read_timeout),
+                headers={'Accept': 'application/json'},
+            )
+        return self.session
+
+    async def close(self) -> None:
+        if self.session is not None:
+            await self.session.close()
+
+    async def get_movie(self, title: str) -> dict:
+        """
+        Fetch movie details.
+
+        :param title: title of the movie
+        :return: dictionary decoded from the response body
+        :raises BusinessLogicException: if the API could not be reached or returned invalid response
+        """
+        return self.parse_movie(await self.get(self.get_movie_url(title)))
+
+    async def get(self, url: str) -> AsyncResponse:
+        """
+        Send GET request, retrying it if connection failed, timed out or server responded with temporary error.
+
+        :param url: requested address
+        :return: response
+        :raises BusinessLogicException: when the retries are exhausted
+        """
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                await asyncio.sleep(self.get_backoff(attempt))
+
+            start = time.monotonic()
+            try:
+                res = await self.request(url)
+            except (aiohttp.ClientConnectionError, OSError, asyncio.TimeoutError) as e:
+                elapsed = (time.monotonic() - start) * 1000
+                logger.warning(f'GET {self.host} failed after {elapsed:.1f} ms (attempt {attempt + 1}): {e!r}')
+                error = exceptions.BusinessLogicException(
+                    'External API is unavailable.',
+                    code=s.HTTP_504_GATEWAY_TIMEOUT if isinstance(e, asyncio.TimeoutError) else s.HTTP_503_SERVICE_UNAVAILABLE,
+                )
+                continue
+            except (aiohttp.ClientError, ValueError) as e:
+                logger.error(f'Invalid HTTP response received from {self.host}: {e!r}')
+                raise exceptions.BusinessLogicException('Invalid response from external API.', code=s.HTTP_502_BAD_GATEWAY)
+
+            elapsed = (time.monotonic() - start) * 1000
+            logger.info(f'GET {self.host} -> {res.status_code} in {elapsed:.1f} ms (attempt {attempt + 1})')
+            if 300 <= res.status_code < 400:
+                # the API is not expected to redirect, the target is not trusted
+                logger.error(f'Redirect received from {self.host} (location: {res.headers.get("location")}).')
+                raise self.get_status_error(res.status_code)
+            if res.status_code not in RETRY_STATUSES:
+                return res
+            error = self.get_status_error(res.status_code)
+
+        raise error
+
+    async def request(self, url: str) -> AsyncResponse:
+        """
+        :raises ValueError: if the response is larger than `max_response_size`
+        """
+        async with self.get_session().get(url, allow_redirects=False) as res:
+            if res.content_length is not None and res.content_length > self.max_response_size:
+                raise ValueError(f'Response is larger than {self.max_response_size} bytes.')
+            chunks, size = [], 0
+            async for chunk in res.content.iter_chunked(64 * 1024):
+                size += len(chunk)
+                if size > self.max_response_size:
+                    raise ValueError(f'Response is larger than {self.max_response_size} bytes.')
+                chunks.append(chunk)
+            return AsyncResponse(res.status, res.headers, b''.join(chunks))
+
+
+def _client_options(client_class: type) -> dict:
+    options = dict(DEFAULT_CLIENT_SETTINGS, **getattr(settings, 'OMDB_CLIENT', {}))
+    options = {key.lower(): value for key, value in options.items()}
+    # settings of one client (e.g. pool size) do not apply to the other
+    parameters = set(inspect.signature(client_class).parameters) | set(inspect.signature(BaseOmdbClient).parameters)
+    return {key: value for key, value in options.items() if key in parameters}
+
+
+_client = None
+_client_pid = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> OmdbClient:
+    """
+    Return OMDb client shared by all threads of the current process.
+    New client is created after fork, so worker processes never share connections.
+    """
+    global _client, _client_pid
+    if _client is None or _client_pid != os.getpid():
+        with _client_lock:
+            if _client is None or _client_pid != os.getpid():
+                _client = OmdbClient(settings.OMDB_API_KEY, **_client_options(OmdbClient))
+                _client_pid = os.getpid()
+    return _client
+
+
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def get_async_client() -> AsyncOmdbClient:
+    """
+    Return asynchronous OMDb client of the current event loop.
+    """
+    loop = asyncio.get_event_loop()
+    if loop not in _async_clients:
+        _async_clients[loop] = AsyncOmdbClient(settings.OMDB_API_KEY, **_client_options(AsyncOmdbClient))
+    return _async_clients[loop]
+
+
+async def close_async_client() -> None:
+    """
+    Close connections of the asynchronous OMDb client of the current event loop (e.g. when the server shuts down).
+    """
+    client = _async_clients.pop(asyncio.get_event_loop(), None)
+    if client is not None:
+        await client.close()
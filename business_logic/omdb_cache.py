@@ -0,0 +1,135 @@
+import abc
+import time
+import threading
+from collections import OrderedDict
+from typing import Union
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from business_logic.utils import normalize_title
+
+
+DEFAULT_CACHE_SETTINGS = {
+    'BACKEND': 'business_logic.omdb_cache.LRUResponseCache',
+    'TTL': 60 * 60 * 24,
+    'NEGATIVE_TTL': 60 * 10,
+    'MAX_SIZE': 1024,
+}
+
+
+class BaseResponseCache(abc.ABC):
+    """
+    Interface of the cache storing responses received from the external API.
+
+    Responses are stored as dictionaries decoded from the response body. Negative results
+    (responses containing `Error` key) are stored with a shorter time to live.
+    """
+    def __init__(self, ttl: float, negative_ttl: float, **kwargs):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.hits = 0
+        self.misses = 0
+
+    @abc.abstractmethod
+    def get(self, title: str) -> Union[dict, None]:
+        """
+        :param title: title of the movie
+        :return: cached response or None if there was no valid entry for the title.
+        """
+
+    @abc.abstractmethod
+    def set(self, title: str, response: dict) -> None:
+        pass
+
+    @abc.abstractmethod
+    def clear(self) -> None:
+        pass
+
+    def get_ttl(self, response: dict) -> float:
+        return self.negative_ttl if 'Error' in response else self.ttl
+
+    def stats(self) -> dict:
+        return {'hits': self.hits, 'misses': self.misses}
+
+
+class LRUResponseCache(BaseResponseCache):
+    """
+    In-process cache with a bounded number of entries.
+    When the cache is full, least recently used entry is evicted.
+    """
+    def __init__(self, ttl: float, negative_ttl: float, max_size: int = 1024, **kwargs):
+        super().__init__(ttl, negative_ttl, **kwargs)
+        self.max_size = max_size
+        self.evictions = 0
+        self._entries = OrderedDict()  # normalized title -> (expiration time, response)
+        self._lock = threading.Lock()
+
+    def get(self, title: str) -> Union[dict, None]:
+        key = normalize_title(title)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, title: str, response: dict) -> None:
+        key = normalize_title(title)
+        expires_at = time.monotonic() + self.get_ttl(response)
+        with self._lock:
+            self._entries[key] = (expires_at, response)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def stats(self) -> dict:
+        stats = super().stats()
+        stats.update(size=len(self._entries), max_size=self.max_size, evictions=self.evictions)
+        return stats
+
+
+class DummyResponseCache(BaseResponseCache):
+    """
+    Cache that does not store anything. Can be used to disable caching.
+    """
+    def get(self, title: str) -> Union[dict, None]:
+        self.misses += 1
+        return None
+
+    def set(self, title: str, response: dict) -> None:
+        pass
+
+    def clear(self) -> None:
+        self.hits = 0
+        self.misses = 0
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> BaseResponseCache:
+    """
+    Return process-wide response cache configured with `OMDB_RESPONSE_CACHE` setting.
+    """
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                options = dict(DEFAULT_CACHE_SETTINGS, **getattr(settings, 'OMDB_RESPONSE_CACHE', {}))
+                backend = import_string(options.pop('BACKEND'))
+                _cache = backend(**{key.lower(): value for key, value in options.items()})
+    return _cache
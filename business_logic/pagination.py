@@ -0,0 +1,124 @@
+import json
+import base64
+import binascii
+from collections import OrderedDict
+from typing import Any, List, Sequence, Union
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q, QuerySet
+from rest_framework import status as s
+from rest_framework.pagination import BasePagination
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from business_logic import exceptions
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination based on the values of the ordering fields (keyset pagination).
+
+    The next page starts right after the last row of the current one (`WHERE (a, b) > (last_a, last_b)`),
+    so the cost of fetching a page does not depend on how deep the page is.
+    Ordering fields must identify the row uniquely (the last one should be the primary key)
+    and should be covered by an index. Fields can be prefixed with `-` for descending order.
+
+    Views can override the ordering with `keyset_ordering` attribute or `get_keyset_ordering(request)` method.
+    """
+    ordering = ('id',)
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+
+    def paginate_queryset(self, queryset: QuerySet, request: Request, view=None) -> List[Any]:
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(request, view)
+        self.model = queryset.model
+
+        queryset = queryset.order_by(*self.ordering)
+        position = self.decode_cursor(request)
+        if position is not None:
+            queryset = queryset.filter(self.get_position_filter(position))
+
+        # fetch one more row to find out whether there is a next page
+        rows = list(queryset[:self.page_size + 1])
+        self.has_next = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        self.next_position = self.get_position(rows[-1], queryset) if self.has_next else None
+        return rows
+
+    def get_paginated_response(self, data) -> Response:
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('results', data),
+        ]))
+
+    def get_page_size(self, request: Request) -> int:
+        page_size = settings.PAGINATION_PAGE_SIZE
+        if self.page_size_query_param in request.query_params:
+            try:
+                page_size = int(request.query_params[self.page_size_query_param])
+            except ValueError:
+                raise exceptions.BusinessLogicException('page_size should be an integer.', code=s.HTTP_400_BAD_REQUEST)
+        return max(1, min(page_size, settings.PAGINATION_MAX_PAGE_SIZE))
+
+    def get_ordering(self, request: Request, view=None) -> Sequence[str]:
+        if hasattr(view, 'get_keyset_ordering'):
+            return view.get_keyset_ordering(request)
+        return getattr(view, 'keyset_ordering', self.ordering)
+
+    def get_position(self, row: Union[Any, tuple, dict], queryset: QuerySet) -> list:
+        """
+        Read values of the ordering fields from the row. Rows can be model instances,
+        dictionaries (`.values()`) or tuples (`.values_list()`).
+        """
+        names = [field.lstrip('-') for field in self.ordering]
+        if isinstance(row, dict):
+            return [row[name] for name in names]
+        if isinstance(row, tuple):
+            fields = list(queryset.query.values_select)
+            return [row[fields.index(name)] for name in names]
+        return [getattr(row, name) for name in names]
+
+    def get_position_filter(self, position: list) -> Q:
+        # (a, b, c) > (x, y, z)  <=>  a > x OR (a = x AND b > y) OR (a = x AND b = y AND c > z)
+        query = Q()
+        equal = Q()
+        for field, value in zip(self.ordering, position):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            query |= equal & Q(**{f'{name}__{lookup}': value})
+            equal &= Q(**{name: value})
+
+        # redundant condition on the first field allows using it as an index range bound
+        first = self.ordering[0]
+        return Q(**{f'{first.lstrip("-")}__{"lte" if first.startswith("-") else "gte"}': position[0]}) & query
+
+    def encode_cursor(self, position: list) -> str:
+        data = json.dumps(position, cls=DjangoJSONEncoder, separators=(',', ':'))
+        return base64.urlsafe_b64encode(data.encode()).decode()
+
+    def decode_cursor(self, request: Request) -> Union[list, None]:
+        cursor = request.query_params.get(self.cursor_query_param)
+        if not cursor:
+            return None
+
+        try:
+            position = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+            if not isinstance(position, list) or len(position) != len(self.ordering):
+                raise ValueError
+            return [
+                self.model._meta.get_field(field.lstrip('-')).to_python(value)
+                for field, value in zip(self.ordering, position)
+            ]
+        except (ValueError, TypeError, binascii.Error, ValidationError):
+            raise exceptions.BusinessLogicException('Invalid cursor.', code=s.HTTP_400_BAD_REQUEST)
+
+    def get_next_link(self) -> Union[str, None]:
+        if self.next_position is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.next_position))
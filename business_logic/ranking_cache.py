@@ -0,0 +1,46 @@
+from datetime import date
+from typing import Union
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpRequest
+
+from comments.models import CommentDailyCount
+from movies_api.models import Movie
+from business_logic import generations, response_cache
+
+
+KEY_PREFIX = 'ranking'
+
+
+def make_key(date_from: date, date_until: date, request: HttpRequest = None, **params) -> str:
+    """
+    :param date_from: first day of the ranking window
+    :param date_until: last day of the ranking window
+    :param request: request the ranking is computed for (generations of the tables are read once per request)
+    :param params: other parameters the ranking depends on
+    :return: cache key of the ranking - it contains generations of the tables the ranking is computed from,
+        so a new comment or movie changes keys of all the rankings (entries with old keys expire)
+    """
+    generation = '.'.join(str(value) for value in generations.get(Movie, CommentDailyCount, request=request))
+    suffix = ''.join(f':{name}={value}' for name, value in sorted(params.items()) if value is not None)
+    return f'{KEY_PREFIX}:{generation}:{date_from.isoformat()}:{date_until.isoformat()}{suffix}'
+
+
+def get(key: str) -> Union[list, None]:
+    """
+    :param key: key created by `make_key` before the ranking was computed
+    :return: cached (serialized) ranking or None if there is no entry (or the cache is not shared by the processes)
+    """
+    if not response_cache.is_enabled():
+        return None
+    return cache.get(key)
+
+
+def set(key: str, data: list) -> None:
+    """
+    :param key: key created by `make_key` before the ranking was computed - if a write was committed in the meantime,
+        the ranking is stored under the old generation and is never read
+    """
+    if response_cache.is_enabled():
+        cache.set(key, data, settings.RANKING_CACHE_TIMEOUT)
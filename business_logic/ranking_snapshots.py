@@ -0,0 +1,102 @@
+import time
+import logging
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+from typing import Iterable, List, Tuple, Union
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from movies_api.models import RankingSnapshot, RankingSnapshotEntry
+from business_logic import generations
+from business_logic.main import get_ranking
+
+logger = logging.getLogger(__name__)
+
+
+def get_window(days: int, today: date = None) -> Tuple[date, date]:
+    """
+    :return: first and last day of the window of the last `days` days (including today)
+    """
+    date_until = today or date.today()
+    return date_until - timedelta(days=days - 1), date_until
+
+
+def build_snapshot(date_from: date, date_until: date) -> RankingSnapshot:
+    """
+    Compute the ranking of the window and save it as a snapshot replacing older snapshots of the same length.
+
+    :return: created snapshot
+    """
+    days = (date_until - date_from).days + 1
+    ranking = get_ranking(date_from, date_until).values('id', 'total_comments', 'rank')
+    sql, params = ranking.query.sql_with_params()
+    table = RankingSnapshotEntry._meta.db_table
+
+    with transaction.atomic():
+        snapshot = RankingSnapshot.objects.create(
+            days=days, date_from=date_from, date_until=date_until, built_at=timezone.now(),
+        )
+        # the ranking is copied inside the database, rows are not transferred to the application
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {table} (snapshot_id, movie_id, total_comments, rank) '
+                f'SELECT %s, ranking.id, ranking.total_comments, ranking.rank FROM ({sql}) ranking',
+                [snapshot.pk, *params],
+            )
+        RankingSnapshot.objects.filter(days=days).exclude(pk=snapshot.pk).delete()
+        generations.bump(RankingSnapshot)
+    return snapshot
+
+
+def build_snapshots(windows: Iterable[int] = None, today: date = None) -> List[RankingSnapshot]:
+    """
+    Build snapshots of the last N days for every N in `windows` (default: `RANKING_SNAPSHOT_WINDOWS` setting).
+    """
+    snapshots = []
+    for days in windows or settings.RANKING_SNAPSHOT_WINDOWS:
+        start = time.monotonic()
+        snapshot = build_snapshot(*get_window(days, today))
+        logger.info(
+            f'Ranking snapshot {snapshot.date_from} - {snapshot.date_until} built '
+            f'({time.monotonic() - start:.1f} s).'
+        )
+        snapshots.append(snapshot)
+    return snapshots
+
+
+def find_snapshot(date_from: date, date_until: date) -> Union[Tuple[int, datetime], None]:
+    """
+    Find the snapshot of exactly the given window, built not earlier than `RANKING_SNAPSHOT_MAX_AGE` seconds ago.
+    Snapshots are looked up in the database (there is only one snapshot of every window length), so snapshots
+    rebuilt by any process are found at once.
+
+    :return: id and build time of the snapshot or None
+    """
+    if date_from is None or date_until is None:
+        return None
+    min_built_at = timezone.now() - timedelta(seconds=settings.RANKING_SNAPSHOT_MAX_AGE)
+    return (
+        RankingSnapshot.objects
+        .filter(date_from=date_from, date_until=date_until, built_at__gte=min_built_at)
+        .order_by('-built_at')
+        .values_list('pk', 'built_at')
+        .first()
+    )
+
+
+def get_snapshot_ranking(snapshot_id: int, min_comments: int = None, limit: int = None,
+                         offset: int = 0) -> List[OrderedDict]:
+    """
+    :return: serialized ranking from the snapshot, the same as the ranking computed by `get_ranking`
+    """
+    entries = RankingSnapshotEntry.objects.filter(snapshot_id=snapshot_id).order_by('rank', 'movie_id')
+    if min_comments:
+        entries = entries.filter(total_comments__gte=min_comments)
+    offset = offset or 0
+    entries = entries[offset:offset + limit] if limit is not None else entries[offset:]
+    return [
+        OrderedDict([('id', movie_id), ('total_comments', total_comments), ('rank', rank)])
+        for movie_id, total_comments, rank in entries.values_list('movie_id', 'total_comments', 'rank')
+    ]
@@ -0,0 +1,91 @@
+import time
+import hashlib
+import logging
+from typing import Any, Callable, Tuple, Type
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import models
+from django.utils.http import urlencode
+from rest_framework.request import Request
+
+from business_logic import generations
+
+
+KEY_PREFIX = 'response'
+# interval (in seconds) of checking whether the entry built by another request is ready
+POLL_INTERVAL = 0.05
+
+logger = logging.getLogger(__name__)
+
+# backends private to the worker process - writes handled by other processes would not invalidate their entries
+PROCESS_LOCAL_BACKENDS = (LocMemCache,)
+
+
+def is_enabled() -> bool:
+    """
+    :return: True if the cache backend is shared by all the worker processes, so responses can be cached
+    """
+    # exact classes - subclasses (e.g. of the local memory cache in tests) can be shared
+    return type(caches['default']) not in PROCESS_LOCAL_BACKENDS
+
+
+def make_key(request: Request, *model_classes: Type[models.Model]) -> str:
+    """
+    :param request: GET request of a list
+    :param model_classes: models which tables the response is read from
+    :return: cache key of the response data: normalized (sorted, without empty values) query params
+        and current generations of the tables - a write to any of them changes the key of every entry
+    """
+    params = sorted(
+        (name, value) for name, values in request.query_params.lists() for value in values if value != ''
+    )
+    # links to the next page are absolute
+    digest = hashlib.md5(f'{request.build_absolute_uri(request.path)}?{urlencode(params)}'.encode()).hexdigest()
+    generation = '.'.join(str(value) for value in generations.get(*model_classes, request=request))
+    return f'{KEY_PREFIX}:{request.path}:{generation}:{digest}'
+
+
+def get_or_build(key: str, build: Callable[[], Any], timeout: int) -> Tuple[Any, bool]:
+    """
+    Get data from cache or build and cache it.
+
+    Only one request builds a missing entry (guarded with a lock in the cache), concurrent requests for the same
+    entry wait for it instead of running the same queries (cache stampede). If the entry is not ready within
+    `RESPONSE_CACHE_MAX_WAIT` seconds, the waiting request builds the data itself (without caching it).
+
+    :param key: cache key of the data
+    :param build: function building the data
+    :param timeout: number of seconds the data is cached for
+    :return: data and True if it was read from the cache
+    """
+    if not is_enabled():
+        return build(), False
+
+    data = cache.get(key)
+    if data is not None:
+        return data, True
+
+    lock_key = f'{key}:lock'
+    if not cache.add(lock_key, 1, settings.RESPONSE_CACHE_LOCK_TIMEOUT):
+        # a few reads of the entry, the lock is not polled
+        deadline = time.monotonic() + settings.RESPONSE_CACHE_MAX_WAIT
+        while time.monotonic() < deadline:
+            time.sleep(min(POLL_INTERVAL, max(deadline - time.monotonic(), 0)))
+            data = cache.get(key)
+            if data is not None:
+                return data, True
+        logger.info(f'Entry {key} was not built by another request in time.')
+        return build(), False
+
+    try:
+        # the entry might have been built while the lock was being acquired
+        data = cache.get(key)
+        if data is not None:
+            return data, True
+        data = build()
+        cache.set(key, data, timeout)
+        return data, False
+    finally:
+        cache.delete(lock_key)
@@ -0,0 +1,189 @@
+import re
+import logging
+import threading
+from collections import Counter, defaultdict
+from typing import Dict, List, Sequence, Set, Tuple
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Case, CharField, F, FloatField, Func, Lookup, Max, Q, QuerySet, Value, When
+from django.db.models.functions import Greatest
+from django.http import HttpRequest
+
+from movies_api.models import Movie
+from business_logic import generations
+
+
+logger = logging.getLogger(__name__)
+
+SEARCH_FIELDS = ('title', 'director')
+
+
+@CharField.register_lookup
+class TrigramWordSimilar(Lookup):
+    """
+    `pg_trgm` word similarity operator (`'query' <% column`), can be served by trigram GIN index.
+    """
+    lookup_name = 'trigram_word_similar'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{rhs} <%% {lhs}', rhs_params + lhs_params
+
+
+class TrigramWordSimilarity(Func):
+    function = 'WORD_SIMILARITY'
+    output_field = FloatField()
+
+    def __init__(self, expression, string: str, **extra):
+        super().__init__(Value(string), expression, **extra)
+
+
+def trigrams(text: str) -> Set[str]:
+    """
+    Split text into trigrams the same way as `pg_trgm` does: every word is lowercased
+    and padded with two spaces at the beginning and one at the end.
+    """
+    result = set()
+    for word in re.findall(r'\w+', (text or '').lower()):
+        padded = f'  {word} '
+        result.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return result
+
+
+def has_trigram_support() -> bool:
+    """
+    :return: True if the database has `pg_trgm` extension installed (see `movies_api` migrations)
+    """
+    if connection.vendor != 'postgresql':
+        return False
+    if connection.alias not in _trigram_support:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT EXISTS(SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm')")
+            _trigram_support[connection.alias] = cursor.fetchone()[0]
+    return _trigram_support[connection.alias]
+
+
+_trigram_support = {}
+
+
+class NgramIndex:
+    """
+    In-process inverted index of trigrams of the movies, used when the database cannot search by similarity.
+
+    The index is built on the first search and then catches up with movies added later (rows with greater ids)
+    when the generation of the movies table changes, so movies added by other processes are searchable too.
+    Removed movies are skipped by the database query, changes of already indexed titles are not picked up until
+    the process restarts.
+    """
+    def __init__(self, fields: Sequence[str] = SEARCH_FIELDS):
+        self.fields = fields
+        self.clear()
+        self.lock = threading.Lock()
+
+    def add(self, movie_id: int, values: Dict[str, str]) -> None:
+        for field in self.fields:
+            for trigram in trigrams(values.get(field)):
+                self.postings[field][trigram].add(movie_id)
+        self.last_id = max(self.last_id, movie_id)
+
+    def clear(self) -> None:
+        # field -> trigram -> ids of movies containing the trigram
+        self.postings = {field: defaultdict(set) for field in self.fields}
+        self.last_id = 0
+        self.generation = None
+
+    def refresh(self, generation: int = None) -> None:
+        """
+        :param generation: current generation of the movies table (see `generations`) - the database is not queried
+            if it is the same as at the previous refresh
+        """
+        with self.lock:
+            if generation is not None and generation == self.generation:
+                return
+            # the generation is read before the rows, so rows added meanwhile are read at the next refresh
+            self.generation = generation
+            last_id = Movie.objects.aggregate(last_id=Max('id'))['last_id'] or 0
+            if last_id < self.last_id:
+                # the newest movies were removed, ids might be reused - start from scratch
+                self.clear()
+            if last_id == self.last_id:
+                return
+
+            rows = Movie.objects.filter(id__gt=self.last_id).values_list('id', *self.fields).order_by('id')
+            num_of_rows = 0
+            for movie_id, *values in rows.iterator():
+                self.add(movie_id, dict(zip(self.fields, values)))
+                num_of_rows += 1
+            logger.debug(f'{num_of_rows} movies added to the search index.')
+
+    def search(self, query: str, threshold: float) -> List[Tuple[int, float]]:
+        """
+        :param query: searched phrase
+        :param threshold: minimal fraction of trigrams of the query that must be present in one of the fields
+        :return: pairs of (movie_id, relevance) ordered by relevance
+        """
+        query_trigrams = trigrams(query)
+        if not query_trigrams:
+            return []
+
+        relevance = Counter()
+        for field in self.fields:
+            hits = Counter()
+            for trigram in query_trigrams:
+                hits.update(self.postings[field].get(trigram, ()))
+            for movie_id, num_of_hits in hits.items():
+                relevance[movie_id] = max(relevance[movie_id], num_of_hits / len(query_trigrams))
+
+        matches = [(movie_id, score) for movie_id, score in relevance.items() if score >= threshold]
+        return sorted(matches, key=lambda match: (-match[1], match[0]))
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_index(request: HttpRequest = None) -> NgramIndex:
+    """
+    :param request: request the index is used for - the generation of the movies table is read once per request
+        (see `generations.get`), e.g. together with the ETag of the list of movies
+    :return: index of the movies, refreshed if the movies table was changed
+    """
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = NgramIndex()
+    _index.refresh(generations.get(Movie, request=request)[0])
+    return _index
+
+
+def search_movies(queryset: QuerySet, query: str, request: HttpRequest = None) -> QuerySet:
+    """
+    Find movies similar to the given phrase, tolerating typos.
+
+    :param queryset: queryset of movies to search in
+    :param query: searched phrase
+    :param request: request the search is made for (see `get_index`)
+    :return: queryset of matching movies with `relevance` annotation, ordered by relevance
+    """
+    if has_trigram_support():
+        similarities = [TrigramWordSimilarity(F(field), query) for field in SEARCH_FIELDS]
+        condition = Q()
+        for field in SEARCH_FIELDS:
+            condition |= Q(**{f'{field}__trigram_word_similar': query})
+        queryset = queryset.filter(condition).annotate(relevance=Greatest(*similarities))
+    else:
+        matches = get_index(request).search(query, settings.SEARCH_SIMILARITY_THRESHOLD)
+        matches = matches[:settings.SEARCH_MAX_CANDIDATES]
+        if not matches:
+            return queryset.none()
+        # relevance is a fraction of the trigrams of the query, so there are only a few distinct values
+        ids_by_score = defaultdict(list)
+        for movie_id, score in matches:
+            ids_by_score[score].append(movie_id)
+        queryset = queryset.filter(pk__in=[movie_id for movie_id, _ in matches]).annotate(relevance=Case(
+            *[When(pk__in=ids, then=Value(score)) for score, ids in ids_by_score.items()],
+            default=Value(0.0), output_field=FloatField(),
+        ))
+    return queryset.order_by('-relevance', 'id')
@@ -0,0 +1,90 @@
+from collections import OrderedDict
+from typing import Any, Callable, Iterable, List, Type
+
+from django.db.models import QuerySet
+from rest_framework import serializers, ISO_8601
+from rest_framework.settings import api_settings
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+
+def _make_converter(field: serializers.Field) -> Callable[[Any], Any]:
+    # converters reproduce `to_representation` of the fields (with default DRF settings) for raw column values
+    if isinstance(field, serializers.DateField):
+        output_format = getattr(field, 'format', api_settings.DATE_FORMAT)
+        if output_format is None or output_format.lower() != ISO_8601:
+            return field.to_representation
+        return lambda value: value if isinstance(value, str) else value.isoformat()
+    if isinstance(field, serializers.IntegerField):
+        return int
+    if isinstance(field, serializers.CharField):
+        return str
+    if isinstance(field, serializers.PrimaryKeyRelatedField) and field.pk_field is None:
+        # `.values_list()` returns primary key of the related object
+        return lambda value: value
+    return field.to_representation
+
+
+class ValuesSerializer:
+    """
+    Read-only counterpart of the given serializer that works on `.values_list()` rows instead of model instances.
+
+    Field names, order of the fields and representation of the values are the same as in the original serializer,
+    so the rendered output is identical, but no model instances and field objects are created for each row.
+    Only fields with `source` pointing to a model field or annotation are supported.
+    """
+    def __init__(self, serializer_class: Type[serializers.Serializer]):
+        fields = serializer_class().fields
+        self.names = list(fields)
+        self.columns = [field.source for field in fields.values()]
+        self.converters = [_make_converter(field) for field in fields.values()]
+
+    def values(self, queryset: QuerySet, *extra_columns: str) -> QuerySet:
+        """
+        :param queryset: queryset of the model of the serializer
+        :param extra_columns: columns read after the columns of the serializer (e.g. for keyset pagination),
+            they are not serialized
+        """
+        return queryset.values_list(*self.columns, *(column for column in extra_columns if column not in self.columns))
+
+    def to_representation(self, row: tuple) -> OrderedDict:
+        return OrderedDict(
+            (name, None if value is None else convert(value))
+            for name, convert, value in zip(self.names, self.converters, row)
+        )
+
+    def serialize(self, rows: Iterable[tuple]) -> List[OrderedDict]:
+        return [self.to_representation(row) for row in rows]
+
+
+_values_serializers = {}
+
+
+def get_values_serializer(serializer_class: Type[serializers.Serializer]) -> ValuesSerializer:
+    """
+    Return values serializer for the given serializer class. Serializers are created once per process.
+    """
+    if serializer_class not in _values_serializers:
+        _values_serializers[serializer_class] = ValuesSerializer(serializer_class)
+    return _values_serializers[serializer_class]
+
+
+class ValuesListMixin:
+    """
+    Serve list requests from `.values_list()` rows with `ValuesSerializer`.
+    """
+    def get_values_serializer(self) -> ValuesSerializer:
+        return get_values_serializer(self.get_serializer_class())
+
+    def list(self, request: Request, *args: Any, **kwargs: Any) -> Response:
+        values_serializer = self.get_values_serializer()
+        # fields of the keyset ordering are read even if they are not serialized
+        ordering = self.paginator.get_ordering(request, self) if hasattr(self.paginator, 'get_ordering') else ()
+        queryset = values_serializer.values(
+            self.filter_queryset(self.get_queryset()), *(field.lstrip('-') for field in ordering)
+        )
+
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(values_serializer.serialize(page))
+        return Response(values_serializer.serialize(queryset))
@@ -0,0 +1,70 @@
+import json
+from typing import Any, Iterable, Iterator
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.utils import encoders
+
+
+def to_json(data: Any) -> str:
+    """
+    Dump data the same way as `rest_framework.renderers.JSONRenderer` does with the default settings.
+    """
+    return json.dumps(data, cls=encoders.JSONEncoder, ensure_ascii=False, allow_nan=False, separators=(',', ':'))
+
+
+def json_array(items: Iterable[Any], buffer_size: int = 64 * 1024) -> Iterator[bytes]:
+    """
+    Encode items as JSON array, piece by piece.
+
+    :param items: items of the array
+    :param buffer_size: approximate size (in characters) of the produced chunks
+    :return: iterator of encoded chunks
+    """
+    buffer, size = ['['], 1
+    for i, item in enumerate(items):
+        chunk = to_json(item) if i == 0 else ',' + to_json(item)
+        buffer.append(chunk)
+        size += len(chunk)
+        if size >= buffer_size:
+            yield ''.join(buffer).encode()
+            buffer, size = [], 0
+    buffer.append(']')
+    yield ''.join(buffer).encode()
+
+
+class StreamingListMixin:
+    """
+    Adds opt-in streaming mode to list views (e.g. `GET /movies/?stream=1`).
+
+    In streaming mode the filtered queryset is read with a server-side cursor, every row is serialized as soon
+    as it is read and the JSON array is written incrementally, so memory usage does not depend on the number of rows.
+    Pagination is not applied - the whole list is returned.
+    """
+    stream_query_param = 'stream'
+
+    def is_streaming(self, request: Request) -> bool:
+        return request.query_params.get(self.stream_query_param) in ('1', 'true')
+
+    def list(self, request: Request, *args: Any, **kwargs: Any) -> Response:
+        if self.is_streaming(request):
+            return self.stream_list(request)
+        return super().list(request, *args, **kwargs)
+
+    def get_stream_ordering(self, request: Request):
+        paginator = self.paginator
+        if paginator is not None and hasattr(paginator, 'get_ordering'):
+            return paginator.get_ordering(request, self)
+        return ('pk',)
+
+    def stream_list(self, request: Request) -> StreamingHttpResponse:
+        queryset = self.filter_queryset(self.get_queryset()).order_by(*self.get_stream_ordering(request))
+        # views with read fast path (see `business_logic.serialization.ValuesListMixin`) stream plain tuples
+        serializer = self.get_values_serializer() if hasattr(self, 'get_values_serializer') else self.get_serializer()
+        if hasattr(serializer, 'values'):
+            queryset = serializer.values(queryset)
+
+        rows = (serializer.to_representation(obj) for obj in queryset.iterator(chunk_size=settings.STREAMING_CHUNK_SIZE))
+        return StreamingHttpResponse(json_array(rows), content_type='application/json')
@@ -1 +1,18 @@
 from business_logic.tests.main import *
+from business_logic.tests.omdb_cache import *
+from business_logic.tests.omdb import *
+from business_logic.tests.locks import *
+from business_logic.tests.comment_stats import *
+from business_logic.tests.streaming import *
+from business_logic.tests.serialization import *
+from business_logic.tests.search import *
+from business_logic.tests.instrumentation import *
+from business_logic.tests.metrics import *
+from business_logic.tests.datagen import *
+from business_logic.tests.asgi import *
+from business_logic.tests.jobs import *
+from business_logic.tests.generations import *
+from business_logic.tests.response_cache import *
+from business_logic.tests.ranking_snapshots import *
+from business_logic.tests.export import *
+from business_logic.tests.benchmarks import *
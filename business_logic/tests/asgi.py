@@ -0,0 +1,133 @@
+import json
+import time
+import asyncio
+from unittest import mock
+
+from django.core.wsgi import get_wsgi_application
+from django.conf import settings
+from django.test import TransactionTestCase, override_settings
+
+import business_logic as bl
+from business_logic import metrics
+from business_logic.asgi import AsgiHandler
+from movies_api import views
+from movies_api.models import Movie
+
+
+class TestAsgiHandler(TransactionTestCase):
+    def setUp(self):
+        bl.omdb_cache.get_response_cache().clear()
+        self.application = AsgiHandler(get_wsgi_application(), {('POST', '/movies/'): views.create_movie_async})
+        self.loop = asyncio.new_event_loop()
+        self.addCleanup(self.loop.close)
+
+    async def request(self, method: str, path: str, body: bytes = b'', content_type: bytes = b'application/json',
+                      query_string: bytes = b'', host: bytes = b'testserver') -> tuple:
+        messages = []
+
+        async def receive():
+            return {'type': 'http.request', 'body': body, 'more_body': False}
+
+        async def send(message):
+            messages.append(message)
+
+        scope = {
+            'type': 'http', 'method': method, 'path': path, 'query_string': query_string, 'http_version': '1.1',
+            'headers': [(b'content-type', content_type), (b'host', host)],
+            'server': ('testserver', 80), 'client': ('127.0.0.1', 5000),
+        }
+        await self.application(scope, receive, send)
+        status = messages[0]['status']
+        self.response_headers = {name.decode(): value.decode() for name, value in messages[0]['headers']}
+        content = b''.join(message.get('body', b'') for message in messages[1:])
+        if self.response_headers['content-type'] != 'application/json':
+            return status, content
+        return status, json.loads(content.decode())
+
+    def mock_client(self, delay: float = 0):
+        client = mock.MagicMock()
+        client.in_flight = client.max_in_flight = 0
+
+        async def get_movie(title: str) -> dict:
+            client.in_flight += 1
+            client.max_in_flight = max(client.max_in_flight, client.in_flight)
+            await asyncio.sleep(delay)
+            client.in_flight -= 1
+            return {'Title': title.title(), 'Released': '04 May 2012', 'Runtime': '143 min'}
+
+        client.get_movie = get_movie
+        return mock.patch('business_logic.main.get_async_client', return_value=client)
+
+    def test_create_movie_asynchronously(self):
+        with self.mock_client():
+            status, data = self.loop.run_until_complete(self.request('POST', '/movies/', b'{"title": "avengers"}'))
+        self.assertEqual(status, 200)
+        self.assertEqual(data['title'], 'Avengers')
+        self.assertEqual(data['duration'], 143)
+        self.assertTrue(Movie.objects.filter(title='Avengers').exists())
+
+    @override_settings(QUERY_INSTRUMENTATION={'REPORT_QUERY_COUNT': True})
+    def test_middleware_is_applied_to_asynchronous_route(self):
+        metrics.REGISTRY.clear()
+        with self.mock_client():
+            status, _ = self.loop.run_until_complete(self.request('POST', '/movies/', b'{"title": "avengers"}'))
+        self.assertEqual(status, 200)
+        self.assertEqual(self.response_headers['x-frame-options'], 'SAMEORIGIN')
+        # queries run in the threads of the pool are counted
+        num_of_queries = int(self.response_headers['x-query-count'])
+        self.assertGreater(num_of_queries, 0)
+
+        content = metrics.REGISTRY.render()
+        self.assertIn('http_requests_total{method="POST",view="movies",status="200"} 1.0', content)
+        self.assertIn(f'db_queries_total{{view="movies"}} {float(num_of_queries)}', content)
+
+    @override_settings(ALLOWED_HOSTS=['testserver'])
+    def test_host_is_validated(self):
+        with self.mock_client() as get_client_mock:
+            status, _ = self.loop.run_until_complete(
+                self.request('POST', '/movies/', b'{"title": "avengers"}', host=b'evil.example.com')
+            )
+        self.assertEqual(status, 400)
+        get_client_mock.assert_not_called()
+        self.assertFalse(Movie.objects.exists())
+
+    def test_missing_title(self):
+        status, data = self.loop.run_until_complete(self.request('POST', '/movies/', b'{}'))
+        self.assertEqual(status, 400)
+        self.assertEqual(data['message'], 'Please provide title movie')
+
+    @override_settings(DATA_UPLOAD_MAX_MEMORY_SIZE=10)
+    def test_request_body_size_is_limited(self):
+        with self.mock_client() as get_client_mock:
+            status, data = self.loop.run_until_complete(self.request('POST', '/movies/', b'{"title": "avengers"}'))
+        self.assertEqual(status, 413)
+        self.assertEqual(data['message'], 'Request body is too large.')
+        get_client_mock.assert_not_called()
+
+    def test_form_which_is_not_utf8_is_left_to_wsgi_application(self):
+        scope = {'query_string': b'', 'headers': [(b'content-type', b'application/x-www-form-urlencoded')]}
+        self.assertIsNone(self.loop.run_until_complete(views.create_movie_async(scope, b'title=\xff')))
+
+    def test_other_requests_are_handled_by_wsgi_application(self):
+        Movie.objects.create(title='Test')
+        status, data = self.loop.run_until_complete(self.request('GET', '/movies/', query_string=b'title=tes'))
+        self.assertEqual(status, 200)
+        self.assertListEqual([movie['title'] for movie in data['results']], ['Test'])
+
+        status, data = self.loop.run_until_complete(self.request('GET', '/movies/', query_string=b'stream=1'))
+        self.assertListEqual([movie['title'] for movie in data], ['Test'])
+
+    def test_many_fetches_in_flight(self):
+        async def create_movies():
+            return await asyncio.gather(*[
+                self.request('POST', '/movies/', json.dumps({'title': f'movie {i}'}).encode()) for i in range(100)
+            ])
+
+        start = time.monotonic()
+        with self.mock_client(delay=0.5) as get_client_mock:
+            responses = self.loop.run_until_complete(create_movies())
+        # far more requests wait for the external API at once than there are threads
+        self.assertGreater(get_client_mock.return_value.max_in_flight, 2 * settings.ASYNC_THREAD_WORKERS)
+        self.assertLess(time.monotonic() - start, 5)
+        self.assertTrue(all(status == 200 for status, _ in responses))
+        self.assertEqual(Movie.objects.count(), 100)
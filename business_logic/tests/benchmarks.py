@@ -0,0 +1,28 @@
+import datetime as dt
+
+from django.test import TransactionTestCase
+from django.utils import timezone
+
+from benchmarks import endpoints
+from comments.models import Comment, CommentDailyCount
+from movies_api import models
+
+
+class TestEndpointsBenchmark(TransactionTestCase):
+    def test_clear(self):
+        # every table referencing the movies must be emptied too, otherwise the benchmark cannot reseed
+        movie = models.Movie.objects.create(title='Test')
+        models.MovieAlias.objects.create(query='test movie', movie=movie)
+        Comment.objects.create(movie=movie, body='comment')
+        CommentDailyCount.objects.create(movie=movie, day=dt.date(2010, 1, 1), count=1)
+        job = models.MovieImportJob.objects.create()
+        models.MovieImportItem.objects.create(job=job, query='test', normalized_query='test', movie=movie)
+        snapshot = models.RankingSnapshot.objects.create(
+            days=1, date_from=dt.date(2010, 1, 1), date_until=dt.date(2010, 1, 1), built_at=timezone.now(),
+        )
+        models.RankingSnapshotEntry.objects.create(snapshot=snapshot, movie=movie, total_comments=1, rank=1)
+
+        endpoints.clear()
+        self.assertFalse(models.Movie.objects.exists())
+        self.assertFalse(Comment.objects.exists())
+        self.assertFalse(models.RankingSnapshotEntry.objects.exists())
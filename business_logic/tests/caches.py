@@ -0,0 +1,10 @@
+from django.core.cache.backends.locmem import LocMemCache
+
+
+class SharedLocMemCache(LocMemCache):
+    """
+    Local memory cache used as a shared cache - tests run in a single process.
+    """
+
+
+SHARED_CACHES = {'default': {'BACKEND': 'business_logic.tests.caches.SharedLocMemCache'}}
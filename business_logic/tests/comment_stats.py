@@ -0,0 +1,117 @@
+import datetime as dt
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+import business_logic as bl
+from business_logic import comment_stats
+from movies_api import models
+from comments.models import Comment, CommentDailyCount
+
+
+class TestCommentStats(TestCase):
+    def setUp(self):
+        self.movie = models.Movie.objects.create(title='mov')
+        self.day = dt.date(2010, 1, 1)
+
+    def daily_counts(self) -> dict:
+        return {(row.movie_id, row.day): row.count for row in CommentDailyCount.objects.all()}
+
+    def test_counts_follow_added_and_removed_comments(self):
+        bl.add_comment(self.movie.id, 'first', self.day)
+        bl.add_comment(self.movie.id, 'second', self.day)
+        comment = bl.add_comment(self.movie.id, 'third', self.day + dt.timedelta(days=1))
+        self.assertDictEqual(self.daily_counts(), {
+            (self.movie.id, self.day): 2,
+            (self.movie.id, self.day + dt.timedelta(days=1)): 1,
+        })
+
+        comment.publish_date = self.day
+        comment.save()
+        self.assertEqual(self.daily_counts()[(self.movie.id, self.day)], 3)
+
+        Comment.objects.filter(body='first').delete()
+        self.assertEqual(self.daily_counts()[(self.movie.id, self.day)], 2)
+
+    def test_record_many_comments(self):
+        other_movie = models.Movie.objects.create(title='other')
+        comment_stats.record_comments([(self.movie.id, self.day)] * 3 + [(other_movie.id, self.day)])
+        comment_stats.record_comments([(self.movie.id, self.day)])
+        self.assertDictEqual(self.daily_counts(), {(self.movie.id, self.day): 4, (other_movie.id, self.day): 1})
+
+    def test_deleting_movie_removes_its_counts(self):
+        bl.add_comment(self.movie.id, 'comment', self.day)
+        self.movie.delete()
+        self.assertFalse(CommentDailyCount.objects.exists())
+
+    def test_deletes_are_counted_in_aggregate(self):
+        other_movie = models.Movie.objects.create(title='other')
+        bl.add_comments([
+            {'movie_id': movie_id, 'body': 'comment', 'publish_date': str(self.day)}
+            for movie_id in (self.movie.id, other_movie.id)
+        ] * 20)
+
+        # comments are counted by the database, statistics are updated with a single query
+        with CaptureQueriesContext(connection) as queries:
+            Comment.objects.filter(movie=other_movie).delete()
+        self.assertLessEqual(len(queries), 8)
+        self.assertDictEqual(self.daily_counts(), {(self.movie.id, self.day): 20, (other_movie.id, self.day): 0})
+        self.assertEqual(models.Movie.objects.get(pk=other_movie.pk).comment_count, 0)
+
+        # comments of a deleted movie are deleted without loading them
+        with CaptureQueriesContext(connection) as queries:
+            self.movie.delete()
+        self.assertFalse(any(query['sql'].startswith('SELECT') and 'comments_comment' in query['sql']
+                             for query in queries))
+        self.assertFalse(Comment.objects.exists())
+
+    def test_updating_comment_does_not_read_it_again(self):
+        comment = Comment.objects.get(pk=bl.add_comment(self.movie.id, 'comment', self.day).pk)
+        comment.body = 'changed'
+        with CaptureQueriesContext(connection) as queries:
+            comment.save()
+        self.assertFalse(any(query['sql'].startswith('SELECT') for query in queries))
+
+    def test_rebuild_counts(self):
+        for day in (self.day, self.day, self.day + dt.timedelta(days=5)):
+            bl.add_comment(self.movie.id, 'comment', day)
+        CommentDailyCount.objects.update(count=100)
+
+        out = StringIO()
+        call_command('rebuild_comment_stats', '--date-until', str(self.day), stdout=out)
+        self.assertDictEqual(self.daily_counts(), {
+            (self.movie.id, self.day): 2,
+            (self.movie.id, self.day + dt.timedelta(days=5)): 100,
+        })
+
+        comment_stats.rebuild_daily_counts()
+        self.assertEqual(self.daily_counts()[(self.movie.id, self.day + dt.timedelta(days=5))], 1)
+
+    def test_comment_counts_of_movies(self):
+        other_movie = models.Movie.objects.create(title='other')
+        comment = bl.add_comment(self.movie.id, 'first', self.day)
+        bl.add_comments([{'movie_id': movie_id, 'body': 'comment'} for movie_id in (self.movie.id, other_movie.id)] * 2)
+        self.assertDictEqual(
+            dict(models.Movie.objects.values_list('id', 'comment_count')), {self.movie.id: 3, other_movie.id: 2}
+        )
+
+        comment.movie = other_movie
+        comment.save()
+        Comment.objects.filter(movie=self.movie).first().delete()
+        self.assertDictEqual(
+            dict(models.Movie.objects.values_list('id', 'comment_count')), {self.movie.id: 1, other_movie.id: 3}
+        )
+
+    def test_reconcile_comment_counts(self):
+        bl.add_comment(self.movie.id, 'comment', self.day)
+        models.Movie.objects.create(title='other', comment_count=5)
+        Comment.objects.bulk_create([Comment(movie=self.movie, body='not counted')])
+
+        out = StringIO()
+        call_command('reconcile_comment_counts', stdout=out)
+        self.assertIn('2 movies fixed', out.getvalue())
+        self.assertDictEqual(dict(models.Movie.objects.values_list('title', 'comment_count')), {'mov': 2, 'other': 0})
+        self.assertEqual(comment_stats.reconcile_comment_counts(), 0)
@@ -0,0 +1,61 @@
+import random
+import datetime as dt
+from collections import Counter
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Sum
+from django.test import SimpleTestCase, TestCase
+
+from business_logic import datagen
+from comments.models import Comment, CommentDailyCount
+from movies_api.models import Movie
+
+
+class TestRows(SimpleTestCase):
+    def test_zipf_cum_weights(self):
+        self.assertListEqual(datagen.zipf_cum_weights(3, 1), [1, 1.5, 1 + 1 / 2 + 1 / 3])
+
+    def test_comment_rows(self):
+        def rows(seed: int) -> list:
+            return list(datagen.comment_rows(
+                10000, range(100), random.Random(seed), dt.date(2019, 1, 1), dt.date(2019, 1, 31), zipf_exponent=1.2
+            ))
+
+        generated = rows(1)
+        self.assertEqual(len(generated), 10000)
+        self.assertListEqual(generated, rows(1))
+        self.assertTrue(all(dt.date(2019, 1, 1) <= day <= dt.date(2019, 1, 31) for _, _, day in generated))
+
+        # the most popular movie gets many times more comments than it would with uniform distribution
+        counts = Counter(movie_id for movie_id, _, _ in generated)
+        self.assertGreater(counts.most_common(1)[0][1], 10 * 10000 / 100)
+
+
+class TestGenerate(TestCase):
+    def test_generate(self):
+        Movie.objects.create(title='Existing')
+        datagen.generate(50, 1000, dt.date(2019, 1, 1), dt.date(2019, 12, 31), seed=1, drop_indexes=True,
+                         log=lambda message: None)
+
+        self.assertEqual(Movie.objects.count(), 51)
+        self.assertEqual(Comment.objects.count(), 1000)
+        self.assertEqual(CommentDailyCount.objects.aggregate(total=Sum('count'))['total'], 1000)
+        if connection.vendor == 'postgresql':
+            # dropped indexes were recreated
+            self.assertEqual(len(datagen.get_droppable_indexes(Comment)), 3)
+
+    def test_titles_of_runs_do_not_collide(self):
+        for _ in range(2):
+            datagen.generate(20, 0, dt.date(2019, 1, 1), dt.date(2019, 1, 31), seed=1, log=lambda message: None)
+        self.assertEqual(Movie.objects.values('title').distinct().count(), 40)
+
+        rows = [list(datagen.movie_rows(5, random.Random(1), run)) for run in ('a', 'b')]
+        self.assertFalse({row[0] for row in rows[0]} & {row[0] for row in rows[1]})
+
+    def test_command(self):
+        out = StringIO()
+        call_command('generate_data', movies=10, comments=100, date_from=dt.date(2019, 1, 1), stdout=out)
+        self.assertIn('Data generated.', out.getvalue())
+        self.assertEqual(Comment.objects.count(), 100)
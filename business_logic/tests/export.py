@@ -0,0 +1,76 @@
+import csv
+import json
+import datetime as dt
+
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from business_logic import export
+from movies_api import models
+from comments.models import Comment
+
+
+class TestExport(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.movies = [
+            models.Movie.objects.create(title=f'movie {i}', release_date=dt.date(2000 + i, 1, 1), duration=100 + i)
+            for i in range(5)
+        ]
+        Comment.objects.create(movie=self.movies[1], body='second', publish_date=dt.date(2010, 1, 2))
+        Comment.objects.create(movie=self.movies[1], body='first, "quoted"\nmultiline', publish_date=dt.date(2010, 1, 1))
+        Comment.objects.create(movie=self.movies[3], body='other', publish_date=dt.date(2010, 1, 1))
+
+    def export(self, output_format: str, **kwargs) -> str:
+        return b''.join(export.export_movies(models.Movie.objects.all(), output_format, **kwargs)).decode()
+
+    def test_ndjson(self):
+        lines = [json.loads(line) for line in self.export('ndjson', chunk_size=2).splitlines()]
+        self.assertListEqual([line['title'] for line in lines], [f'movie {i}' for i in range(5)])
+
+        # movies are represented the same as in /movies/ responses
+        movies = APIClient().get('/movies/').json()['results']
+        self.assertListEqual([{k: v for k, v in line.items() if k != 'comments'} for line in lines], movies)
+        self.assertListEqual(
+            [(comment['body'], comment['publish_date']) for comment in lines[1]['comments']],
+            [('first, "quoted"\nmultiline', '2010-01-01'), ('second', '2010-01-02')],
+        )
+        self.assertListEqual(lines[0]['comments'], [])
+
+    def test_csv(self):
+        rows = list(csv.DictReader(self.export('csv', chunk_size=2).splitlines(keepends=True)))
+        self.assertListEqual(
+            [(row['title'], row['comment_body'], row['comment_publish_date']) for row in rows],
+            [
+                ('movie 0', '', ''),
+                ('movie 1', 'first, "quoted"\nmultiline', '2010-01-01'),
+                ('movie 1', 'second', '2010-01-02'),
+                ('movie 2', '', ''),
+                ('movie 3', 'other', '2010-01-01'),
+                ('movie 4', '', ''),
+            ],
+        )
+        self.assertEqual(rows[1]['release_date'], '2001-01-01')
+
+    def test_empty_export(self):
+        Comment.objects.all().delete()
+        models.Movie.objects.all().delete()
+        self.assertEqual(self.export('ndjson'), '')
+        self.assertTrue(self.export('csv').startswith('id,title,'))
+
+    def test_comments_are_merged_with_filtered_movies(self):
+        Comment.objects.create(movie=self.movies[2], body='filtered out', publish_date=dt.date(2010, 1, 1))
+        Comment.objects.create(movie=self.movies[4], body='last', publish_date=dt.date(2010, 1, 1))
+        queryset = models.Movie.objects.exclude(id=self.movies[2].id)
+
+        movies = [
+            (movie[1], [comment[1] for comment in comments])
+            for movie, comments in export.movies_with_comments(queryset, chunk_size=1)
+        ]
+        self.assertListEqual(movies, [
+            ('movie 0', []),
+            ('movie 1', ['first, "quoted"\nmultiline', 'second']),
+            ('movie 3', ['other']),
+            ('movie 4', ['last']),
+        ])
@@ -0,0 +1,83 @@
+from django.core.cache import cache
+from django.test import TransactionTestCase, RequestFactory
+from django.db import transaction
+
+from business_logic import generations
+from movies_api.models import Movie
+from comments.models import Comment
+
+
+class TestGenerations(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        # the first write of a table sets its generation to the current time, the next ones increment it
+        generations.bump(Movie, Comment)
+
+    def test_bump_changes_only_generation_of_the_model(self):
+        movies, comments = generations.get(Movie, Comment)
+        self.assertEqual(generations.get(Movie, Comment), (movies, comments))
+
+        generations.bump(Movie)
+        self.assertEqual(generations.get(Movie, Comment), (movies + 1, comments))
+
+    def test_bump_waits_for_commit(self):
+        movies, = generations.get(Movie)
+        with transaction.atomic():
+            generations.bump(Movie)
+            self.assertEqual(generations.get(Movie), (movies,))
+        self.assertEqual(generations.get(Movie), (movies + 1,))
+
+    def test_generations_are_shared_by_processes(self):
+        movies, = generations.get(Movie)
+        # e.g. a management command or another web worker: cache of this process is not involved
+        cache.clear()
+        with transaction.atomic():
+            Movie.objects.create(title='Test')
+        self.assertEqual(generations.get(Movie), (movies + 1,))
+
+    def test_generations_are_read_once_per_request(self):
+        request = RequestFactory().get('/movies/')
+        movies, comments = generations.get(Movie, Comment, request=request)
+        generations.bump(Movie)
+        with self.assertNumQueries(0):
+            self.assertEqual(generations.get(Movie, Comment, request=request), (movies, comments))
+        self.assertEqual(generations.get(Movie, Comment), (movies + 1, comments))
+
+    def test_writes_bump_generations(self):
+        movies, comments = generations.get(Movie, Comment)
+        movie = Movie.objects.create(title='Test')
+        Comment.objects.create(movie=movie, body='comment')
+        self.assertEqual(generations.get(Movie, Comment), (movies + 1, comments + 1))
+
+    def test_etag_depends_on_url_and_generation(self):
+        factory = RequestFactory()
+        get_etag = generations.etag_func(Movie)
+        etag = get_etag(factory.get('/movies/', {'title': 'a'}))
+
+        self.assertEqual(get_etag(factory.get('/movies/', {'title': 'a'})), etag)
+        self.assertNotEqual(get_etag(factory.get('/movies/', {'title': 'b'})), etag)
+        self.assertNotEqual(get_etag(factory.get('/movies/', {'title': 'a'}, HTTP_ACCEPT='text/html')), etag)
+        generations.bump(Movie)
+        self.assertNotEqual(get_etag(factory.get('/movies/', {'title': 'a'})), etag)
+
+    def test_bumps_are_coalesced_in_transaction(self):
+        movies, comments = generations.get(Movie, Comment)
+        # a single UPDATE of both the rows when the transaction is committed
+        with self.assertNumQueries(1):
+            with transaction.atomic():
+                generations.bump(Movie)
+                for _ in range(3):
+                    generations.bump(Movie, Comment)
+        self.assertEqual(generations.get(Movie, Comment), (movies + 1, comments + 1))
+
+    def test_bumps_of_rolled_back_savepoint_are_discarded(self):
+        movies, comments = generations.get(Movie, Comment)
+        with transaction.atomic():
+            try:
+                with transaction.atomic():
+                    generations.bump(Movie)
+                    raise ValueError
+            except ValueError:
+                pass
+            generations.bump(Comment)
+        self.assertEqual(generations.get(Movie, Comment), (movies, comments + 1))
@@ -0,0 +1,71 @@
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from business_logic import instrumentation
+from comments.models import Comment
+from movies_api.models import Movie
+
+
+class TestQueryShape(SimpleTestCase):
+    def test_lists_of_parameters_are_normalized(self):
+        self.assertEqual(
+            instrumentation.query_shape('SELECT * FROM t WHERE id IN (%s, %s, %s)'),
+            instrumentation.query_shape('SELECT * FROM t WHERE id IN (%s)'),
+        )
+        self.assertEqual(
+            instrumentation.query_shape('INSERT INTO t (a, b) VALUES (%s, %s), (%s, %s)'),
+            instrumentation.query_shape('INSERT INTO t (a, b) VALUES (%s, %s)'),
+        )
+        self.assertNotEqual(
+            instrumentation.query_shape('SELECT * FROM t WHERE id = %s'),
+            instrumentation.query_shape('SELECT * FROM t WHERE title = %s'),
+        )
+
+
+class TestQueryBudget(TestCase):
+    def setUp(self):
+        self.movie = Movie.objects.create(title='Test')
+        for i in range(3):
+            Comment.objects.create(movie=self.movie, body=f'comment {i}')
+
+    def test_queries_within_budget(self):
+        with instrumentation.query_budget(1) as log:
+            list(Comment.objects.select_related('movie'))
+        self.assertEqual(len(log), 1)
+
+    def test_budget_exceeded(self):
+        with self.assertRaisesMessage(AssertionError, '4 queries executed, budget is 1.'):
+            with instrumentation.query_budget(1):
+                [comment.movie.title for comment in Comment.objects.all()]
+
+    def test_n_plus_one_is_detected(self):
+        with self.assertRaisesMessage(AssertionError, 'Query executed 3 times (N+1 suspect)'):
+            with instrumentation.query_budget(10, n_plus_one_threshold=3):
+                [comment.movie.title for comment in Comment.objects.all()]
+
+    def test_comment_representation_does_not_query_movie(self):
+        comment = Comment.objects.first()
+        with instrumentation.query_budget(0):
+            str(comment)
+
+    def test_slow_queries_are_logged(self):
+        with self.assertLogs('business_logic.instrumentation', 'WARNING') as logs:
+            with instrumentation.record_queries(slow_query_ms=0):
+                Movie.objects.count()
+        self.assertIn('Slow query', logs.output[0])
+
+
+class TestQueryInstrumentationMiddleware(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    @override_settings(QUERY_INSTRUMENTATION={'N_PLUS_ONE_THRESHOLD': 1, 'REPORT_QUERY_COUNT': True})
+    def test_number_of_queries_is_reported(self):
+        with self.assertLogs('business_logic.instrumentation', 'WARNING'):
+            response = self.client.get('/movies/')
+        # generations of the tables and the page
+        self.assertEqual(response['X-Query-Count'], '2')
+
+    @override_settings(QUERY_INSTRUMENTATION={'N_PLUS_ONE_THRESHOLD': 5, 'REPORT_QUERY_COUNT': False})
+    def test_number_of_queries_is_not_reported_when_disabled(self):
+        self.assertNotIn('X-Query-Count', self.client.get('/movies/'))
@@ -0,0 +1,121 @@
+import json
+import threading
+import datetime as dt
+from unittest import mock
+from urllib.parse import urlparse, parse_qs
+
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+import business_logic as bl
+from business_logic import jobs
+from movies_api import models
+
+
+def omdb_response(url: str, **kwargs) -> mock.MagicMock:
+    title = parse_qs(urlparse(url).query)['t'][0]
+    if title == 'missing':
+        return mock.MagicMock(status_code=200, text=json.dumps({'Response': False, 'Error': 'Movie not found.'}))
+    if title == 'broken':
+        return mock.MagicMock(status_code=401, text='')
+    return mock.MagicMock(status_code=200, text=json.dumps({'Title': title.capitalize(), 'Runtime': '90 min'}))
+
+
+class TestMovieImportJobs(TestCase):
+    def setUp(self):
+        bl.omdb_cache.get_response_cache().clear()
+
+    def test_enqueue_deduplicates_titles(self):
+        job = jobs.enqueue_titles(['avengers', 'AVENGERS ', 'alien', ''])
+        self.assertListEqual(list(job.items.order_by('id').values_list('query', flat=True)), ['avengers', 'alien'])
+        self.assertDictEqual(jobs.get_job_status(job), {
+            'status': 'pending', 'total': 2,
+            'counts': {'pending': 2, 'running': 0, 'done': 0, 'not_found': 0, 'failed': 0},
+        })
+
+    def test_enqueue_without_titles(self):
+        with self.assertRaises(bl.exceptions.BusinessLogicException):
+            jobs.enqueue_titles(['', None])
+        self.assertFalse(models.MovieImportJob.objects.exists())
+
+    @mock.patch('requests.Session.get')
+    def test_titles_queued_by_many_jobs_are_fetched_once(self, request_get_mock):
+        request_get_mock.side_effect = omdb_response
+        first = jobs.enqueue_titles(['alien', 'missing'])
+        second = jobs.enqueue_titles('Alien')
+
+        # `alien` is claimed together with `Alien` from the second job
+        self.assertEqual(jobs.process_batch(batch_size=1), 2)
+        self.assertEqual(jobs.process_batch(batch_size=10), 1)
+        self.assertEqual(jobs.process_batch(batch_size=10), 0)
+        self.assertEqual(request_get_mock.call_count, 2)
+
+        alien = models.Movie.objects.get(title='Alien')
+        self.assertListEqual(
+            list(models.MovieImportItem.objects.order_by('id').values_list('status', 'movie', 'error')),
+            [('done', alien.pk, ''), ('not_found', None, 'Movie not found.'), ('done', alien.pk, '')],
+        )
+        self.assertEqual(jobs.get_job_status(first)['status'], 'done')
+        self.assertEqual(jobs.get_job_status(second)['counts']['done'], 1)
+
+    @override_settings(MOVIE_IMPORT_JOB_MAX_ATTEMPTS=2)
+    @mock.patch('requests.Session.get')
+    def test_failed_titles_are_retried(self, request_get_mock):
+        request_get_mock.side_effect = omdb_response
+        job = jobs.enqueue_titles(['broken'])
+
+        jobs.process_batch(batch_size=10)
+        item = job.items.get()
+        self.assertEqual((item.status, item.attempts), ('pending', 1))
+        self.assertEqual(jobs.get_job_status(job)['status'], 'pending')
+
+        jobs.process_batch(batch_size=10)
+        item.refresh_from_db()
+        self.assertEqual((item.status, item.attempts), ('failed', 2))
+        self.assertTrue(item.error)
+        self.assertEqual(jobs.get_job_status(job)['status'], 'done')
+
+    def test_abandoned_items_are_claimed_again(self):
+        job = jobs.enqueue_titles(['alien', 'avengers'])
+        self.assertEqual(len(jobs.claim_items(batch_size=1)), 1)
+        self.assertEqual(jobs.get_job_status(job)['status'], 'running')
+        self.assertListEqual([item.query for item in jobs.claim_items(batch_size=10)], ['avengers'])
+
+        job.items.update(started_at=timezone.now() - dt.timedelta(hours=1))
+        self.assertListEqual([item.query for item in jobs.claim_items(batch_size=10)], ['alien', 'avengers'])
+
+    @override_settings(MOVIE_IMPORT_JOB_MAX_ATTEMPTS=2)
+    def test_abandoned_items_are_failed_after_max_attempts(self):
+        job = jobs.enqueue_titles(['alien'])
+        for _ in range(2):
+            self.assertEqual(len(jobs.claim_items(batch_size=10)), 1)
+            job.items.update(started_at=timezone.now() - dt.timedelta(hours=1))
+
+        self.assertListEqual(jobs.claim_items(batch_size=10), [])
+        item = job.items.get()
+        self.assertEqual((item.status, item.attempts), ('failed', 2))
+        self.assertTrue(item.error)
+        self.assertEqual(jobs.get_job_status(job)['status'], 'done')
+
+
+class TestMovieImportWorkers(TransactionTestCase):
+    def setUp(self):
+        bl.omdb_cache.get_response_cache().clear()
+
+    @mock.patch('requests.Session.get')
+    def test_workers_drain_the_queue(self, request_get_mock):
+        request_get_mock.side_effect = omdb_response
+        job = jobs.enqueue_titles([f'movie {i}' for i in range(20)])
+
+        jobs.run_workers(num_of_workers=4, batch_size=3, poll_interval=0, drain=True)
+
+        # every title is claimed by exactly one worker
+        self.assertEqual(request_get_mock.call_count, 20)
+        self.assertEqual(jobs.get_job_status(job)['counts']['done'], 20)
+        self.assertEqual(models.Movie.objects.count(), 20)
+
+    def test_stopped_workers(self):
+        stop = threading.Event()
+        stop.set()
+        jobs.run_workers(num_of_workers=2, batch_size=3, poll_interval=10, stop=stop)
+        self.assertFalse(models.MovieImportItem.objects.exists())
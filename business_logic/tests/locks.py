@@ -0,0 +1,92 @@
+import time
+import asyncio
+import threading
+from django.test import SimpleTestCase, TestCase
+
+from business_logic import locks
+
+
+class TestSingleFlight(SimpleTestCase):
+    def setUp(self):
+        self.single_flight = locks.SingleFlight()
+        self.release = threading.Event()
+        self.calls = 0
+
+    def run_concurrently(self, fn, num_of_threads: int = 5) -> list:
+        results = []
+
+        def target():
+            try:
+                results.append(self.single_flight.do('key', fn))
+            except Exception as e:
+                results.append(e)
+
+        threads = [threading.Thread(target=target) for _ in range(num_of_threads)]
+        for thread in threads:
+            thread.start()
+        # let all the threads join the call before the leader finishes
+        time.sleep(0.1)
+        self.release.set()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_concurrent_calls_are_deduplicated(self):
+        def fn():
+            self.calls += 1
+            self.release.wait()
+            return object()
+
+        results = self.run_concurrently(fn)
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(len(results), 5)
+        self.assertEqual(len(set(map(id, results))), 1)
+
+        # the key is released after the call
+        self.assertEqual(self.single_flight.do('key', lambda: 'next'), 'next')
+
+    def test_exception_is_shared(self):
+        def fn():
+            self.calls += 1
+            self.release.wait()
+            raise ValueError('error')
+
+        results = self.run_concurrently(fn, 3)
+        self.assertEqual(self.calls, 1)
+        self.assertTrue(all(isinstance(result, ValueError) for result in results))
+
+
+class TestAsyncSingleFlight(SimpleTestCase):
+    def test_concurrent_calls_are_deduplicated(self):
+        single_flight = locks.AsyncSingleFlight()
+        calls = []
+
+        async def fn():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return object()
+
+        async def run():
+            return await asyncio.gather(*[single_flight.do('key', fn) for _ in range(5)])
+
+        loop = asyncio.new_event_loop()
+        self.addCleanup(loop.close)
+        results = loop.run_until_complete(run())
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(len(set(map(id, results))), 1)
+
+        # the key is released after the call
+        loop.run_until_complete(single_flight.do('key', fn))
+        self.assertEqual(len(calls), 2)
+
+
+class TestAdvisoryLock(TestCase):
+    def test_lock_id_is_stable_64_bit_integer(self):
+        self.assertEqual(locks.lock_id('movie:avengers'), locks.lock_id('movie:avengers'))
+        self.assertNotEqual(locks.lock_id('movie:avengers'), locks.lock_id('movie:matrix'))
+        self.assertTrue(-2 ** 63 <= locks.lock_id('movie:avengers') < 2 ** 63)
+
+    def test_lock_can_be_acquired_repeatedly(self):
+        for _ in range(2):
+            with locks.advisory_lock('movie:avengers'):
+                pass
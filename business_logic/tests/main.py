@@ -1,11 +1,17 @@
 import os
 import json
+import threading
 from typing import List
-from django.test import TestCase
+from unittest import skipUnless
+from django.db import connection, connections
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from unittest import mock
 import datetime as dt
+from urllib.parse import urlparse, parse_qs
 
 import business_logic as bl
+from business_logic import locks
 from movies_api import models
 from movies_db.settings import OMDB_API_KEY
 from comments.models import Comment
@@ -13,13 +19,17 @@ from comments.models import Comment
 
 class TestMovie(TestCase):
     def setUp(self):
+        bl.omdb_cache.get_response_cache().clear()
+
         self.example_response = mock.MagicMock()
 
         with open(os.path.join(os.path.dirname(__file__), 'example_response.json')) as f:
             # mock Response object from requests module
             setattr(self.example_response, 'text', f.read())
+        self.example_response.status_code = 200
 
         self.response_with_error = mock.MagicMock()
+        self.response_with_error.status_code = 200
         self.response_with_error.text = json.dumps({
             'Response': False,
             'Error': 'Movie not found.',
@@ -28,17 +38,21 @@ class TestMovie(TestCase):
         self.response_with_missing_fields = mock.MagicMock()
         with open(os.path.join(os.path.dirname(__file__), 'response_with_missing_fields.json')) as f:
             self.response_with_missing_fields.text = f.read()
+        self.response_with_missing_fields.status_code = 200
 
-    @mock.patch('requests.get')
+    @mock.patch('requests.Session.get')
     def test_valid_request_to_external_api_was_made(self, request_get_mock):
         """
         Check whether valid request was sent to the external API.
         """
         request_get_mock.return_value = self.example_response
         bl.fetch_movie_info('avengers')
-        request_get_mock.assert_called_with(f'{bl.API_HOST}?t=avengers&apikey={OMDB_API_KEY}')
+        request_get_mock.assert_called_with(
+            f'{bl.API_HOST}?t=avengers&apikey={OMDB_API_KEY}',
+            timeout=bl.omdb.get_client().timeout,
+        )
 
-    @mock.patch('requests.get')
+    @mock.patch('requests.Session.get')
     def test_fetch_movie(self, request_get_mock):
         """
         Test if movie was fetched  and saved to database.
@@ -57,7 +71,7 @@ class TestMovie(TestCase):
         # test if movie is in database
         self.assertTrue(models.Movie.objects.filter(id=movie.pk).exists())
 
-    @mock.patch('requests.get')
+    @mock.patch('requests.Session.get')
     def test_error_response_from_server(self, request_get_mock):
         """
         Case when there was an error returned by external API.
@@ -66,7 +80,52 @@ class TestMovie(TestCase):
         with self.assertRaisesMessage(bl.exceptions.BusinessLogicException, 'Movie not found.'):
             bl.fetch_movie_info('there is no movie with this name')
 
-    @mock.patch('requests.get')
+    @mock.patch('requests.Session.get')
+    def test_repeated_title_is_served_from_cache(self, request_get_mock):
+        request_get_mock.return_value = self.example_response
+        bl.fetch_movie_info('avengers', save_to_db=False)
+        movie = bl.fetch_movie_info('  Avengers ', save_to_db=False)
+
+        self.assertEqual(request_get_mock.call_count, 1)
+        self.assertEqual(movie.title, 'The Avengers')
+        self.assertEqual(bl.omdb_cache.get_response_cache().stats()['hits'], 1)
+
+    @mock.patch('requests.Session.get')
+    def test_movie_not_found_response_is_cached(self, request_get_mock):
+        request_get_mock.return_value = self.response_with_error
+        for _ in range(2):
+            with self.assertRaisesMessage(bl.exceptions.BusinessLogicException, 'Movie not found.'):
+                bl.fetch_movie_info('there is no movie with this name')
+
+        self.assertEqual(request_get_mock.call_count, 1)
+
+    @mock.patch('requests.Session.get')
+    def test_other_errors_are_not_cached(self, request_get_mock):
+        request_get_mock.return_value.status_code = 401
+        request_get_mock.return_value.text = json.dumps({'Response': False, 'Error': 'Request limit reached!'})
+        for _ in range(2):
+            with self.assertRaises(bl.exceptions.BusinessLogicException):
+                bl.fetch_movie_info('avengers')
+
+        self.assertEqual(request_get_mock.call_count, 2)
+
+    @mock.patch('requests.Session.get')
+    def test_fetch_movie_that_is_already_in_database(self, request_get_mock):
+        request_get_mock.return_value = self.example_response
+        movie = bl.fetch_movie_info('avengers')
+
+        # query is remembered as an alias of the movie
+        self.assertTrue(models.MovieAlias.objects.filter(query='avengers', movie=movie).exists())
+        bl.omdb_cache.get_response_cache().clear()
+
+        # aliases and titles are found in the database without calling external API
+        self.assertEqual(bl.fetch_movie_info(' AVENGERS').pk, movie.pk)
+        self.assertEqual(bl.fetch_movie_info('the avengers').pk, movie.pk)
+
+        self.assertEqual(request_get_mock.call_count, 1)
+        self.assertEqual(models.Movie.objects.count(), 1)
+
+    @mock.patch('requests.Session.get')
     def test_response_with_missing_data(self, request_get_mock):
         """
         Case when we receive response with some missing fields.
@@ -82,6 +141,121 @@ class TestMovie(TestCase):
         self.assertEqual(movie.website, None)
 
 
+class TestSaveMovie(TransactionTestCase):
+    def setUp(self):
+        bl.omdb_cache.get_response_cache().clear()
+
+    def test_external_api_is_called_outside_of_transaction(self):
+        def request_movie_details(title: str) -> dict:
+            # a slow external API must not keep the connection in a transaction (and hold the lock)
+            self.assertFalse(connection.in_atomic_block)
+            return {'Title': 'The Avengers', 'Runtime': '143 min'}
+
+        with mock.patch('business_logic.main.request_movie_details', side_effect=request_movie_details):
+            movie = bl.save_movie('avengers')
+        self.assertTrue(models.Movie.objects.filter(pk=movie.pk, title='The Avengers').exists())
+
+    def test_movie_saved_during_fetch_is_returned(self):
+        def request_movie_details(title: str) -> dict:
+            # another title of the same movie is saved while the details are being fetched
+            models.Movie.objects.create(title='Avengers')
+            return {'Title': 'Avengers', 'Runtime': '143 min'}
+
+        with mock.patch('business_logic.main.request_movie_details', side_effect=request_movie_details):
+            movie = bl.save_movie('avengers')
+        self.assertEqual(movie.pk, models.Movie.objects.get().pk)
+
+    @skipUnless(connection.vendor == 'postgresql', 'advisory locks are used only on PostgreSQL')
+    def test_other_processes_wait_for_the_fetch(self):
+        acquired = []
+
+        def try_lock():
+            # a separate connection, like another worker process
+            with connections['default'].cursor() as cursor:
+                cursor.execute('SELECT pg_try_advisory_lock(%s)', [locks.lock_id('movie:avengers')])
+                acquired.append(cursor.fetchone()[0])
+            connections['default'].close()
+
+        def request_movie_details(title: str) -> dict:
+            thread = threading.Thread(target=try_lock)
+            thread.start()
+            thread.join()
+            return {'Title': 'The Avengers', 'Runtime': '143 min'}
+
+        with mock.patch('business_logic.main.request_movie_details', side_effect=request_movie_details) as fetch:
+            bl.save_movie('avengers')
+            # the title is found by the next worker which acquires the lock
+            bl.save_movie('avengers')
+        self.assertListEqual(acquired, [False])
+        self.assertEqual(fetch.call_count, 1)
+
+
+class TestMoviesImport(TestCase):
+    def setUp(self):
+        bl.omdb_cache.get_response_cache().clear()
+        models.Movie.objects.create(title='Already present')
+
+        def response(title: str) -> mock.MagicMock:
+            if title == 'missing':
+                body = {'Response': False, 'Error': 'Movie not found.'}
+            else:
+                title = 'The Avengers' if 'avengers' in title.lower() else title.capitalize()
+                body = {'Title': title, 'Runtime': '90 min'}
+            return mock.MagicMock(status_code=200, text=json.dumps(body))
+
+        self.response = response
+
+    @mock.patch('requests.Session.get')
+    def test_import_movies(self, request_get_mock):
+        request_get_mock.side_effect = lambda url, **kwargs: self.response(parse_qs(urlparse(url).query)['t'][0])
+        result = bl.fetch_movies_info(['avengers', 'the avengers', 'AVENGERS', 'missing', 'already present'])
+
+        # the same normalized title is requested only once, movie from the database is not requested at all
+        self.assertEqual(request_get_mock.call_count, 3)
+        self.assertListEqual(
+            [(item['query'], item['movie'].title) for item in result['created']],
+            [('avengers', 'The Avengers'), ('the avengers', 'The Avengers')],
+        )
+        self.assertListEqual(
+            [(item['query'], item['movie'].title) for item in result['present']],
+            [('already present', 'Already present')],
+        )
+        self.assertListEqual(result['not_found'], [{'query': 'missing', 'error': 'Movie not found.'}])
+        self.assertListEqual(result['failed'], [])
+
+        self.assertEqual(models.Movie.objects.count(), 2)
+        avengers = models.Movie.objects.get(title='The Avengers')
+        self.assertEqual(avengers.duration, 90)
+        self.assertEqual(result['created'][0]['movie'].pk, avengers.pk)
+        self.assertListEqual(
+            list(models.MovieAlias.objects.filter(movie=avengers).values_list('query', flat=True)),
+            ['avengers'],
+        )
+
+    @mock.patch('requests.Session.get')
+    def test_invalid_details_fail_only_their_title(self, request_get_mock):
+        details = {
+            'alien': {'Title': 'Alien', 'Runtime': '117 min'},
+            'no runtime': {'Title': 'No runtime', 'Runtime': 'unknown'},
+            'no date': {'Title': 'No date', 'Released': 'sometime'},
+        }
+        request_get_mock.side_effect = lambda url, **kwargs: mock.MagicMock(
+            status_code=200, text=json.dumps(details[parse_qs(urlparse(url).query)['t'][0]]),
+        )
+        result = bl.fetch_movies_info(list(details))
+
+        self.assertListEqual([item['query'] for item in result['created']], ['alien'])
+        self.assertListEqual(
+            result['failed'],
+            [{'query': query, 'error': 'Invalid response from external API.'} for query in ('no runtime', 'no date')],
+        )
+        self.assertTrue(models.Movie.objects.filter(title='Alien').exists())
+
+    def test_import_without_titles(self):
+        with self.assertRaises(bl.exceptions.BusinessLogicException):
+            bl.fetch_movies_info(['', None])
+
+
 class TestComments(TestCase):
     def setUp(self):
         self.movie = models.Movie.objects.create(title='Test')
@@ -107,6 +281,50 @@ class TestComments(TestCase):
             bl.add_comment(None, 'test')
 
 
+class TestBulkComments(TestCase):
+    def setUp(self):
+        self.movie = models.Movie.objects.create(title='Test')
+        self.other_movie = models.Movie.objects.create(title='Other')
+
+    def test_add_comments(self):
+        results = bl.add_comments([
+            {'movie_id': self.movie.id, 'body': 'first', 'publish_date': '2010-01-01'},
+            {'movie_id': self.movie.id + 100, 'body': 'movie does not exist'},
+            {'movie': self.other_movie.id, 'body': 'second'},
+            {'movie_id': 'abc', 'body': ''},
+            'not an object',
+        ])
+
+        self.assertListEqual([result['index'] for result in results], [0, 1, 2, 3, 4])
+        self.assertEqual(results[0]['comment'].body, 'first')
+        self.assertEqual(results[0]['comment'].publish_date, dt.date(2010, 1, 1))
+        self.assertEqual(results[2]['comment'].movie_id, self.other_movie.id)
+        self.assertIn('does not exist', results[1]['errors'][0])
+        self.assertEqual(len(results[3]['errors']), 2)
+        self.assertIn('errors', results[4])
+
+        self.assertEqual(Comment.objects.count(), 2)
+        self.assertEqual(bl.get_ranking(dt.date(2010, 1, 1), dt.date(2010, 1, 1)).first().total_comments, 1)
+
+    def test_number_of_queries_does_not_depend_on_number_of_comments(self):
+        def items(num_of_comments: int) -> list:
+            movies = [self.movie.id, self.other_movie.id]
+            return [{'movie_id': movies[i % 2], 'body': f'comment {i}'} for i in range(num_of_comments)]
+
+        with CaptureQueriesContext(connection) as few:
+            bl.add_comments(items(2))
+        with CaptureQueriesContext(connection) as many:
+            bl.add_comments(items(50))
+
+        self.assertEqual(len(few.captured_queries), len(many.captured_queries))
+        self.assertEqual(Comment.objects.count(), 52)
+
+    @override_settings(COMMENT_BULK_MAX_ITEMS=1)
+    def test_too_many_comments(self):
+        with self.assertRaises(bl.exceptions.BusinessLogicException):
+            bl.add_comments([{'movie_id': self.movie.id, 'body': 'comment'}] * 2)
+
+
 class TestTopMovies(TestCase):
     def setUp(self):
         self.mov1 = models.Movie.objects.create(title='mov1')
@@ -155,6 +373,26 @@ class TestTopMovies(TestCase):
         mov5 = ranking.get(id=self.mov5.id)
         self.assertEqual(mov5.total_comments, 3)
 
+    def test_min_comments(self):
+        ranking = bl.get_ranking(dt.date(2000, 1, 1), dt.date(2011, 1, 1), min_comments=3)
+        self.assertListEqual([4, 3, 3, 3], [movie.total_comments for movie in ranking])
+        self.assertListEqual([1, 2, 2, 2], [movie.rank for movie in ranking])
+        self.assertIn('HAVING', str(ranking.query))
+
+    def test_limit_and_offset_keep_ranks(self):
+        ranking = bl.get_ranking(dt.date(2000, 1, 1), dt.date(2011, 1, 1), limit=3, offset=2)
+        self.assertListEqual([3, 3, 2], [movie.total_comments for movie in ranking])
+        self.assertListEqual([2, 2, 3], [movie.rank for movie in ranking])
+        self.assertIn('LIMIT 3 OFFSET 2', str(ranking.query))
+
+        # movies with the same number of comments are ordered by id
+        self.assertListEqual([self.mov4.id, self.mov5.id], [movie.id for movie in ranking[:2]])
+
+    def test_invalid_ranking_parameters(self):
+        with self.assertRaises(bl.exceptions.BusinessLogicException) as cm:
+            bl.get_ranking(dt.date(2000, 1, 1), dt.date(2011, 1, 1), limit=-1)
+        self.assertEqual(cm.exception.code, 400)
+
     def test_edge_date_values(self):
         models.Movie.objects.all().delete()
         mov = models.Movie.objects.create(title='mov')
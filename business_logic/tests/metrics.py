@@ -0,0 +1,126 @@
+import os
+import shutil
+import tempfile
+import multiprocessing
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+
+import business_logic as bl
+from business_logic import metrics
+
+
+class TestRegistry(SimpleTestCase):
+    def setUp(self):
+        self.registry = metrics.Registry()
+        self.counter = metrics.Counter('test_total', 'Test counter.', ('name',), registry=self.registry)
+        self.histogram = metrics.Histogram('test_seconds', 'Test histogram.', buckets=(.1, 1, float('inf')),
+                                           registry=self.registry)
+
+    def test_render(self):
+        self.counter.inc(name='a"b')
+        self.counter.inc(2, name='a"b')
+        self.histogram.observe(0.5)
+        self.histogram.observe(2)
+
+        self.assertEqual(self.registry.render(), '\n'.join([
+            '# HELP test_seconds Test histogram.',
+            '# TYPE test_seconds histogram',
+            'test_seconds_bucket{le="0.1"} 0.0',
+            'test_seconds_bucket{le="1.0"} 1.0',
+            'test_seconds_bucket{le="+Inf"} 2.0',
+            'test_seconds_sum 2.5',
+            'test_seconds_count 2.0',
+            '# HELP test_total Test counter.',
+            '# TYPE test_total counter',
+            'test_total{name="a\\"b"} 3.0',
+        ]) + '\n')
+
+    def test_labels_are_validated(self):
+        with self.assertRaises(ValueError):
+            self.counter.inc(other='a')
+
+
+def increment_in_subprocess(registry: metrics.Registry, counter: metrics.Counter):
+    counter.inc(name='a')
+    registry.flush()
+
+
+class TestMultiProcessRegistry(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.registry = metrics.Registry()
+        self.counter = metrics.Counter('test_total', 'Test counter.', ('name',), registry=self.registry)
+
+    def test_values_of_processes_are_merged(self):
+        with override_settings(METRICS_DIR=self.directory):
+            self.counter.inc(name='a')
+            processes = [
+                multiprocessing.Process(target=increment_in_subprocess, args=(self.registry, self.counter))
+                for _ in range(3)
+            ]
+            for process in processes:
+                process.start()
+            for process in processes:
+                process.join()
+
+            self.assertEqual(len([name for name in os.listdir(self.directory) if name.endswith('.json')]), 3)
+            self.assertIn('test_total{name="a"} 4.0', self.registry.render())
+
+            # the file of the current process is not counted twice
+            self.registry.flush()
+            self.assertIn('test_total{name="a"} 4.0', self.registry.render())
+
+    def test_files_of_finished_processes_are_archived(self):
+        with override_settings(METRICS_DIR=self.directory):
+            for _ in range(2):
+                process = multiprocessing.Process(target=increment_in_subprocess, args=(self.registry, self.counter))
+                process.start()
+                process.join()
+
+            self.assertIn('test_total{name="a"} 2.0', self.registry.render())
+            files = sorted(name for name in os.listdir(self.directory) if name.endswith('.json'))
+            self.assertListEqual(files, [metrics.ARCHIVE_FILE])
+            self.assertIn('test_total{name="a"} 2.0', self.registry.render())
+
+    def test_file_of_finished_process_with_same_pid_is_not_overwritten(self):
+        with open(os.path.join(self.directory, f'{os.getpid()}.json'), 'w') as f:
+            f.write('[["test_total", [["name", "a"]], 5.0]]')
+
+        with override_settings(METRICS_DIR=self.directory):
+            self.counter.inc(name='a')
+            self.registry.flush()
+            self.assertIn('test_total{name="a"} 6.0', self.registry.render())
+
+
+class TestMetricsMiddleware(TestCase):
+    def setUp(self):
+        cache.clear()
+        metrics.REGISTRY.clear()
+        bl.omdb_cache.get_response_cache().clear()
+
+    def test_request_metrics(self):
+        self.client.get('/movies/')
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+
+        content = response.content.decode()
+        self.assertIn('http_requests_total{method="GET",view="movies",status="200"} 1.0', content)
+        self.assertIn('http_request_duration_seconds_count{method="GET",view="movies"} 1.0', content)
+        self.assertIn('db_queries_total{view="movies"} 2.0', content)
+
+    @mock.patch('requests.Session.get')
+    def test_omdb_metrics(self, request_get_mock):
+        request_get_mock.return_value = mock.MagicMock(text='{"Response":"False","Error":"Movie not found."}',
+                                                       status_code=200)
+        for _ in range(2):
+            with self.assertRaises(bl.exceptions.BusinessLogicException):
+                bl.request_movie_details('missing')
+
+        content = metrics.REGISTRY.render()
+        self.assertIn('omdb_requests_total{outcome="not_found"} 1.0', content)
+        self.assertIn('omdb_requests_total{outcome="cached"} 1.0', content)
+        self.assertIn('omdb_request_duration_seconds_count 1.0', content)
@@ -0,0 +1,106 @@
+import json
+import asyncio
+from unittest import mock
+
+import requests
+from django.test import SimpleTestCase
+
+from business_logic import omdb, exceptions
+
+
+@mock.patch('time.sleep')
+@mock.patch('requests.Session.get')
+class TestOmdbClient(SimpleTestCase):
+    def setUp(self):
+        self.client = omdb.OmdbClient('key', max_retries=2, connect_timeout=1, read_timeout=2)
+        self.response = mock.MagicMock(status_code=200, text=json.dumps({'Title': 'The Avengers'}))
+
+    def test_request_is_sent_with_timeout(self, request_get_mock, sleep_mock):
+        request_get_mock.return_value = self.response
+        self.assertEqual(self.client.get_movie('avengers'), {'Title': 'The Avengers'})
+        request_get_mock.assert_called_once_with(f'{omdb.API_HOST}?t=avengers&apikey=key', timeout=(1, 2))
+        sleep_mock.assert_not_called()
+
+    def test_retry_after_connection_error(self, request_get_mock, sleep_mock):
+        request_get_mock.side_effect = [requests.ConnectionError(), mock.MagicMock(status_code=503), self.response]
+        self.assertEqual(self.client.get_movie('avengers'), {'Title': 'The Avengers'})
+        self.assertEqual(request_get_mock.call_count, 3)
+        self.assertEqual(sleep_mock.call_count, 2)
+
+    def test_retries_are_bounded(self, request_get_mock, sleep_mock):
+        request_get_mock.side_effect = requests.Timeout()
+        with self.assertRaises(exceptions.BusinessLogicException) as cm:
+            self.client.get_movie('avengers')
+        self.assertEqual(cm.exception.code, 504)
+        self.assertEqual(request_get_mock.call_count, 3)
+
+    def test_client_errors_are_not_retried(self, request_get_mock, sleep_mock):
+        request_get_mock.return_value = mock.MagicMock(status_code=401, text=json.dumps({'Error': 'Invalid API key!'}))
+        self.assertEqual(self.client.get_movie('avengers'), {'Error': 'Invalid API key!'})
+        self.assertEqual(request_get_mock.call_count, 1)
+
+    def test_backoff_is_capped(self, request_get_mock, sleep_mock):
+        self.client.backoff_max = 1
+        for _ in range(20):
+            self.assertLessEqual(self.client.get_backoff(10), 1)
+
+
+class TestAsyncOmdbClient(SimpleTestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.addCleanup(self.loop.close)
+        self.requests = []
+        self.statuses = []
+        self.body = json.dumps({'Title': 'The Avengers'}).encode()
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.requests.append((await reader.readuntil(b'\r\n\r\n')).decode())
+        status = self.statuses.pop(0) if self.statuses else 200
+        headers = 'Content-Type: application/json\r\nLocation: http://example.com/\r\n'
+        writer.write(f'HTTP/1.0 {status} X\r\n{headers}\r\n'.encode() + self.body)
+        await writer.drain()
+        writer.close()
+
+    def get_movie(self, **kwargs) -> dict:
+        async def get_movie():
+            server = await asyncio.start_server(self.handle, '127.0.0.1', 0)
+            port = server.sockets[0].getsockname()[1]
+            client = omdb.AsyncOmdbClient('key', host=f'http://127.0.0.1:{port}/', **kwargs)
+            try:
+                return await client.get_movie('avengers')
+            finally:
+                await client.close()
+                server.close()
+                await server.wait_closed()
+
+        return self.loop.run_until_complete(get_movie())
+
+    def test_get_movie(self):
+        self.assertEqual(self.get_movie(), {'Title': 'The Avengers'})
+        self.assertTrue(self.requests[0].startswith('GET /?t=avengers&apikey=key HTTP/1.1\r\n'))
+
+    def test_retry_after_server_error(self):
+        self.statuses = [503]
+        self.assertEqual(self.get_movie(backoff_factor=0), {'Title': 'The Avengers'})
+        self.assertEqual(len(self.requests), 2)
+
+    def test_connection_error(self):
+        client = omdb.AsyncOmdbClient('key', host='http://127.0.0.1:1/', max_retries=1, backoff_factor=0)
+        with self.assertRaises(exceptions.BusinessLogicException) as cm:
+            self.loop.run_until_complete(client.get_movie('avengers'))
+        self.loop.run_until_complete(client.close())
+        self.assertEqual(cm.exception.code, 503)
+
+    def test_redirect_is_not_followed(self):
+        self.statuses = [302]
+        with self.assertRaises(exceptions.BusinessLogicException) as cm:
+            self.get_movie()
+        self.assertEqual(cm.exception.code, 502)
+        self.assertEqual(len(self.requests), 1)
+
+    def test_response_size_is_limited(self):
+        self.body = json.dumps({'Title': 'The Avengers', 'Plot': 'x' * 10000}).encode()
+        with self.assertRaises(exceptions.BusinessLogicException) as cm:
+            self.get_movie(max_response_size=5000)
+        self.assertEqual(cm.exception.code, 502)
+        self.assertEqual(self.get_movie()['Title'], 'The Avengers')
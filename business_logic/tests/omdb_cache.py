@@ -0,0 +1,49 @@
+from unittest import mock
+from django.test import SimpleTestCase
+
+from business_logic import omdb_cache
+
+
+class TestBaseResponseCache(SimpleTestCase):
+    def test_backend_must_implement_interface(self):
+        class IncompleteCache(omdb_cache.BaseResponseCache):
+            def get(self, title: str):
+                return None
+
+        with self.assertRaises(TypeError):
+            IncompleteCache(ttl=60, negative_ttl=10)
+
+
+class TestLRUResponseCache(SimpleTestCase):
+    def setUp(self):
+        self.cache = omdb_cache.LRUResponseCache(ttl=60, negative_ttl=10, max_size=2)
+
+    def test_key_is_normalized_title(self):
+        self.cache.set('The  Avengers', {'Title': 'The Avengers'})
+        self.assertEqual(self.cache.get(' the avengers'), {'Title': 'The Avengers'})
+        self.assertEqual(self.cache.stats()['hits'], 1)
+
+    def test_least_recently_used_entry_is_evicted(self):
+        self.cache.set('a', {'Title': 'a'})
+        self.cache.set('b', {'Title': 'b'})
+        self.cache.get('a')
+        self.cache.set('c', {'Title': 'c'})
+
+        self.assertIsNone(self.cache.get('b'))
+        self.assertIsNotNone(self.cache.get('a'))
+        self.assertIsNotNone(self.cache.get('c'))
+        self.assertEqual(self.cache.stats()['evictions'], 1)
+
+    @mock.patch('time.monotonic')
+    def test_negative_results_expire_earlier(self, monotonic_mock):
+        monotonic_mock.return_value = 100
+        self.cache.set('found', {'Title': 'found'})
+        self.cache.set('missing', {'Error': 'Movie not found.'})
+
+        monotonic_mock.return_value = 120
+        self.assertIsNone(self.cache.get('missing'))
+        self.assertIsNotNone(self.cache.get('found'))
+
+        monotonic_mock.return_value = 200
+        self.assertIsNone(self.cache.get('found'))
+        self.assertEqual(self.cache.stats()['misses'], 2)
@@ -0,0 +1,107 @@
+import datetime as dt
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+import business_logic as bl
+from business_logic import ranking_snapshots
+from business_logic.serialization import get_values_serializer
+from movies_api import models, serializers
+
+
+class TestRankingSnapshots(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.today = dt.date(2019, 3, 20)
+        movies = [models.Movie.objects.create(title=f'movie {i}') for i in range(5)]
+        for movie, num_of_comments in zip(movies, (3, 0, 5, 3, 1)):
+            for i in range(num_of_comments):
+                bl.add_comment(movie.id, 'comment', self.today - dt.timedelta(days=i * 3))
+
+    def live_ranking(self, date_from: dt.date, date_until: dt.date, **params) -> list:
+        values_serializer = get_values_serializer(serializers.MovieRankingSerializer)
+        return values_serializer.serialize(values_serializer.values(bl.get_ranking(date_from, date_until, **params)))
+
+    def test_snapshot_equals_live_ranking(self):
+        window = ranking_snapshots.get_window(7, self.today)
+        self.assertEqual(window, (dt.date(2019, 3, 14), self.today))
+        snapshot = ranking_snapshots.build_snapshot(*window)
+
+        for params in ({}, {'min_comments': 1}, {'limit': 2}, {'limit': 2, 'offset': 1}, {'offset': 4}):
+            self.assertListEqual(
+                ranking_snapshots.get_snapshot_ranking(snapshot.pk, **params),
+                self.live_ranking(*window, **params),
+            )
+
+    def test_snapshot_replaces_older_snapshot_of_the_window(self):
+        old = ranking_snapshots.build_snapshot(*ranking_snapshots.get_window(7, self.today - dt.timedelta(days=1)))
+        new = ranking_snapshots.build_snapshot(*ranking_snapshots.get_window(7, self.today))
+        other = ranking_snapshots.build_snapshot(*ranking_snapshots.get_window(30, self.today))
+
+        self.assertListEqual(list(models.RankingSnapshot.objects.order_by('id')), [new, other])
+        self.assertFalse(models.RankingSnapshotEntry.objects.filter(snapshot_id=old.pk).exists())
+
+    def test_find_snapshot(self):
+        snapshot = ranking_snapshots.build_snapshot(*ranking_snapshots.get_window(30, self.today))
+
+        self.assertEqual(
+            ranking_snapshots.find_snapshot(dt.date(2019, 2, 19), self.today), (snapshot.pk, snapshot.built_at)
+        )
+        self.assertIsNone(ranking_snapshots.find_snapshot(dt.date(2019, 2, 20), self.today))
+
+        with override_settings(RANKING_SNAPSHOT_MAX_AGE=60):
+            models.RankingSnapshot.objects.update(built_at=timezone.now() - dt.timedelta(minutes=2))
+            self.assertIsNone(ranking_snapshots.find_snapshot(dt.date(2019, 2, 19), self.today))
+
+    def test_command(self):
+        out = StringIO()
+        call_command('build_ranking_snapshots', '--days', '7', '365', '--date-until', str(self.today), stdout=out)
+        self.assertIn('7 days (2019-03-14 - 2019-03-20): 5 movies.', out.getvalue())
+        self.assertListEqual(list(models.RankingSnapshot.objects.order_by('days').values_list('days', flat=True)), [7, 365])
+
+
+class TestRankingSnapshotsApi(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.movie = models.Movie.objects.create(title='movie')
+        bl.add_comment(self.movie.id, 'comment', dt.date.today())
+
+    def test_matching_window_is_served_from_snapshot(self):
+        date_from, date_until = ranking_snapshots.get_window(7)
+        params = {'date_from': str(date_from), 'date_until': str(date_until)}
+        response = self.client.get('/top/', params)
+        self.assertNotIn('X-Ranking-Snapshot', response)
+        etag = response['ETag']
+
+        snapshot, = ranking_snapshots.build_snapshots([7])
+        response = self.client.get('/top/', params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Ranking-Snapshot'], snapshot.built_at.isoformat())
+        self.assertListEqual(response.json(), [{'id': self.movie.id, 'total_comments': 1, 'rank': 1}])
+
+        response = self.client.get('/top/', {**params, 'limit': -1})
+        self.assertEqual(response.status_code, 400)
+
+    def test_snapshot_rebuilt_by_other_process_is_served(self):
+        date_from, date_until = ranking_snapshots.get_window(7)
+        params = {'date_from': str(date_from), 'date_until': str(date_until)}
+        ranking_snapshots.build_snapshots([7])
+        response = self.client.get('/top/', params)
+        self.assertListEqual(response.json(), [{'id': self.movie.id, 'total_comments': 1, 'rank': 1}])
+
+        # rows written directly - nothing in this process is notified about the new snapshot
+        other = models.Movie.objects.create(title='other')
+        models.RankingSnapshot.objects.all().delete()
+        snapshot = models.RankingSnapshot.objects.create(
+            days=7, date_from=date_from, date_until=date_until, built_at=timezone.now(),
+        )
+        models.RankingSnapshotEntry.objects.create(snapshot=snapshot, movie=other, total_comments=2, rank=1)
+
+        response = self.client.get('/top/', params)
+        self.assertEqual(response['X-Ranking-Snapshot'], snapshot.built_at.isoformat())
+        self.assertListEqual(response.json(), [{'id': other.id, 'total_comments': 2, 'rank': 1}])
@@ -0,0 +1,71 @@
+import time
+import threading
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from business_logic import generations, response_cache
+from business_logic.tests.caches import SHARED_CACHES
+from movies_api.models import Movie, TableGeneration
+
+
+@override_settings(CACHES=SHARED_CACHES)
+class TestResponseCache(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.factory = APIRequestFactory()
+
+    def make_key(self, query_string: str) -> str:
+        return response_cache.make_key(Request(self.factory.get(f'/movies/?{query_string}')), Movie)
+
+    def test_key_is_normalized(self):
+        key = self.make_key('director=a&duration__gt=90')
+        self.assertEqual(self.make_key('duration__gt=90&director=a&title='), key)
+        self.assertNotEqual(self.make_key('director=a&duration__gt=91'), key)
+
+    def test_key_depends_on_generation(self):
+        key = self.make_key('director=a')
+        TableGeneration.objects.create(table=generations.make_key(Movie), value=1)
+        self.assertNotEqual(self.make_key('director=a'), key)
+
+    def test_entry_is_built_once(self):
+        self.assertEqual(response_cache.get_or_build('key', lambda: [1], 60), ([1], False))
+        self.assertEqual(response_cache.get_or_build('key', lambda: [2], 60), ([1], True))
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_entries_are_not_cached_in_process_local_backend(self):
+        self.assertFalse(response_cache.is_enabled())
+        self.assertEqual(response_cache.get_or_build('key', lambda: [1], 60), ([1], False))
+        self.assertEqual(response_cache.get_or_build('key', lambda: [2], 60), ([2], False))
+
+    def test_concurrent_requests_wait_for_the_entry(self):
+        builds = []
+
+        def build():
+            builds.append(1)
+            time.sleep(0.05)
+            return [1]
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(response_cache.get_or_build('key', build, 60)))
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(builds), 1)
+        self.assertListEqual(sorted(hit for _, hit in results), [False, True, True, True, True])
+
+    @override_settings(RESPONSE_CACHE_MAX_WAIT=0.05)
+    def test_waiting_is_limited(self):
+        cache.add('key:lock', 1, 60)
+        start = time.monotonic()
+        self.assertEqual(response_cache.get_or_build('key', lambda: [1], 60), ([1], False))
+        self.assertLess(time.monotonic() - start, 1)
+        # the entry built without the lock is not cached
+        self.assertIsNone(cache.get('key'))
@@ -0,0 +1,172 @@
+from importlib import import_module
+from typing import List
+from unittest import mock, skipUnless
+
+from django.apps import apps
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+
+from business_logic import search
+from movies_api.models import Movie
+
+
+class TestTrigrams(SimpleTestCase):
+    def test_trigrams(self):
+        self.assertSetEqual(search.trigrams('Cat'), {'  c', ' ca', 'cat', 'at '})
+        self.assertSetEqual(search.trigrams('a, B'), {'  a', ' a ', '  b', ' b '})
+        self.assertSetEqual(search.trigrams(None), set())
+
+
+class TestNgramIndex(SimpleTestCase):
+    def setUp(self):
+        self.index = search.NgramIndex()
+        self.index.add(1, {'title': 'The Godfather', 'director': 'Francis Ford Coppola'})
+        self.index.add(2, {'title': 'The Godfather: Part II', 'director': 'Francis Ford Coppola'})
+        self.index.add(3, {'title': 'Goodfellas', 'director': 'Martin Scorsese'})
+
+    def test_search_tolerates_typos(self):
+        self.assertListEqual([movie_id for movie_id, _ in self.index.search('godfater', 0.6)], [1, 2])
+        self.assertListEqual([movie_id for movie_id, _ in self.index.search('scorsese', 0.6)], [3])
+        self.assertListEqual(self.index.search('alien', 0.6), [])
+
+    def test_results_are_ordered_by_relevance(self):
+        results = self.index.search('godfellas', 0.3)
+        self.assertEqual(results[0][0], 3)
+        self.assertGreater(results[0][1], results[1][1])
+
+
+class TestSearchMovies(TestCase):
+    def setUp(self):
+        search.get_index().clear()
+        self.godfather = Movie.objects.create(title='The Godfather', director='Francis Ford Coppola')
+        self.apocalypse = Movie.objects.create(title='Apocalypse Now', director='Francis Ford Coppola')
+        self.goodfellas = Movie.objects.create(title='Goodfellas', director='Martin Scorsese')
+
+    def test_search_by_title_and_director(self):
+        self.assertListEqual(list(search.search_movies(Movie.objects.all(), 'godfater')), [self.godfather])
+        self.assertListEqual(
+            list(search.search_movies(Movie.objects.all(), 'copola')),
+            [self.godfather, self.apocalypse]
+        )
+
+    def test_search_within_queryset(self):
+        queryset = Movie.objects.exclude(id=self.godfather.id)
+        self.assertListEqual(list(search.search_movies(queryset, 'coppola')), [self.apocalypse])
+
+    def test_relevance_is_annotated_per_score(self):
+        with mock.patch('business_logic.search.has_trigram_support', return_value=False):
+            queryset = search.search_movies(Movie.objects.all(), 'francis')
+            self.assertEqual(str(queryset.query).count('WHEN'), 1)
+            self.assertListEqual(list(queryset), [self.godfather, self.apocalypse])
+
+    @override_settings(SEARCH_MAX_CANDIDATES=1)
+    def test_number_of_candidates_is_limited(self):
+        with mock.patch('business_logic.search.has_trigram_support', return_value=False):
+            self.assertEqual(search.search_movies(Movie.objects.all(), 'coppola').count(), 1)
+
+    @skipUnless(connection.vendor == 'postgresql', 'pg_trgm is available only on PostgreSQL')
+    def test_trigram_search_is_used_when_extension_is_installed(self):
+        if not search.has_trigram_support():
+            self.skipTest('pg_trgm extension is not installed')
+        queryset = search.search_movies(Movie.objects.all(), 'godfater')
+        self.assertIn('WORD_SIMILARITY', str(queryset.query))
+        self.assertListEqual(list(queryset), [self.godfather])
+
+
+class TestSearchIndexRefresh(TransactionTestCase):
+    """
+    The index is refreshed when the generation of the movies table changes, i.e. after the transaction is committed.
+    """
+    def setUp(self):
+        search.get_index().clear()
+        Movie.objects.create(title='Apocalypse Now', director='Francis Ford Coppola')
+        patcher = mock.patch('business_logic.search.has_trigram_support', return_value=False)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_index_catches_up_with_new_movies(self):
+        self.assertFalse(search.search_movies(Movie.objects.all(), 'alien').exists())
+        alien = Movie.objects.create(title='Alien', director='Ridley Scott')
+        self.assertListEqual(list(search.search_movies(Movie.objects.all(), 'alien')), [alien])
+
+    def test_index_is_refreshed_only_when_movies_change(self):
+        list(search.search_movies(Movie.objects.all(), 'coppola'))
+        # the generation of the movies table and the matching movies
+        with self.assertNumQueries(2):
+            list(search.search_movies(Movie.objects.all(), 'coppola'))
+
+
+@skipUnless(connection.vendor == 'postgresql', 'pg_trgm is available only on PostgreSQL')
+class TestTrigramSearch(TestCase):
+    """
+    Search with `pg_trgm` lookups also when the extension is not installed in the test database:
+    `<%` operator and `word_similarity` function are then replaced with stand-ins matching substrings
+    (created in the test transaction), so the generated query is actually executed.
+    """
+    def setUp(self):
+        if not search.has_trigram_support():
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'CREATE FUNCTION word_similarity(text, text) RETURNS real AS '
+                    '$$ SELECT CASE WHEN strpos(lower($2), lower($1)) > 0 THEN 1.0 ELSE 0.0 END::real $$ '
+                    'LANGUAGE sql IMMUTABLE'
+                )
+                cursor.execute(
+                    'CREATE FUNCTION test_word_similarity_op(text, text) RETURNS boolean AS '
+                    '$$ SELECT word_similarity($1, $2) >= 0.6 $$ LANGUAGE sql IMMUTABLE'
+                )
+                cursor.execute('CREATE OPERATOR <% (LEFTARG = text, RIGHTARG = text, PROCEDURE = test_word_similarity_op)')
+        patcher = mock.patch('business_logic.search.has_trigram_support', return_value=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.godfather = Movie.objects.create(title='The Godfather', director='Francis Ford Coppola')
+        self.apocalypse = Movie.objects.create(title='Apocalypse Now', director='Francis Ford Coppola')
+        Movie.objects.create(title='Goodfellas', director='Martin Scorsese')
+
+    def test_lookups_are_compiled_to_trigram_operators(self):
+        sql, params = search.search_movies(Movie.objects.all(), 'godfather').query.sql_with_params()
+        # `%` of the operator is escaped for the database driver
+        self.assertIn('(%s <%% "movies_api_movie"."title" OR %s <%% "movies_api_movie"."director")', sql)
+        self.assertIn('GREATEST(WORD_SIMILARITY(%s, "movies_api_movie"."title"), ', sql)
+        self.assertEqual(list(params).count('godfather'), 4)
+
+    def test_search(self):
+        self.assertListEqual(list(search.search_movies(Movie.objects.all(), 'godfather')), [self.godfather])
+        movies = search.search_movies(Movie.objects.exclude(id=self.godfather.id), 'coppola')
+        self.assertListEqual([(movie, movie.relevance) for movie in movies], [(self.apocalypse, 1.0)])
+
+
+class TestTrigramIndexMigrations(SimpleTestCase):
+    def run_migration(self, module: str, function: str, extension_available: bool) -> List[str]:
+        """
+        :return: SQL statements executed by the function of the migration
+        """
+        schema_editor = mock.MagicMock()
+        schema_editor.connection.vendor = 'postgresql'
+        cursor = schema_editor.connection.cursor.return_value.__enter__.return_value
+        cursor.fetchone.return_value = (extension_available,)
+        getattr(import_module(f'movies_api.migrations.{module}'), function)(apps, schema_editor)
+        return [call[0][0] for call in schema_editor.execute.call_args_list]
+
+    def test_indexes_are_created_when_extension_is_available(self):
+        self.assertListEqual(self.run_migration('0005_movie_trigram_indexes', 'create_trigram_indexes', True), [
+            'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+            'CREATE INDEX IF NOT EXISTS movies_api_movie_title_trgm_idx ON movies_api_movie '
+            'USING gin (title gin_trgm_ops)',
+            'CREATE INDEX IF NOT EXISTS movies_api_movie_director_trgm_idx ON movies_api_movie '
+            'USING gin (director gin_trgm_ops)',
+        ])
+        self.assertListEqual(self.run_migration('0009_movie_filter_indexes', 'create_director_index', True), [
+            'CREATE INDEX IF NOT EXISTS movies_api_movie_director_upper_trgm_idx '
+            'ON movies_api_movie USING gin (UPPER(director::text) gin_trgm_ops)',
+        ])
+        self.assertListEqual(self.run_migration('0011_movie_title_upper_trgm_index', 'create_title_index', True), [
+            'CREATE INDEX IF NOT EXISTS movies_api_movie_title_upper_trgm_idx '
+            'ON movies_api_movie USING gin (UPPER(title::text) gin_trgm_ops)',
+        ])
+
+    def test_indexes_are_skipped_without_extension(self):
+        self.assertListEqual(self.run_migration('0005_movie_trigram_indexes', 'create_trigram_indexes', False), [])
+        self.assertListEqual(self.run_migration('0009_movie_filter_indexes', 'create_director_index', False), [])
+        self.assertListEqual(self.run_migration('0011_movie_title_upper_trgm_index', 'create_title_index', False), [])
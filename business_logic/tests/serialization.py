@@ -0,0 +1,40 @@
+import datetime as dt
+from django.test import TestCase
+from rest_framework.renderers import JSONRenderer
+
+import business_logic as bl
+from business_logic.serialization import get_values_serializer
+from movies_api import models
+from movies_api.serializers import MovieSerializer, MovieRankingSerializer
+from comments.models import Comment
+from comments.serializers import CommentSerializer
+
+
+class TestValuesSerializer(TestCase):
+    def setUp(self):
+        self.movie = models.Movie.objects.create(
+            title='Zażółć "gęślą" jaźń',
+            cover='https://example_host.com/pic.jpg/',
+            release_date=dt.date(2012, 5, 4),
+            duration=143,
+            director='Joss Whedon',
+            website='http://marvel.com/avengers_movie',
+        )
+        models.Movie.objects.create(title='Empty')
+        Comment.objects.create(movie=self.movie, body='comment\nwith new line', publish_date=dt.date(2010, 1, 1))
+        Comment.objects.create(movie=self.movie, body='', publish_date=dt.date(2011, 1, 1))
+
+    def assertSameOutput(self, serializer_class, queryset):
+        expected = JSONRenderer().render(serializer_class(queryset, many=True).data)
+        values_serializer = get_values_serializer(serializer_class)
+        actual = JSONRenderer().render(values_serializer.serialize(values_serializer.values(queryset)))
+        self.assertEqual(actual, expected)
+
+    def test_movies(self):
+        self.assertSameOutput(MovieSerializer, models.Movie.objects.order_by('id'))
+
+    def test_comments(self):
+        self.assertSameOutput(CommentSerializer, Comment.objects.order_by('id'))
+
+    def test_ranking(self):
+        self.assertSameOutput(MovieRankingSerializer, bl.get_ranking(dt.date(2010, 1, 1), dt.date(2010, 12, 31)))
@@ -0,0 +1,15 @@
+import json
+from django.test import SimpleTestCase
+
+from business_logic import streaming
+
+
+class TestJsonArray(SimpleTestCase):
+    def test_chunks_form_json_array(self):
+        items = [{'id': i, 'title': f'movie {i}'} for i in range(100)]
+        chunks = list(streaming.json_array(items, buffer_size=100))
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual(json.loads(b''.join(chunks)), items)
+
+    def test_empty_array(self):
+        self.assertEqual(b''.join(streaming.json_array([])), b'[]')
@@ -1,6 +1,10 @@
+import re
 from typing import Union
 from datetime import date
 from dateutil.parser import parse
+from rest_framework import status
+
+from business_logic import exceptions
 
 
 def read_field(dictionary: dict, key: str) -> Union[str, None]:
@@ -22,3 +26,31 @@ def parse_date(date_str: str) -> Union[date, None]:
         return parse(date_str).date()
     except TypeError:
         return None
+
+
+def parse_int(value: Union[str, int, None], name: str) -> Union[int, None]:
+    """
+    Parse integer parameter provided by the user.
+
+    :param value: value to parse
+    :param name: name of the parameter (used in error message)
+    :return: parsed value or None if value was not provided
+    :raises BusinessLogicException: if the value is not a valid integer
+    """
+    if value is None or value == '':
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise exceptions.BusinessLogicException(f'{name} should be an integer.', code=status.HTTP_400_BAD_REQUEST)
+
+
+def normalize_title(title: str) -> str:
+    """
+    Normalize movie title provided by the user, so it can be used as a lookup key.
+    Leading and trailing whitespaces are stripped, inner whitespaces are collapsed and the letter case is ignored.
+
+    :param title: title of the movie as provided by the user
+    :return: normalized title
+    """
+    return re.sub(r'\s+', ' ', title).strip().casefold()
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from business_logic import comment_stats, utils
+
+
+class Command(BaseCommand):
+    help = 'Rebuild daily comment counts used to generate movies ranking.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date-from', type=utils.parse_date, help='first day to rebuild (default: all days)')
+        parser.add_argument('--date-until', type=utils.parse_date, help='last day to rebuild (default: all days)')
+
+    def handle(self, *args, **options):
+        rows = comment_stats.rebuild_daily_counts(options['date_from'], options['date_until'])
+        self.stdout.write(self.style.SUCCESS(f'Daily comment counts rebuilt ({rows} rows).'))
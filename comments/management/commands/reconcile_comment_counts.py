@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from business_logic import comment_stats
+
+
+class Command(BaseCommand):
+    help = 'Recalculate total comment counts of the movies.'
+
+    def handle(self, *args, **options):
+        rows = comment_stats.reconcile_comment_counts()
+        self.stdout.write(self.style.SUCCESS(f'Comment counts reconciled ({rows} movies fixed).'))
@@ -0,0 +1,43 @@
+# Generated by Django 2.1.7 on 2026-10-18 20:12
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_daily_counts(apps, schema_editor):
+    Comment = apps.get_model('comments', 'Comment')
+    CommentDailyCount = apps.get_model('comments', 'CommentDailyCount')
+
+    schema_editor.execute(
+        f'INSERT INTO {CommentDailyCount._meta.db_table} (movie_id, day, count) '
+        f'SELECT movie_id, publish_date, COUNT(*) FROM {Comment._meta.db_table} GROUP BY movie_id, publish_date'
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies_api', '0004_movie_alias'),
+        ('comments', '0003_auto_20190320_2304'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CommentDailyCount',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('count', models.IntegerField(default=0)),
+                ('movie', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_comment_counts', to='movies_api.Movie')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='commentdailycount',
+            index=models.Index(fields=['day', 'movie'], name='comments_co_day_a1df7d_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='commentdailycount',
+            unique_together={('movie', 'day')},
+        ),
+        migrations.RunPython(fill_daily_counts, lambda apps, schema_editor: None),
+    ]
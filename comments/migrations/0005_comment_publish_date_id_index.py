@@ -0,0 +1,17 @@
+# Generated by Django 2.1.7 on 2026-10-18 20:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('comments', '0004_comment_daily_count'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['publish_date', 'id'], name='comments_co_publish_78b53b_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 2.1.7 on 2026-10-18 21:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('comments', '0005_comment_publish_date_id_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['movie', 'publish_date', 'id'], name='comments_co_movie_i_df9035_idx'),
+        ),
+    ]
@@ -1,12 +1,79 @@
-from django.db import models
+from collections import Counter
+
+from django.db import models, transaction
 import datetime
 from movies_api import models as movie_models
 
 
+class CommentQuerySet(models.QuerySet):
+    def delete(self):
+        """
+        Delete the comments and update comment statistics (see `business_logic.comment_stats`)
+        with numbers of the deleted comments counted by the database.
+        """
+        # business_logic imports the models
+        from business_logic import comment_stats, generations
+
+        with transaction.atomic(using=self.db):
+            counts = Counter({
+                (movie_id, day): count
+                for movie_id, day, count in self.order_by().values_list('movie_id', 'publish_date')
+                .annotate(count=models.Count('id'))
+            })
+            result = super().delete()
+            comment_stats.record_counts(counts, delta=-1)
+            generations.bump(Comment)
+        return result
+
+    delete.alters_data = True
+
+
 class Comment(models.Model):
     movie = models.ForeignKey(movie_models.Movie, null=False, on_delete=models.CASCADE)
     body = models.TextField(blank=True)
     publish_date = models.DateField(default=datetime.date.today)
 
+    objects = CommentQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # keyset pagination of comments list
+            models.Index(fields=['publish_date', 'id']),
+            # comments of movies read in order by export (see `business_logic.export`)
+            models.Index(fields=['movie', 'publish_date', 'id']),
+        ]
+
+    # (movie_id, publish_date) the comment is counted under in the statistics - compared on save (see comments.signals)
+    stats_key = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.stats_key = (instance.movie_id, instance.publish_date)
+        return instance
+
+    def delete(self, using=None, keep_parents=False):
+        # statistics are updated by the queryset
+        result = Comment.objects.using(using).filter(pk=self.pk).delete()
+        self.pk = None
+        return result
+
+    def __str__(self):
+        return f'Comment(movie_id={self.movie_id}, publish_date={self.publish_date}, body=\'{self.body[:10]}\')'
+
+
+class CommentDailyCount(models.Model):
+    """
+    Number of comments published for the movie on the given day.
+    Rows are maintained by `business_logic.comment_stats` whenever comments are added or removed.
+    """
+    movie = models.ForeignKey(movie_models.Movie, on_delete=models.CASCADE, related_name='daily_comment_counts')
+    day = models.DateField()
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('movie', 'day')
+        indexes = [models.Index(fields=['day', 'movie'])]
+
     def __str__(self):
-        return f'Comment(movie_id={self.movie.pk}, publish_date={self.publish_date}, body=\'{self.body[:10]}\')'
+        return f'CommentDailyCount(movie_id={self.movie_id}, day={self.day}, count={self.count})'
@@ -7,3 +7,9 @@ class CommentSerializer(serializers.ModelSerializer):
     class Meta:
         model = models.Comment
         fields = '__all__'
+
+
+class CommentBulkResultSerializer(serializers.Serializer):
+    index = serializers.IntegerField()
+    comment = CommentSerializer(required=False)
+    errors = serializers.ListField(child=serializers.CharField(), required=False)
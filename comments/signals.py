@@ -0,0 +1,21 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from comments.models import Comment
+from business_logic import comment_stats, generations
+
+
+# there are no delete receivers - deletes are counted by `Comment.delete` and `CommentQuerySet.delete`,
+# so cascade deletes of movies remain a single DELETE of their comments
+
+
+@receiver(post_save, sender=Comment)
+def update_stats_after_save(sender, instance: Comment, created: bool, **kwargs):
+    generations.bump(Comment)
+    key = (instance.movie_id, instance.publish_date)
+    previous_key, instance.stats_key = instance.stats_key, key
+    if created:
+        comment_stats.record_comments([key])
+    elif previous_key and previous_key != key:
+        comment_stats.record_comments([previous_key], delta=-1)
+        comment_stats.record_comments([key])
@@ -1,19 +1,26 @@
 import json
+from datetime import date
 from io import BytesIO
 
-from django.test import TestCase
+from django.core.cache import cache
+from django.test import TestCase, TransactionTestCase, override_settings
 from django.urls import reverse
 from django.utils.http import urlencode
 from rest_framework.test import APIClient
 
 
+from business_logic import ranking_cache
+from business_logic.instrumentation import query_budget
+from business_logic.tests.caches import SHARED_CACHES
 from movies_api.models import Movie
+from comments.models import Comment
 
 
 class TestCommentsApi(TestCase):
     def setUp(self):
         self.movie = Movie.objects.create(title='Test')
         self.client = APIClient()
+        cache.clear()
 
     def test_add_comment(self):
         response = self.client.post(reverse('comments'), {'movie_id': self.movie.id, 'body': 'comment'})
@@ -25,6 +32,38 @@ class TestCommentsApi(TestCase):
         self.assertEqual(self.movie.comment_set.count(), 1)
         self.assertEqual(self.movie.comment_set.first().body, 'comment')
 
+    def test_add_many_comments(self):
+        response = self.client.post(reverse('comments'), [
+            {'movie_id': self.movie.id, 'body': 'first'},
+            {'movie_id': self.movie.id, 'body': ''},
+        ], format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data[0]['comment']['body'], 'first')
+        self.assertNotIn('errors', response.data[0])
+        self.assertListEqual(response.data[1]['errors'], ['Comment cannot be empty.'])
+        self.assertNotIn('comment', response.data[1])
+        self.assertEqual(self.movie.comment_set.count(), 1)
+
+    def test_query_budgets(self):
+        for i in range(20):
+            Comment.objects.create(movie=self.movie, body=f'comment {i}')
+
+        # generations of the tables (ETag) and the page
+        with query_budget(2):
+            self.client.get(reverse('comments'))
+        with query_budget(2):
+            self.client.get(reverse('comments'), {'stream': 1}).getvalue()
+        # savepoints of the test case transaction are included
+        with query_budget(8):
+            self.client.post(reverse('comments'), {'movie_id': self.movie.id, 'body': 'comment'})
+        with query_budget(8, n_plus_one_threshold=3):
+            self.client.post(reverse('comments'), [{'movie_id': self.movie.id, 'body': 'comment'}] * 20, format='json')
+        # generations of the tables, snapshot of the window and the ranking (or only the lookups if it is cached)
+        with query_budget(3):
+            self.client.get(reverse('top'), {'date_from': '2010-01-01', 'date_until': '2030-01-01'})
+        with query_budget(3):
+            self.client.get(reverse('top'), {'date_from': '2010-01-01', 'date_until': '2030-01-02'})
+
     def test_fail_to_add_comment_with_no_movie_id_provided_in_request_body(self):
         response = self.client.post(reverse('comments'), {'body': 'comment'})
         self.assertEqual(response.status_code, 400)
@@ -47,3 +86,101 @@ class TestCommentsApi(TestCase):
         res_body = json.load(BytesIO(response.content))
         self.assertEqual(res_body[0]['total_comments'], 0)
         self.assertEqual(res_body[0]['rank'], 1)
+
+    def test_ranking_limit(self):
+        Movie.objects.create(title='Other')
+        q = urlencode({'date_from': '2010-10-10', 'date_until': '2011-10-10', 'limit': 1, 'offset': 1})
+        response = self.client.get(reverse('top') + f'?{q}')
+        self.assertEqual(response.status_code, 200)
+        res_body = json.load(BytesIO(response.content))
+        self.assertEqual(len(res_body), 1)
+        self.assertEqual(res_body[0]['rank'], 1)
+
+    def test_invalid_ranking_limit(self):
+        q = urlencode({'date_from': '2010-10-10', 'date_until': '2011-10-10', 'limit': 'ten'})
+        response = self.client.get(reverse('top') + f'?{q}')
+        self.assertEqual(response.status_code, 400)
+
+    def test_comments_are_paginated_with_cursor(self):
+        for i, day in enumerate(['2010-01-03', '2010-01-01', '2010-01-02', '2010-01-01', '2010-01-02']):
+            Comment.objects.create(movie=self.movie, body=f'comment {i}', publish_date=day)
+
+        bodies = []
+        url = reverse('comments') + '?page_size=2'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertLessEqual(len(response.data['results']), 2)
+            bodies.extend(comment['body'] for comment in response.data['results'])
+            url = response.data['next']
+
+        self.assertListEqual(bodies, ['comment 1', 'comment 3', 'comment 2', 'comment 4', 'comment 0'])
+
+    def test_invalid_cursor(self):
+        response = self.client.get(reverse('comments') + '?cursor=invalid')
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(CACHES=SHARED_CACHES)
+class TestRankingCache(TransactionTestCase):
+    def setUp(self):
+        self.movie = Movie.objects.create(title='Test')
+        self.client = APIClient()
+        self.url = reverse('top') + '?' + urlencode({'date_from': '2010-10-10', 'date_until': '2011-10-10'})
+        cache.clear()
+
+    def get_ranking_response(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def get_ranking(self):
+        response = self.get_ranking_response()
+        return response['X-Cache'], json.load(BytesIO(response.content))
+
+    def test_ranking_is_cached(self):
+        self.assertEqual(self.get_ranking()[0], 'MISS')
+        self.assertEqual(self.get_ranking()[0], 'HIT')
+
+    def test_comment_invalidates_rankings(self):
+        self.get_ranking()
+        self.client.post(reverse('comments'), {'movie_id': self.movie.id, 'body': 'c', 'publish_date': '2011-01-01'})
+        cache_status, ranking = self.get_ranking()
+        self.assertEqual(cache_status, 'MISS')
+        self.assertEqual(ranking[0]['total_comments'], 1)
+
+    def test_new_movie_invalidates_rankings(self):
+        self.get_ranking()
+        Movie.objects.create(title='Other')
+        cache_status, ranking = self.get_ranking()
+        self.assertEqual(cache_status, 'MISS')
+        self.assertEqual(len(ranking), 2)
+
+    def test_ranking_computed_before_comment_is_not_served(self):
+        key = ranking_cache.make_key(date(2010, 10, 10), date(2011, 10, 10))
+        stale = self.get_ranking()[1]
+        # the comment is committed after the ranking was computed, but before it was stored
+        Comment.objects.create(movie=self.movie, body='c', publish_date=date(2011, 1, 1))
+        ranking_cache.set(key, stale)
+
+        cache_status, ranking = self.get_ranking()
+        self.assertEqual(cache_status, 'MISS')
+        self.assertEqual(ranking[0]['total_comments'], 1)
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_rankings_are_not_cached_in_process_local_backend(self):
+        self.assertEqual(self.get_ranking()[0], 'MISS')
+        self.assertEqual(self.get_ranking()[0], 'MISS')
+
+    def test_not_modified(self):
+        etag = self.get_ranking_response()['ETag']
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        self.client.post(reverse('comments'), {'movie_id': self.movie.id, 'body': 'c', 'publish_date': '2012-01-01'})
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        etag = self.client.get(reverse('comments'))['ETag']
+        self.assertEqual(self.client.get(reverse('comments'), HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        Comment.objects.all().delete()
+        self.assertEqual(self.client.get(reverse('comments'), HTTP_IF_NONE_MATCH=etag).status_code, 200)
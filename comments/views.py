@@ -1,4 +1,6 @@
 from typing import Any
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
 from rest_framework.generics import ListCreateAPIView
 from rest_framework.response import Response
 from rest_framework.request import Request
@@ -6,15 +8,26 @@ from django_filters import rest_framework as dj_filters
 
 from comments import models, serializers, filters
 import business_logic as bl
+from business_logic import generations
+from business_logic.pagination import KeysetPagination
+from business_logic.serialization import ValuesListMixin
+from business_logic.streaming import StreamingListMixin
 
 
-class CommentView(ListCreateAPIView):
+@method_decorator(condition(etag_func=generations.etag_func(models.Comment)), name='get')
+class CommentView(StreamingListMixin, ValuesListMixin, ListCreateAPIView):
     queryset = models.Comment.objects.all()
     serializer_class = serializers.CommentSerializer
     filter_backends = (dj_filters.DjangoFilterBackend,)
     filterset_class = filters.CommentFilter
+    pagination_class = KeysetPagination
+    keyset_ordering = ('publish_date', 'id')
 
     def post(self, request: Request, *args: Any, **kwargs: Any) -> Response:
+        if isinstance(request.data, list):
+            results = bl.add_comments(request.data)
+            return Response(serializers.CommentBulkResultSerializer(results, many=True).data)
+
         movie_id = request.data.get('movie_id', None) or request.data.get('movie', None)
         comment_body = request.data.get('body', None)
         publish_date = bl.utils.parse_date(request.data.get('publish_date', None))
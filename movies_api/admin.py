@@ -4,3 +4,7 @@ from movies_api import models
 
 
 admin.site.register(models.Movie)
+admin.site.register(models.MovieAlias)
+admin.site.register(models.MovieImportJob)
+admin.site.register(models.MovieImportItem)
+admin.site.register(models.RankingSnapshot)
@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class MoviesApiConfig(AppConfig):
     name = 'movies_api'
+
+    def ready(self):
+        from movies_api import signals  # noqa: F401
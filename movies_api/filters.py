@@ -1,17 +1,60 @@
+from collections import OrderedDict
+from datetime import date
+
 import django_filters
+from django_filters.constants import EMPTY_VALUES
 from movies_api.models import Movie
+from business_logic import search
+
+
+def year_start(year: int) -> date:
+    return date(min(max(year, date.min.year), date.max.year), 1, 1) if year <= date.max.year else date.max
+
+
+class YearFilter(django_filters.NumberFilter):
+    """
+    Filter dates by year (`lookup_expr`: `exact`, `gt` or `lt`) with range conditions on the date column itself
+    (e.g. `date >= '2000-01-01' AND date < '2001-01-01'`), so the index of the column can be used.
+    """
+    def filter(self, qs, value):
+        if value in EMPTY_VALUES:
+            return qs
+        start, end = year_start(int(value)), year_start(int(value) + 1)
+        conditions = {
+            'exact': {'gte': start, 'lt': end},
+            'gt': {'gte': end},
+            'lt': {'lt': start},
+        }[self.lookup_expr]
+        return self.get_method(qs)(**{f'{self.field_name}__{lookup}': bound for lookup, bound in conditions.items()})
 
 
 class MovieFilter(django_filters.FilterSet):
+    # keyset orderings of the list (applied by the pagination, see `MovieView.get_keyset_ordering`)
+    ORDERINGS = OrderedDict([
+        ('id', ('id',)),
+        ('comment_count', ('comment_count', 'id')),
+        ('-comment_count', ('-comment_count', '-id')),
+    ])
+
     title = django_filters.CharFilter(lookup_expr='icontains')
     duration__gt = django_filters.NumberFilter(field_name='duration', lookup_expr='gt')
     duration__lt = django_filters.NumberFilter(field_name='duration', lookup_expr='lt')
 
-    release_year = django_filters.NumberFilter(field_name='release_date', lookup_expr='year')
-    release_year__gt = django_filters.NumberFilter(field_name='release_date', lookup_expr='year__gt')
-    release_year__lt = django_filters.NumberFilter(field_name='release_date', lookup_expr='year__lt')
+    release_year = YearFilter(field_name='release_date', lookup_expr='exact')
+    release_year__gt = YearFilter(field_name='release_date', lookup_expr='gt')
+    release_year__lt = YearFilter(field_name='release_date', lookup_expr='lt')
     director = django_filters.CharFilter(lookup_expr='icontains')
+    search = django_filters.CharFilter(method='filter_search')
+    min_comments = django_filters.NumberFilter(field_name='comment_count', lookup_expr='gte')
+    ordering = django_filters.ChoiceFilter(choices=[(name, name) for name in ORDERINGS], method='filter_ordering')
 
     class Meta:
         model = Movie
         fields = ('release_date', )
+
+    def filter_search(self, queryset, name, value):
+        return search.search_movies(queryset, value, request=self.request)
+
+    def filter_ordering(self, queryset, name, value):
+        # the value is only validated here
+        return queryset
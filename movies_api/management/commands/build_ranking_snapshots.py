@@ -0,0 +1,23 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from business_logic import ranking_snapshots, utils
+
+
+class Command(BaseCommand):
+    help = 'Precompute rankings of the last N days (e.g. run by cron).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, nargs='+', default=settings.RANKING_SNAPSHOT_WINDOWS,
+                            help='lengths of the windows (default: RANKING_SNAPSHOT_WINDOWS setting)')
+        parser.add_argument('--date-until', type=utils.parse_date, help='last day of the windows (default: today)')
+
+    def handle(self, *args, **options):
+        if any(days < 1 for days in options['days']):
+            raise CommandError('--days must be positive.')
+
+        for snapshot in ranking_snapshots.build_snapshots(options['days'], options['date_until']):
+            self.stdout.write(
+                f'{snapshot.days} days ({snapshot.date_from} - {snapshot.date_until}): {snapshot.entries.count()} movies.'
+            )
+        self.stdout.write(self.style.SUCCESS('Ranking snapshots built.'))
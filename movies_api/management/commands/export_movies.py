@@ -0,0 +1,52 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from business_logic import export
+from movies_api.filters import MovieFilter
+from movies_api.models import Movie
+
+
+def parse_filter(value: str) -> tuple:
+    name, separator, filter_value = value.partition('=')
+    if not separator:
+        raise ValueError(value)
+    return name, filter_value
+
+
+class Command(BaseCommand):
+    help = 'Export movies with their comments as NDJSON or CSV.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output-format', choices=list(export.CONTENT_TYPES), default='ndjson',
+                            help='format of the export')
+        parser.add_argument('--output', help='path of the output file (default: standard output)')
+        parser.add_argument('--filter', type=parse_filter, action='append', default=[], metavar='NAME=VALUE',
+                            help='filter of the movies, the same as query params of /movies/ (e.g. release_year=2000)')
+        parser.add_argument('--chunk-size', type=int, help='number of movies read from the database at once')
+
+    def handle(self, *args, **options):
+        movie_filter = MovieFilter(dict(options['filter']), queryset=Movie.objects.all())
+        if not movie_filter.is_valid():
+            raise CommandError(f'Invalid filters: {dict(movie_filter.errors)}')
+        if options['chunk_size'] is not None and options['chunk_size'] < 1:
+            raise CommandError('--chunk-size must be positive.')
+
+        start = time.monotonic()
+        chunks = export.export_movies(movie_filter.qs, options['output_format'], options['chunk_size'])
+        size = 0
+        if options['output']:
+            with open(options['output'], 'wb') as f:
+                for chunk in chunks:
+                    f.write(chunk)
+                    size += len(chunk)
+        else:
+            for chunk in chunks:
+                # chunks are encoded whole strings, so they can be decoded one by one
+                self.stdout.write(chunk.decode(), ending='')
+                size += len(chunk)
+
+        # progress goes to standard error, so it does not mix with the exported data
+        self.stderr.write(self.style.SUCCESS(
+            f'Movies exported ({size / 1024 / 1024:.1f} MB, {time.monotonic() - start:.1f} s).'
+        ))
@@ -0,0 +1,36 @@
+import datetime as dt
+
+from django.core.management.base import BaseCommand, CommandError
+
+from business_logic import datagen, utils
+
+
+class Command(BaseCommand):
+    help = 'Generate synthetic movies and comments (e.g. for load tests).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--movies', type=int, default=10000, help='number of movies to generate')
+        parser.add_argument('--comments', type=int, default=1000000, help='number of comments to generate')
+        parser.add_argument('--zipf', type=float, default=1.0,
+                            help='exponent of Zipf distribution of comments between movies (0 - uniform)')
+        parser.add_argument('--date-from', type=utils.parse_date, help='first publish date (default: 5 years ago)')
+        parser.add_argument('--date-until', type=utils.parse_date, help='last publish date (default: today)')
+        parser.add_argument('--seed', type=int, help='seed of the random generator')
+        parser.add_argument('--batch-size', type=int, default=100000, help='number of rows written at once')
+        parser.add_argument('--drop-indexes', action='store_true',
+                            help='drop secondary indexes during the load and rebuild them afterwards (PostgreSQL)')
+
+    def handle(self, *args, **options):
+        date_until = options['date_until'] or dt.date.today()
+        date_from = options['date_from'] or date_until - dt.timedelta(days=5 * 365)
+        if date_from > date_until:
+            raise CommandError('--date-from must not be later than --date-until.')
+        if options['movies'] < 0 or options['comments'] < 0 or options['batch_size'] < 1:
+            raise CommandError('Numbers of rows must not be negative.')
+
+        datagen.generate(
+            options['movies'], options['comments'], date_from, date_until,
+            zipf_exponent=options['zipf'], seed=options['seed'], drop_indexes=options['drop_indexes'],
+            batch_size=options['batch_size'], log=self.stdout.write,
+        )
+        self.stdout.write(self.style.SUCCESS('Data generated.'))
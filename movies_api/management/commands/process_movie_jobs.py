@@ -0,0 +1,24 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from business_logic import jobs
+
+
+class Command(BaseCommand):
+    help = 'Process movie import jobs queued with POST /movies/?async=1.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=2, help='number of worker threads')
+        parser.add_argument('--batch-size', type=int, default=20, help='number of titles claimed at once')
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                            help='seconds to wait before checking an empty queue again')
+        parser.add_argument('--once', action='store_true', help='exit when the queue is empty')
+
+    def handle(self, *args, **options):
+        if options['workers'] < 1 or options['poll_interval'] < 0:
+            raise CommandError('--workers must be positive and --poll-interval must not be negative.')
+        if not 1 <= options['batch_size'] <= settings.MOVIE_IMPORT_MAX_TITLES:
+            raise CommandError(f'--batch-size must be between 1 and {settings.MOVIE_IMPORT_MAX_TITLES}.')
+
+        jobs.run_workers(options['workers'], options['batch_size'], options['poll_interval'], drain=options['once'])
+        self.stdout.write(self.style.SUCCESS('Workers stopped.'))
@@ -0,0 +1,34 @@
+# Generated by Django 2.1.7 on 2026-10-18 20:11
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def create_title_upper_index(apps, schema_editor):
+    # expression matching `title__iexact` lookup: UPPER("movies_api_movie"."title"::text) = UPPER(%s)
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('CREATE INDEX movies_api_movie_title_upper_idx ON movies_api_movie (UPPER(title::text))')
+
+
+def drop_title_upper_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS movies_api_movie_title_upper_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies_api', '0003_auto_20190317_1906'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MovieAlias',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('query', models.CharField(max_length=255, unique=True)),
+                ('movie', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='aliases', to='movies_api.Movie')),
+            ],
+        ),
+        migrations.RunPython(create_title_upper_index, drop_title_upper_index),
+    ]
@@ -0,0 +1,34 @@
+from django.db import migrations
+
+
+def create_trigram_indexes(apps, schema_editor):
+    # without `pg_trgm` extension search falls back to in-process index (see `business_logic.search`)
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT EXISTS(SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm')")
+        if not cursor.fetchone()[0]:
+            return
+
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for field in ('title', 'director'):
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS movies_api_movie_{field}_trgm_idx ON movies_api_movie USING gin ({field} gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        for field in ('title', 'director'):
+            schema_editor.execute(f'DROP INDEX IF EXISTS movies_api_movie_{field}_trgm_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies_api', '0004_movie_alias'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 2.1.7 on 2026-10-18 20:30
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies_api', '0005_movie_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MovieImportItem',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('query', models.CharField(max_length=255)),
+                ('normalized_query', models.CharField(max_length=255)),
+                ('status', models.CharField(choices=[('pending', 'pending'), ('running', 'running'), ('done', 'done'), ('not_found', 'not found'), ('failed', 'failed')], default='pending', max_length=20)),
+                ('attempts', models.IntegerField(default=0)),
+                ('started_at', models.DateTimeField(null=True)),
+                ('finished_at', models.DateTimeField(null=True)),
+                ('error', models.TextField(blank=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='MovieImportJob',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='movieimportitem',
+            name='job',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='movies_api.MovieImportJob'),
+        ),
+        migrations.AddField(
+            model_name='movieimportitem',
+            name='movie',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='movies_api.Movie'),
+        ),
+        migrations.AddIndex(
+            model_name='movieimportitem',
+            index=models.Index(fields=['status', 'id'], name='movies_api__status_27db4e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movieimportitem',
+            index=models.Index(fields=['normalized_query', 'status'], name='movies_api__normali_3b0f32_idx'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 2.1.7 on 2026-10-18 20:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies_api', '0006_movie_import_jobs'),
+        ('comments', '0005_comment_publish_date_id_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='movie',
+            name='comment_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunSQL(
+            'UPDATE movies_api_movie SET comment_count = '
+            '(SELECT COUNT(*) FROM comments_comment WHERE comments_comment.movie_id = movies_api_movie.id)',
+            migrations.RunSQL.noop,
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['comment_count', 'id'], name='movies_api__comment_2ebc71_idx'),
+        ),
+    ]
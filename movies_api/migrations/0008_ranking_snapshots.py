@@ -0,0 +1,38 @@
+# Generated by Django 2.1.7 on 2026-10-18 20:39
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies_api', '0007_movie_comment_count'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RankingSnapshot',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('days', models.IntegerField()),
+                ('date_from', models.DateField()),
+                ('date_until', models.DateField()),
+                ('built_at', models.DateTimeField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='RankingSnapshotEntry',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_comments', models.IntegerField()),
+                ('rank', models.IntegerField()),
+                ('movie', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='movies_api.Movie')),
+                ('snapshot', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='entries', to='movies_api.RankingSnapshot')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='rankingsnapshotentry',
+            index=models.Index(fields=['snapshot', 'rank', 'movie'], name='movies_api__snapsho_778b47_idx'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 2.1.7 on 2026-10-18 20:40
+
+from django.db import migrations, models
+
+
+def create_director_index(apps, schema_editor):
+    # `director__icontains` is compiled to `UPPER("director"::text) LIKE UPPER(%s)` - B-tree index cannot serve
+    # the leading wildcard, trigram index on the same expression can (if `pg_trgm` is available, see 0005)
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT EXISTS(SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm')")
+        if not cursor.fetchone()[0]:
+            return
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS movies_api_movie_director_upper_trgm_idx '
+        'ON movies_api_movie USING gin (UPPER(director::text) gin_trgm_ops)'
+    )
+
+
+def drop_director_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS movies_api_movie_director_upper_trgm_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies_api', '0008_ranking_snapshots'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['release_date'], name='movie_release_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['duration'], name='movie_duration_idx'),
+        ),
+        migrations.RunPython(create_director_index, drop_director_index),
+    ]
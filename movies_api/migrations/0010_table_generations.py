@@ -0,0 +1,20 @@
+# Generated by Django 2.1.7 on 2026-10-18 21:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies_api', '0009_movie_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TableGeneration',
+            fields=[
+                ('table', models.CharField(max_length=100, primary_key=True, serialize=False)),
+                ('value', models.BigIntegerField()),
+            ],
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 2.1.7 on 2026-10-18 23:10
+
+from django.db import migrations
+
+
+def create_title_index(apps, schema_editor):
+    # `title__icontains` is compiled to `UPPER("title"::text) LIKE UPPER(%s)` - the trigram index on the column
+    # (see 0005) serves only the similarity search, the filter needs the index on the same expression (as in 0009)
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT EXISTS(SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm')")
+        if not cursor.fetchone()[0]:
+            return
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS movies_api_movie_title_upper_trgm_idx '
+        'ON movies_api_movie USING gin (UPPER(title::text) gin_trgm_ops)'
+    )
+
+
+def drop_title_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS movies_api_movie_title_upper_trgm_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies_api', '0010_table_generations'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_title_index, drop_title_index),
+    ]
@@ -8,9 +8,135 @@ class Movie(models.Model):
     duration = models.IntegerField(null=True)  # movie duration in minutes
     director = models.CharField(max_length=100, null=True)
     website = models.URLField(null=True)
+    # number of all comments of the movie, maintained by `business_logic.comment_stats`
+    comment_count = models.IntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            # ordering by popularity (keyset pagination)
+            models.Index(fields=['comment_count', 'id']),
+            # range filters of the list (see `movies_api.filters.MovieFilter`)
+            models.Index(fields=['release_date'], name='movie_release_date_idx'),
+            models.Index(fields=['duration'], name='movie_duration_idx'),
+        ]
 
     def __repr__(self):
         return f'Movie(id={self.pk}, title=\'{self.title}\')'
 
     def __str__(self):
         return repr(self)
+
+
+class MovieAlias(models.Model):
+    """
+    Normalized title provided by the user that was resolved to the movie by the external API.
+    """
+    query = models.CharField(max_length=255, unique=True)
+    movie = models.ForeignKey(Movie, on_delete=models.CASCADE, related_name='aliases')
+
+    def __repr__(self):
+        return f'MovieAlias(query=\'{self.query}\', movie_id={self.movie_id})'
+
+    def __str__(self):
+        return repr(self)
+
+
+class MovieImportJob(models.Model):
+    """
+    Titles queued to be fetched from the external API by background workers (see `business_logic.jobs`).
+    """
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __repr__(self):
+        return f'MovieImportJob(id={self.pk})'
+
+    def __str__(self):
+        return repr(self)
+
+
+class MovieImportItem(models.Model):
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    NOT_FOUND = 'not_found'
+    FAILED = 'failed'
+    STATUSES = (
+        (PENDING, 'pending'),
+        (RUNNING, 'running'),
+        (DONE, 'done'),
+        (NOT_FOUND, 'not found'),
+        (FAILED, 'failed'),
+    )
+
+    job = models.ForeignKey(MovieImportJob, on_delete=models.CASCADE, related_name='items')
+    query = models.CharField(max_length=255)
+    normalized_query = models.CharField(max_length=255)
+    status = models.CharField(max_length=20, choices=STATUSES, default=PENDING)
+    attempts = models.IntegerField(default=0)
+    started_at = models.DateTimeField(null=True)
+    finished_at = models.DateTimeField(null=True)
+    movie = models.ForeignKey(Movie, null=True, on_delete=models.SET_NULL, related_name='+')
+    error = models.TextField(blank=True)
+
+    class Meta:
+        # workers poll the queue for the oldest pending items
+        indexes = [
+            models.Index(fields=['status', 'id']),
+            models.Index(fields=['normalized_query', 'status']),
+        ]
+
+    def __repr__(self):
+        return f'MovieImportItem(job_id={self.job_id}, query=\'{self.query}\', status={self.status})'
+
+    def __str__(self):
+        return repr(self)
+
+
+class RankingSnapshot(models.Model):
+    """
+    Ranking of all the movies for a fixed date window, precomputed by `build_ranking_snapshots` command
+    (see `business_logic.ranking_snapshots`).
+    """
+    days = models.IntegerField()  # length of the window
+    date_from = models.DateField()
+    date_until = models.DateField()
+    built_at = models.DateTimeField()
+
+    def __repr__(self):
+        return f'RankingSnapshot(id={self.pk}, date_from={self.date_from}, date_until={self.date_until})'
+
+    def __str__(self):
+        return repr(self)
+
+
+class RankingSnapshotEntry(models.Model):
+    snapshot = models.ForeignKey(RankingSnapshot, on_delete=models.CASCADE, related_name='entries')
+    movie = models.ForeignKey(Movie, on_delete=models.CASCADE, related_name='+')
+    total_comments = models.IntegerField()
+    rank = models.IntegerField()
+
+    class Meta:
+        # entries are read in the order of the ranking
+        indexes = [models.Index(fields=['snapshot', 'rank', 'movie'])]
+
+    def __repr__(self):
+        return f'RankingSnapshotEntry(snapshot_id={self.snapshot_id}, movie_id={self.movie_id}, rank={self.rank})'
+
+    def __str__(self):
+        return repr(self)
+
+
+class TableGeneration(models.Model):
+    """
+    Number changed after every write to the table (see `business_logic.generations`).
+    Stored in the database, so writes of all the processes (web workers, management commands) are visible
+    to all of them.
+    """
+    table = models.CharField(max_length=100, primary_key=True)
+    value = models.BigIntegerField()
+
+    def __repr__(self):
+        return f'TableGeneration(table=\'{self.table}\', value={self.value})'
+
+    def __str__(self):
+        return repr(self)
@@ -1,12 +1,22 @@
 from rest_framework import serializers
 
 from movies_api import models
+from comments.models import Comment
 
 
 class MovieSerializer(serializers.ModelSerializer):
     class Meta:
         model = models.Movie
-        fields = '__all__'
+        # number of comments changes with every comment - it is not a part of the representation,
+        # so comments do not invalidate lists of movies (it can be used to filter and order the lists)
+        exclude = ('comment_count',)
+
+
+class ExportedCommentSerializer(serializers.ModelSerializer):
+    # comments are nested in their movies (see `business_logic.export`)
+    class Meta:
+        model = Comment
+        fields = ('id', 'body', 'publish_date')
 
 
 class MovieRankingSerializer(serializers.ModelSerializer):
@@ -16,3 +26,37 @@ class MovieRankingSerializer(serializers.ModelSerializer):
     class Meta:
         model = models.Movie
         fields = ('id', 'total_comments', 'rank')
+
+
+class ImportedMovieSerializer(serializers.Serializer):
+    query = serializers.CharField()
+    movie = MovieSerializer()
+
+
+class ImportErrorSerializer(serializers.Serializer):
+    query = serializers.CharField()
+    error = serializers.CharField()
+
+
+class MovieImportSerializer(serializers.Serializer):
+    created = ImportedMovieSerializer(many=True)
+    present = ImportedMovieSerializer(many=True)
+    not_found = ImportErrorSerializer(many=True)
+    failed = ImportErrorSerializer(many=True)
+
+
+class MovieImportItemSerializer(serializers.ModelSerializer):
+    movie = MovieSerializer()
+
+    class Meta:
+        model = models.MovieImportItem
+        fields = ('query', 'status', 'movie', 'error')
+
+
+class MovieImportJobSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    created_at = serializers.DateTimeField()
+    status = serializers.CharField()
+    total = serializers.IntegerField()
+    counts = serializers.DictField(child=serializers.IntegerField())
+    items = MovieImportItemSerializer(many=True)
@@ -0,0 +1,18 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from movies_api.models import Movie
+from comments.models import Comment, CommentDailyCount
+from business_logic import generations
+
+
+@receiver(post_save, sender=Movie)
+def bump_generation_after_save(sender, instance: Movie, created: bool, **kwargs):
+    # every movie is present in every ranking - cached rankings are keyed by the generation
+    generations.bump(Movie)
+
+
+@receiver(post_delete, sender=Movie)
+def bump_generation_after_delete(sender, instance: Movie, **kwargs):
+    # comments and their daily counts are deleted with the movie (cascade, without signals)
+    generations.bump(Movie, Comment, CommentDailyCount)
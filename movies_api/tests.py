@@ -1,24 +1,40 @@
+import json
 import os
-from unittest import mock
+from io import StringIO
+from unittest import mock, skipUnless
 
-from django.test import TestCase
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from rest_framework.renderers import JSONRenderer
 from rest_framework.test import APIClient
 
 from movies_db.settings import BASE_DIR
 from movies_api import models
+from movies_api.filters import MovieFilter
+from comments.models import Comment
+from business_logic.instrumentation import query_budget
+import business_logic as bl
+from business_logic import response_cache, search
+from business_logic.tests.caches import SHARED_CACHES
 
 
 class TestMoviesApi(TestCase):
     def setUp(self):
         self.client = APIClient()
+        cache.clear()
+        bl.omdb_cache.get_response_cache().clear()
 
         self.example_response = mock.MagicMock()
 
         with open(os.path.join(BASE_DIR, 'business_logic', 'tests', 'example_response.json')) as f:
             # mock Response object from requests module
             setattr(self.example_response, 'text', f.read())
+        self.example_response.status_code = 200
 
-    @mock.patch('requests.get')
+    @mock.patch('requests.Session.get')
     def test_movie_fetch(self, request_get_mock):
         request_get_mock.return_value = self.example_response
         response = self.client.post('/movies/', {'title': 'test'}, format='json')
@@ -26,7 +42,7 @@ class TestMoviesApi(TestCase):
         id = response.data['id']
         self.assertTrue(models.Movie.objects.filter(id=id).exists())
 
-    @mock.patch('requests.get')
+    @mock.patch('requests.Session.get')
     def test_request_with_no_title(self, request_get_mock):
         request_get_mock.return_value = self.example_response
         response = self.client.post('/movies/', {'name': 'test'}, format='json')
@@ -34,3 +50,285 @@ class TestMoviesApi(TestCase):
 
         # check that nothing has been saved to the database
         self.assertFalse(models.Movie.objects.exists())
+
+    @mock.patch('requests.Session.get')
+    def test_request_with_invalid_title(self, request_get_mock):
+        request_get_mock.return_value = self.example_response
+        response = self.client.post('/movies/', {'title': 123}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['message'], 'Title should be a non-empty string.')
+
+        for titles, invalid in ((['a', 5], [1]), (['a', {'x': 1}, '  '], [1, 2])):
+            for url in ('/movies/', '/movies/?async=1'):
+                response = self.client.post(url, {'title': titles}, format='json')
+                self.assertEqual(response.status_code, 400)
+                self.assertListEqual([error['index'] for error in response.json()['errors']], invalid)
+
+        request_get_mock.assert_not_called()
+        self.assertFalse(models.Movie.objects.exists())
+        self.assertFalse(models.MovieImportJob.objects.exists())
+
+    @mock.patch('requests.Session.get')
+    def test_request_with_too_long_title(self, request_get_mock):
+        request_get_mock.return_value = self.example_response
+        title = 'a' * 256
+        response = self.client.post('/movies/', {'title': title}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['message'], 'Title cannot be longer than 255 characters.')
+
+        response = self.client.post('/movies/?async=1', {'title': ['avengers', title]}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertListEqual([error['index'] for error in response.json()['errors']], [1])
+
+        request_get_mock.assert_not_called()
+        self.assertFalse(models.MovieImportJob.objects.exists())
+
+        # the longest allowed title is saved as an alias
+        response = self.client.post('/movies/', {'title': title[1:]}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(models.MovieAlias.objects.filter(query=title[1:]).exists())
+
+    @mock.patch('requests.Session.get')
+    def test_movies_import(self, request_get_mock):
+        request_get_mock.return_value = self.example_response
+        response = self.client.post('/movies/', {'title': ['avengers', 'the avengers']}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertListEqual([item['query'] for item in response.data['created']], ['avengers', 'the avengers'])
+        self.assertEqual(response.data['created'][0]['movie']['title'], 'The Avengers')
+        self.assertListEqual(response.data['not_found'], [])
+        self.assertEqual(models.Movie.objects.count(), 1)
+
+    @mock.patch('requests.Session.get')
+    def test_queued_movies_import(self, request_get_mock):
+        request_get_mock.return_value = self.example_response
+        response = self.client.post('/movies/?async=1', {'title': ['avengers', 'the avengers']}, format='json')
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response['Location'], response.data['url'])
+        request_get_mock.assert_not_called()
+
+        status = self.client.get(response.data['url']).data
+        self.assertEqual((status['status'], status['total'], status['counts']['pending']), ('pending', 2, 2))
+
+        bl.jobs.process_batch(batch_size=10)
+        status = self.client.get(response.data['url']).data
+        self.assertEqual(status['status'], 'done')
+        self.assertListEqual(
+            [(item['query'], item['status'], item['movie']['title']) for item in status['items']],
+            [('avengers', 'done', 'The Avengers'), ('the avengers', 'done', 'The Avengers')],
+        )
+
+        self.assertEqual(self.client.get('/movies/jobs/0/').status_code, 404)
+
+    def test_movies_are_paginated_with_cursor(self):
+        for i in range(5):
+            models.Movie.objects.create(title=f'movie {i}')
+
+        response = self.client.get('/movies/', {'page_size': 3})
+        self.assertListEqual([movie['title'] for movie in response.data['results']], ['movie 0', 'movie 1', 'movie 2'])
+
+        response = self.client.get(response.data['next'])
+        self.assertListEqual([movie['title'] for movie in response.data['results']], ['movie 3', 'movie 4'])
+        self.assertIsNone(response.data['next'])
+
+    def test_movies_ordered_by_comment_count(self):
+        for i, comment_count in enumerate((3, 0, 5, 3, 1)):
+            models.Movie.objects.create(title=f'movie {i}', comment_count=comment_count)
+
+        response = self.client.get('/movies/', {'ordering': '-comment_count', 'min_comments': 1, 'page_size': 2})
+        self.assertListEqual([movie['title'] for movie in response.data['results']], ['movie 2', 'movie 3'])
+        response = self.client.get(response.data['next'])
+        self.assertListEqual([movie['title'] for movie in response.data['results']], ['movie 0', 'movie 4'])
+        self.assertIsNone(response.data['next'])
+
+        response = self.client.get('/movies/', {'ordering': 'comment_count', 'stream': 1})
+        titles = [movie['title'] for movie in json.loads(b''.join(response.streaming_content))]
+        self.assertListEqual(titles, ['movie 1', 'movie 4', 'movie 0', 'movie 3', 'movie 2'])
+
+        self.assertEqual(self.client.get('/movies/', {'ordering': 'title'}).status_code, 400)
+
+    @override_settings(PAGINATION_MAX_PAGE_SIZE=2)
+    def test_page_size_is_limited(self):
+        for i in range(3):
+            models.Movie.objects.create(title=f'movie {i}')
+
+        response = self.client.get('/movies/', {'page_size': 100})
+        self.assertEqual(len(response.data['results']), 2)
+
+    def test_streamed_movies(self):
+        for i in range(5):
+            models.Movie.objects.create(title=f'movie {i}', duration=100 + i, release_date='2010-01-0' + str(i + 1))
+
+        response = self.client.get('/movies/', {'stream': 1, 'duration__gt': 101})
+        self.assertTrue(response.streaming)
+        content = b''.join(response.streaming_content)
+
+        expected = self.client.get('/movies/', {'duration__gt': 101}).data['results']
+        self.assertEqual(content, JSONRenderer().render(expected))
+
+    def test_search_movies(self):
+        search.get_index().clear()
+        models.Movie.objects.create(title='The Godfather', director='Francis Ford Coppola')
+        models.Movie.objects.create(title='The Godfather: Part II', director='Francis Ford Coppola', duration=202)
+        models.Movie.objects.create(title='Goodfellas', director='Martin Scorsese')
+
+        response = self.client.get('/movies/', {'search': 'godfater'})
+        self.assertIsNone(response.data['next'])
+        self.assertListEqual(
+            [movie['title'] for movie in response.data['results']],
+            ['The Godfather', 'The Godfather: Part II']
+        )
+
+        response = self.client.get('/movies/', {'search': 'godfater', 'duration__gt': 180})
+        self.assertListEqual([movie['title'] for movie in response.data['results']], ['The Godfather: Part II'])
+
+    def test_query_budgets(self):
+        for i in range(20):
+            models.Movie.objects.create(title=f'movie {i}')
+
+        # generations of the tables (ETag and cache key) and the page
+        with query_budget(2):
+            self.client.get('/movies/', {'title': 'movie'})
+        with query_budget(2):
+            self.client.get('/movies/', {'stream': 1}).getvalue()
+        with query_budget(5):
+            self.client.get('/movies/', {'search': 'movie'})
+
+
+class TestConditionalGet(TransactionTestCase):
+    def setUp(self):
+        self.client = APIClient()
+        cache.clear()
+        models.Movie.objects.create(title='movie')
+
+    def test_not_modified(self):
+        response = self.client.get('/movies/', {'title': 'mov'})
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+
+        # unchanged list is not read from the database, only the generations of the tables are
+        with query_budget(1):
+            response = self.client.get('/movies/', {'title': 'mov'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+        response = self.client.get('/movies/', {'title': 'other'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_write_changes_etag(self):
+        etag = self.client.get('/movies/')['ETag']
+        models.Movie.objects.create(title='other movie')
+
+        response = self.client.get('/movies/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertNotEqual(response['ETag'], etag)
+
+
+class TestMovieListCache(TransactionTestCase):
+    def setUp(self):
+        self.client = APIClient()
+        cache.clear()
+        models.Movie.objects.create(title='movie', director='director')
+
+    @override_settings(CACHES=SHARED_CACHES)
+    def test_list_is_cached_until_movies_change(self):
+        response = self.client.get('/movies/', {'director': 'director', 'title': 'mov'})
+        self.assertEqual(response['X-Cache'], 'MISS')
+
+        # only generations of the tables are read from the database
+        with query_budget(1):
+            response = self.client.get('/movies/', {'title': 'mov', 'director': 'director'})
+        self.assertEqual(response['X-Cache'], 'HIT')
+        self.assertListEqual([movie['title'] for movie in response.data['results']], ['movie'])
+
+        models.Movie.objects.create(title='other movie', director='director')
+        response = self.client.get('/movies/', {'director': 'director', 'title': 'mov'})
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(len(response.data['results']), 2)
+
+    @override_settings(CACHES=SHARED_CACHES)
+    def test_list_is_invalidated_by_comments_only_if_it_depends_on_them(self):
+        movie = models.Movie.objects.get()
+        for params in ({'director': 'director'}, {'ordering': '-comment_count'}):
+            self.assertEqual(self.client.get('/movies/', params)['X-Cache'], 'MISS')
+
+        Comment.objects.create(movie=movie, body='comment')
+        self.assertEqual(self.client.get('/movies/', {'director': 'director'})['X-Cache'], 'HIT')
+        response = self.client.get('/movies/', {'ordering': '-comment_count', 'min_comments': 1})
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertListEqual([movie['title'] for movie in response.data['results']], ['movie'])
+        self.assertEqual(self.client.get('/movies/', {'ordering': '-comment_count'})['X-Cache'], 'MISS')
+
+    def test_list_is_not_cached_in_local_cache(self):
+        self.assertFalse(response_cache.is_enabled())
+        for _ in range(2):
+            response = self.client.get('/movies/', {'director': 'director'})
+            self.assertEqual(response['X-Cache'], 'MISS')
+            self.assertListEqual([movie['title'] for movie in response.data['results']], ['movie'])
+
+
+class TestMovieFilter(TestCase):
+    def setUp(self):
+        for i, release_date in enumerate(('1999-12-31', '2000-01-01', '2000-12-31', '2001-01-01', None)):
+            models.Movie.objects.create(title=f'movie {i}', release_date=release_date, duration=90 + i * 10)
+
+    def filter(self, **params) -> list:
+        return list(MovieFilter(params, queryset=models.Movie.objects.order_by('id')).qs.values_list('title', flat=True))
+
+    def test_release_year(self):
+        self.assertListEqual(self.filter(release_year=2000), ['movie 1', 'movie 2'])
+        self.assertListEqual(self.filter(release_year__gt=2000), ['movie 3'])
+        self.assertListEqual(self.filter(release_year__lt=2000), ['movie 0'])
+        self.assertListEqual(self.filter(release_year__gt=1999, release_year__lt=2001), ['movie 1', 'movie 2'])
+        self.assertListEqual(self.filter(release_year=0), [])
+        self.assertListEqual(self.filter(release_year__lt=100000), ['movie 0', 'movie 1', 'movie 2', 'movie 3'])
+
+    @skipUnless(connection.vendor == 'postgresql', 'EXPLAIN output is checked on PostgreSQL')
+    def test_filters_use_indexes(self):
+        with connection.cursor() as cursor:
+            # the table is tiny, so a sequential scan would be cheaper - check that the index can be used at all
+            cursor.execute('SET LOCAL enable_seqscan = off')
+
+        cases = (
+            ({'release_year': 2000}, 'movie_release_date_idx'),
+            ({'release_year__gt': 2000}, 'movie_release_date_idx'),
+            ({'release_year__lt': 2000}, 'movie_release_date_idx'),
+            ({'duration__gt': 100}, 'movie_duration_idx'),
+            ({'duration__lt': 100}, 'movie_duration_idx'),
+        )
+        for params, index in cases:
+            plan = MovieFilter(params, queryset=models.Movie.objects.all()).qs.explain()
+            # `Index Scan using <index>` or `Bitmap Index Scan on <index>`
+            self.assertRegex(plan, rf'Index Scan (using|on) {index} ', params)
+
+
+class TestExportApi(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        for year in (1999, 2000, 2001):
+            movie = models.Movie.objects.create(title=f'movie {year}', release_date=f'{year}-06-01')
+            Comment.objects.create(movie=movie, body=f'comment {year}')
+
+    def test_export_filtered_movies(self):
+        response = self.client.get('/export/', {'release_year__gt': 1999})
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertListEqual([line['title'] for line in lines], ['movie 2000', 'movie 2001'])
+        self.assertListEqual([comment['body'] for comment in lines[0]['comments']], ['comment 2000'])
+
+        response = self.client.get('/export/', {'output': 'csv', 'release_year': 2000})
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="movies.csv"')
+        self.assertEqual(len(b''.join(response.streaming_content).splitlines()), 2)
+
+        self.assertEqual(self.client.get('/export/', {'output': 'xml'}).status_code, 400)
+
+    def test_export_command(self):
+        out = StringIO()
+        call_command('export_movies', '--filter', 'release_year__lt=2001', '--chunk-size', '1', stdout=out, stderr=StringIO())
+        lines = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertListEqual([line['title'] for line in lines], ['movie 1999', 'movie 2000'])
+
+        with self.assertRaises(CommandError):
+            call_command('export_movies', '--filter', 'release_year=abc', stdout=StringIO())
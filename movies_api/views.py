@@ -1,31 +1,216 @@
-from typing import Any
-from rest_framework.generics import ListCreateAPIView, ListAPIView
+import json
+from typing import Any, Optional, Tuple
+from collections import OrderedDict
+from urllib.parse import parse_qs
+from django.conf import settings
+from django.http import HttpRequest, StreamingHttpResponse
+from django.urls import reverse
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
+from rest_framework import status as s
+from rest_framework.generics import GenericAPIView, ListCreateAPIView, ListAPIView, RetrieveAPIView
 from rest_framework.response import Response
 from rest_framework.request import Request
 from django_filters import rest_framework as dj_filters
 
 import business_logic as bl
+from business_logic import exceptions, export, generations, jobs, ranking_cache, ranking_snapshots, response_cache
+from business_logic.pagination import KeysetPagination
+from business_logic.serialization import ValuesListMixin, get_values_serializer
+from business_logic.streaming import StreamingListMixin
 from movies_api import serializers, models, filters
+from comments.models import Comment, CommentDailyCount
 
 
-class MovieView(ListCreateAPIView):
+def get_movie_list_models(request: HttpRequest) -> tuple:
+    """
+    :return: models which tables the list of movies is read from - lists filtered or ordered by the number
+        of comments change with every comment
+    """
+    params = request.GET
+    if params.get('min_comments') or (params.get('ordering') or 'id') != 'id':
+        return models.Movie, Comment
+    return models.Movie,
+
+
+@method_decorator(condition(etag_func=generations.etag_func(get_model_classes=get_movie_list_models)), name='get')
+class MovieView(StreamingListMixin, ValuesListMixin, ListCreateAPIView):
     queryset = models.Movie.objects.all()
     serializer_class = serializers.MovieSerializer
     filter_backends = (dj_filters.DjangoFilterBackend,)
     filterset_class = filters.MovieFilter
+    pagination_class = KeysetPagination
+    search_query_param = 'search'
+    async_query_param = 'async'
+
+    def get_keyset_ordering(self, request: Request):
+        return filters.MovieFilter.ORDERINGS.get(request.query_params.get('ordering'), ('id',))
+
+    def list(self, request: Request, *args: Any, **kwargs: Any) -> Response:
+        if self.is_streaming(request):
+            return super().list(request, *args, **kwargs)
+
+        def build() -> Any:
+            if request.query_params.get(self.search_query_param):
+                return self.search_list(request).data
+            return super(MovieView, self).list(request, *args, **kwargs).data
+
+        key = response_cache.make_key(request, *get_movie_list_models(request))
+        data, hit = response_cache.get_or_build(key, build, settings.MOVIE_LIST_CACHE_TIMEOUT)
+        return Response(data, headers={'X-Cache': 'HIT' if hit else 'MISS'})
+
+    def search_list(self, request: Request) -> Response:
+        # search results are ordered by relevance, so only the best matches are returned (a single page)
+        values_serializer = self.get_values_serializer()
+        queryset = values_serializer.values(self.filter_queryset(self.get_queryset()))
+        rows = queryset[:self.paginator.get_page_size(request)]
+        return Response(OrderedDict([
+            ('next', None),
+            ('results', values_serializer.serialize(rows)),
+        ]))
 
     def post(self, request: Request, *args: Any, **kwargs: Any):
         title = request.data.get('title', None)
+        bl.validate_titles(title)
+        if request.query_params.get(self.async_query_param) in ('1', 'true'):
+            return self.enqueue(request, title)
+        if isinstance(title, list):
+            result = bl.fetch_movies_info(title)
+            return Response(serializers.MovieImportSerializer(result).data)
+
         movie = bl.fetch_movie_info(title)
         movie_s = serializers.MovieSerializer(movie)
         return Response(movie_s.data)
 
+    def enqueue(self, request: Request, titles) -> Response:
+        # titles are fetched by `process_movie_jobs` workers, progress is reported by `MovieImportJobView`
+        job = jobs.enqueue_titles(titles)
+        url = request.build_absolute_uri(reverse('movie-job', args=[job.pk]))
+        return Response(
+            OrderedDict([('id', job.pk), ('status', 'pending'), ('url', url)]),
+            status=s.HTTP_202_ACCEPTED,
+            headers={'Location': url},
+        )
 
+
+class MovieImportJobView(RetrieveAPIView):
+    queryset = models.MovieImportJob.objects.all()
+    serializer_class = serializers.MovieImportJobSerializer
+
+    def retrieve(self, request: Request, *args: Any, **kwargs: Any) -> Response:
+        job = self.get_object()
+        data = {
+            'id': job.pk,
+            'created_at': job.created_at,
+            **jobs.get_job_status(job),
+            'items': job.items.select_related('movie').order_by('id'),
+        }
+        return Response(self.get_serializer(data).data)
+
+
+@method_decorator(
+    condition(etag_func=generations.etag_func(models.Movie, CommentDailyCount, models.RankingSnapshot)), name='get'
+)
 class TopMoviesView(ListAPIView):
     serializer_class = serializers.MovieRankingSerializer
 
-    def get_queryset(self):
+    def get_date_range(self):
         date_from = bl.utils.parse_date(self.request.query_params.get('date_from'))
         date_until = bl.utils.parse_date(self.request.query_params.get('date_until'))
+        return date_from, date_until
+
+    def get_ranking_params(self):
+        return {
+            name: bl.utils.parse_int(self.request.query_params.get(name), name)
+            for name in ('min_comments', 'limit', 'offset')
+        }
+
+    def get_queryset(self):
+        return bl.get_ranking(*self.get_date_range(), **self.get_ranking_params())
+
+    def list(self, request: Request, *args: Any, **kwargs: Any) -> Response:
+        date_from, date_until = self.get_date_range()
+        params = self.get_ranking_params()
+        bl.validate_ranking_params(date_from, date_until, **params)
+
+        # the most popular windows are precomputed (see `build_ranking_snapshots` command)
+        snapshot = ranking_snapshots.find_snapshot(date_from, date_until)
+        if snapshot is not None:
+            snapshot_id, built_at = snapshot
+            data = ranking_snapshots.get_snapshot_ranking(snapshot_id, **params)
+            return Response(data, headers={'X-Ranking-Snapshot': built_at.isoformat()})
+
+        # the key is created before the ranking is computed (see `ranking_cache.set`)
+        key = None
+        if date_from and date_until:
+            key = ranking_cache.make_key(date_from, date_until, request=request, **params)
+        data = ranking_cache.get(key) if key else None
+        cache_status = 'HIT' if data is not None else 'MISS'
+
+        if data is None:
+            values_serializer = get_values_serializer(self.get_serializer_class())
+            data = values_serializer.serialize(values_serializer.values(self.get_queryset()))
+            if key:
+                ranking_cache.set(key, data)
+
+        return Response(data, headers={'X-Cache': cache_status})
+
+
+class ExportView(GenericAPIView):
+    """
+    Stream (filtered) movies with their comments as NDJSON or CSV.
+    """
+    queryset = models.Movie.objects.all()
+    filter_backends = (dj_filters.DjangoFilterBackend,)
+    filterset_class = filters.MovieFilter
+    # `format` query param is reserved by rest_framework for choosing the renderer
+    output_query_param = 'output'
+
+    def get(self, request: Request, *args: Any, **kwargs: Any) -> StreamingHttpResponse:
+        output_format = request.query_params.get(self.output_query_param, 'ndjson')
+        if output_format not in export.CONTENT_TYPES:
+            raise exceptions.BusinessLogicException(
+                f'{self.output_query_param} should be one of: {", ".join(export.CONTENT_TYPES)}.',
+                code=s.HTTP_400_BAD_REQUEST,
+            )
+
+        queryset = self.filter_queryset(self.get_queryset())
+        response = StreamingHttpResponse(
+            export.export_movies(queryset, output_format), content_type=export.CONTENT_TYPES[output_format],
+        )
+        response['Content-Disposition'] = f'attachment; filename="movies.{output_format}"'
+        return response
+
+
+async def create_movie_async(scope: dict, body: bytes) -> Optional[Tuple[int, dict]]:
+    """
+    Asynchronous `POST /movies/` served by the ASGI application (see `movies_db/asgi.py`).
+    Requests for a list of titles, queued requests (`?async=1`) and requests with other content types
+    are left to `MovieView`.
+    """
+    if parse_qs(scope.get('query_string', b'').decode()).get(MovieView.async_query_param):
+        return None
+    headers = dict(scope.get('headers', []))
+    content_type = headers.get(b'content-type', b'').split(b';')[0].strip()
+    if content_type == b'application/json':
+        try:
+            data = json.loads(body.decode() or '{}')
+        except ValueError:
+            return None
+    elif content_type == b'application/x-www-form-urlencoded':
+        try:
+            data = {name: values[-1] for name, values in parse_qs(body.decode()).items()}
+        except UnicodeDecodeError:
+            return None
+    else:
+        return None
 
-        return bl.get_ranking(date_from, date_until)
+    if not isinstance(data, dict) or isinstance(data.get('title'), list):
+        return None
+    try:
+        bl.validate_titles(data.get('title'))
+    except exceptions.BusinessLogicException:
+        # invalid titles are reported by `MovieView`
+        return None
+    movie = await bl.async_fetch_movie_info(data.get('title'))
+    return 200, serializers.MovieSerializer(movie).data
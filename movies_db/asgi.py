@@ -0,0 +1,24 @@
+"""
+ASGI config for movies_db project.
+
+It exposes the ASGI callable as a module-level variable named ``application``.
+`POST /movies/` is handled asynchronously, all the other requests are passed to the WSGI application.
+Run it with any ASGI server, e.g.::
+
+    uvicorn movies_db.asgi:application
+"""
+
+import os
+
+from django.core.wsgi import get_wsgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'movies_db.settings')
+
+wsgi_application = get_wsgi_application()
+
+from business_logic.asgi import AsgiHandler  # noqa: E402
+from movies_api import views as movie_views  # noqa: E402
+
+application = AsgiHandler(wsgi_application, {
+    ('POST', '/movies/'): movie_views.create_movie_async,
+})
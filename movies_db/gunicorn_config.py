@@ -0,0 +1,17 @@
+"""
+Gunicorn settings, used with `gunicorn -c python:movies_db.gunicorn_config movies_db.wsgi`.
+"""
+import os
+import tempfile
+
+
+# the workers aggregate their metrics in a shared directory (see business_logic.metrics), it is set before the
+# application is loaded, so the workers inherit it
+METRICS_DIR = os.environ.setdefault('METRICS_DIR', os.path.join(tempfile.gettempdir(), 'movies_db_metrics'))
+
+
+def on_starting(server):
+    # files of the previous run of the server would be counted as finished workers
+    os.makedirs(METRICS_DIR, exist_ok=True)
+    for name in os.listdir(METRICS_DIR):
+        os.remove(os.path.join(METRICS_DIR, name))
@@ -57,6 +57,8 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 
     # custom middleware
+    'business_logic.metrics.MetricsMiddleware',
+    'business_logic.instrumentation.QueryInstrumentationMiddleware',
     'business_logic.exceptions.BusinessLogicExceptionHandlerMiddleware',
 ]
 
@@ -149,3 +151,91 @@ REST_FRAMEWORK = {
         'django_filters.rest_framework.DjangoFilterBackend',
     ),
 }
+
+# cache of responses received from OMDb API (time values in seconds)
+OMDB_RESPONSE_CACHE = {
+    'BACKEND': 'business_logic.omdb_cache.LRUResponseCache',
+    'TTL': 60 * 60 * 24,
+    'NEGATIVE_TTL': 60 * 10,
+    'MAX_SIZE': 1024,
+}
+
+# OMDb API HTTP client (timeouts and backoff values in seconds)
+OMDB_CLIENT = {
+    'CONNECT_TIMEOUT': 3.05,
+    'READ_TIMEOUT': 10,
+    'MAX_RETRIES': 2,
+    'BACKOFF_FACTOR': 0.3,
+    'BACKOFF_MAX': 5,
+    'POOL_MAXSIZE': 10,  # should not be lower than MOVIE_IMPORT_WORKERS
+    'MAX_CONNECTIONS': 500,  # requests in flight of the asynchronous client (ASGI)
+    'MAX_RESPONSE_SIZE': 1024 * 1024,  # bytes, larger responses are rejected by the asynchronous client
+}
+
+# threads running database queries of asynchronous requests and the WSGI application under ASGI server
+ASYNC_THREAD_WORKERS = 20
+
+# batch import of movies (POST /movies/ with a list of titles)
+MOVIE_IMPORT_WORKERS = 8
+MOVIE_IMPORT_MAX_TITLES = 500
+
+# background import jobs (POST /movies/?async=1, drained by `process_movie_jobs` command)
+MOVIE_IMPORT_JOB_MAX_ATTEMPTS = 3
+MOVIE_IMPORT_JOB_TIMEOUT = 300  # seconds after which items claimed by a crashed worker are claimed again
+
+# responses and rankings are cached only in a backend shared by all the worker processes (so cache invalidation
+# reaches all of them), e.g. memcached: CACHE_BACKEND=django.core.cache.backends.memcached.MemcachedCache
+# CACHE_LOCATION=127.0.0.1:11211. Nothing is cached in the default process-local backend
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
+    },
+}
+
+# maximum time (in seconds) a ranking is served from cache
+RANKING_CACHE_TIMEOUT = 60 * 10
+
+# maximum time (in seconds) a page of /movies/ is served from cache (entries are also invalidated by every write
+# to the movies table), maximum time the page is being built by a single request and maximum time other requests
+# wait for it (then they build the page themselves)
+MOVIE_LIST_CACHE_TIMEOUT = 60 * 10
+RESPONSE_CACHE_LOCK_TIMEOUT = 10
+RESPONSE_CACHE_MAX_WAIT = 0.2
+
+# rankings of the last N days precomputed by `build_ranking_snapshots` command (e.g. run by cron);
+# snapshots older than RANKING_SNAPSHOT_MAX_AGE seconds are not used
+RANKING_SNAPSHOT_WINDOWS = (7, 30, 365)
+RANKING_SNAPSHOT_MAX_AGE = 60 * 60 * 2
+
+# keyset pagination of /movies/ and /comments/ (page size can be changed with `page_size` query param)
+PAGINATION_PAGE_SIZE = 100
+PAGINATION_MAX_PAGE_SIZE = 1000
+
+# number of rows fetched at once from the server-side cursor in streaming mode (`?stream=1`)
+STREAMING_CHUNK_SIZE = 2000
+
+# search of movies (`/movies/?search=...`) without `pg_trgm` extension: minimal fraction of trigrams of the phrase
+# found in the title or director (the same as default `pg_trgm.word_similarity_threshold`)
+# and maximal number of best matches passed to the database
+SEARCH_SIMILARITY_THRESHOLD = 0.6
+SEARCH_MAX_CANDIDATES = 1000
+
+# SQL queries of every request are recorded by `business_logic.instrumentation.QueryInstrumentationMiddleware`:
+# queries slower than SLOW_QUERY_MS are logged, as well as queries repeated at least N_PLUS_ONE_THRESHOLD times;
+# number of queries is returned in `X-Query-Count` header only if REPORT_QUERY_COUNT is set (not in production)
+QUERY_INSTRUMENTATION = {
+    'SLOW_QUERY_MS': 200,
+    'N_PLUS_ONE_THRESHOLD': 5,
+    'REPORT_QUERY_COUNT': DEBUG,
+}
+
+# metrics exposed at /metrics - with many worker processes METRICS_DIR must point to a directory shared by the workers
+# and cleared before the server starts (movies_db/gunicorn_config.py sets and clears it); every worker writes its
+# metrics there every METRICS_FLUSH_INTERVAL seconds
+METRICS_DIR = os.environ.get('METRICS_DIR')
+METRICS_FLUSH_INTERVAL = 1
+
+# bulk creation of comments (POST /comments/ with a list of comments)
+COMMENT_BULK_MAX_ITEMS = 10000
+COMMENT_BULK_BATCH_SIZE = 1000
@@ -18,11 +18,15 @@ from django.urls import path
 
 from movies_api import views as movie_views
 from comments import views as comment_views
+from business_logic import metrics
 
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('movies/', movie_views.MovieView.as_view(), name='movies'),
+    path('movies/jobs/<int:pk>/', movie_views.MovieImportJobView.as_view(), name='movie-job'),
     path('comments/', comment_views.CommentView.as_view(), name='comments'),
+    path('export/', movie_views.ExportView.as_view(), name='export'),
     path('top/', movie_views.TopMoviesView.as_view(), name='top'),
+    path('metrics', metrics.metrics_view, name='metrics'),
 ]